@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Headless analytics API
+Serves the league table, team analysis, trends, head-to-head and insights as JSON from one
+in-memory match store, with an LRU+TTL response cache and ETags tied to the dataset version
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Literal
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel, NonNegativeInt
+
+from data_analysis import head_to_head_stats, team_stats, trend_stats
+from ingest import LiveMatchStore
+from instrumentation import REGISTRY, timed
+from match_store import DATA_FILE, dataset_digest
+from streaming import insight_stats, team_venue_totals
+from what_if import WhatIf
+
+CACHE_SIZE = 512
+CACHE_TTL = 60.0
+# The log of ingested rows is checked at most this often; a stat call per request is wasteful under polling
+SYNC_INTERVAL = 1.0
+
+
+class Edit(BaseModel):
+    """One result change, from the named team's side: a new result, or a new score (gf, ga)"""
+    team: str
+    opponent: str
+    venue: Literal['Home', 'Away'] | None = None
+    result: Literal['W', 'D', 'L'] | None = None
+    gf: NonNegativeInt | None = None
+    ga: NonNegativeInt | None = None
+
+    def as_dict(self):
+        """The edit as what_if.WhatIf reads it, leaving out unset fields"""
+        return self.model_dump(exclude_none=True)
+
+
+class WhatIfRequest(BaseModel):
+    """One scenario: edits like {"team": "Liverpool", "opponent": "Arsenal", "venue": "Away", "result": "D"}"""
+    edits: list[Edit] = []
+    week: int | None = None
+
+
+class WhatIfBatchRequest(BaseModel):
+    scenarios: list[list[Edit]]
+    week: int | None = None
+
+
+class ResponseCache:
+    """Least-recently-used cache whose entries also expire after ttl seconds"""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class AnalyticsService:
+    """The match store plus the cached JSON renderings of every endpoint"""
+
+    def __init__(self, path=DATA_FILE, cache_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.store = LiveMatchStore(path)
+        self.cache = ResponseCache(cache_size, ttl)
+        self.dataset = (dataset_digest(path) or 'local')[:12]
+        self.last_sync = time.monotonic()
+
+    def sync(self):
+        """Pick up rows other processes ingested, at most once per SYNC_INTERVAL"""
+        now = time.monotonic()
+        if now - self.last_sync >= SYNC_INTERVAL:
+            self.last_sync = now
+            self.store.sync()
+
+    @property
+    def etag(self):
+        return f'"{self.dataset}-{self.store.version}"'
+
+    def render(self, key, compute):
+        """JSON bytes for key at the current dataset version, computed once per TTL"""
+        endpoint = key[0]
+        key = (self.store.version, *key)
+        body = self.cache.get(key)
+        REGISTRY.count_cache(f'api {endpoint}', hit=body is not None)
+        if body is None:
+            with timed(f'api {endpoint}'):
+                payload = compute()
+                if payload is None:
+                    return None
+                body = json.dumps(payload, separators=(',', ':')).encode()
+            self.cache.put(key, body)
+        return body
+
+    def seasons(self):
+        index = self.store.index
+        return {'seasons': index.seasons, 'teams': {season: index.teams(season) for season in index.seasons}}
+
+    def table(self, season, week):
+        if season not in self.store.standings:
+            return None
+        table = self.store.standings.table(season, week)
+        return {
+            'season': season,
+            'match_week': min(week, self.store.standings.max_week(season)) if week is not None else self.store.standings.max_week(season),
+            'table': json.loads(table.to_json(orient='records')),
+        }
+
+    def insights(self, season):
+        rows = self.store.index.season(season)
+        if len(rows) == 0:
+            return None
+        return {'season': season, **insight_stats(team_venue_totals(rows))}
+
+    def team(self, team, season):
+        return team_stats(self.store.index, team, season)
+
+    def trends(self, team, season):
+        return trend_stats(self.store.index, team, season)
+
+    def head_to_head(self, team1, team2, season):
+        index = self.store.index
+        if season not in self.store.standings or team1 not in index.team_rows or team2 not in index.team_rows:
+            return None
+        return head_to_head_stats(index, team1, team2, season)
+
+    def what_if(self, season, week):
+        """What-if evaluator for a season's standings as of week, or None for an unknown season"""
+        if season not in self.store.standings:
+            return None
+        return WhatIf(self.store.standings[season], week)
+
+
+def create_app(path=DATA_FILE, cache_size=CACHE_SIZE, ttl=CACHE_TTL):
+    """Build the ASGI app; the store is loaded once, when the app is created"""
+    service = AnalyticsService(path, cache_size, ttl)
+    app = FastAPI(title='Premier League Analytics API')
+    app.state.service = service
+
+    async def respond(request, key, compute):
+        # Syncing and payloads are CPU-bound pandas work; keep them off the event loop
+        await asyncio.to_thread(service.sync)
+        # One ETag for the comparison and the header, even if an ingest lands while rendering
+        etag = service.etag
+        # Resolve (or take from the cache) first, so an unknown resource is a 404 whatever its ETag
+        body = await asyncio.to_thread(service.render, key, compute)
+        if body is None:
+            raise HTTPException(status_code=404, detail='No matching data')
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers={'ETag': etag})
+        return Response(body, media_type='application/json', headers={
+            'ETag': etag,
+            'Cache-Control': f'max-age={int(service.cache.ttl)}',
+        })
+
+    @app.get('/health')
+    async def health():
+        return {'status': 'ok', 'version': service.store.version, 'rows': len(service.store.frame),
+                'cache': {'entries': len(service.cache.entries), 'hits': service.cache.hits, 'misses': service.cache.misses}}
+
+    @app.get('/metrics', response_class=PlainTextResponse)
+    async def metrics():
+        """Stage latency histograms and cache counters in Prometheus text format"""
+        return PlainTextResponse(REGISTRY.prometheus_text(), media_type='text/plain; version=0.0.4')
+
+    @app.get('/seasons')
+    async def seasons(request: Request):
+        return await respond(request, ('seasons',), service.seasons)
+
+    @app.get('/seasons/{season}/table')
+    async def table(request: Request, season: int, week: int | None = Query(None, ge=1)):
+        return await respond(request, ('table', season, week), lambda: service.table(season, week))
+
+    @app.get('/seasons/{season}/insights')
+    async def insights(request: Request, season: int):
+        return await respond(request, ('insights', season), lambda: service.insights(season))
+
+    @app.get('/teams/{team}/seasons/{season}')
+    async def team(request: Request, team: str, season: int):
+        return await respond(request, ('team', team, season), lambda: service.team(team, season))
+
+    @app.get('/teams/{team}/seasons/{season}/trends')
+    async def trends(request: Request, team: str, season: int):
+        return await respond(request, ('trends', team, season), lambda: service.trends(team, season))
+
+    @app.get('/head-to-head/{team1}/{team2}')
+    async def head_to_head(request: Request, team1: str, team2: str, season: int = 2025):
+        return await respond(request, ('h2h', team1, team2, season), lambda: service.head_to_head(team1, team2, season))
+
+    async def evaluate(season, week, compute):
+        # Scenario bodies vary per request, so these are computed rather than cached
+        def run():
+            service.sync()
+            what_if = service.what_if(season, week)
+            if what_if is None:
+                return None
+            with timed('api what_if'):
+                return compute(what_if)
+
+        try:
+            payload = await asyncio.to_thread(run)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+        if payload is None:
+            raise HTTPException(status_code=404, detail='No matching data')
+        return payload
+
+    @app.post('/seasons/{season}/what-if')
+    async def what_if(season: int, body: WhatIfRequest):
+        """League table after one set of result edits, with each team's actual position"""
+        def compute(what_if):
+            table = what_if.table([edit.as_dict() for edit in body.edits])
+            return {'season': season, 'match_week': what_if.week, 'table': json.loads(table.to_json(orient='records'))}
+        return await evaluate(season, body.week, compute)
+
+    @app.post('/seasons/{season}/what-if/batch')
+    async def what_if_batch(season: int, body: WhatIfBatchRequest):
+        """Points and positions of every team in every scenario; rows follow scenarios, columns follow teams"""
+        def compute(what_if):
+            points, goal_difference, positions = what_if.evaluate([[edit.as_dict() for edit in edits] for edits in body.scenarios])
+            return {'season': season, 'match_week': what_if.week, 'teams': what_if.teams.tolist(),
+                    'points': points.tolist(), 'goal_difference': goal_difference.tolist(),
+                    'positions': positions.tolist()}
+        return await evaluate(season, body.week, compute)
+
+    return app
+
+
+def main():
+    """Serve the API with uvicorn"""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Premier League analytics JSON API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--data', default=DATA_FILE, help='source match CSV')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='cached responses kept')
+    parser.add_argument('--ttl', type=float, default=CACHE_TTL, help='seconds a cached response stays valid')
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.data, args.cache_size, args.ttl), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
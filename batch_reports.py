@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Batch report generator
+Writes team analysis, performance trends and head-to-head reports for every team-season
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+
+from data_analysis import head_to_head_stats, team_stats, trend_stats
+from ingest import LiveMatchStore
+from match_index import MatchIndex
+from match_store import DATA_FILE
+
+REPORT_FORMATS = ('json', 'markdown')
+
+# Set in the parent before the pool starts so forked workers inherit it copy-on-write;
+# spawned workers (Windows, macOS) load it themselves from the Parquet cache instead.
+_INDEX = None
+
+
+def load_index(data_path=DATA_FILE):
+    """Load the match store (including ingested rows) and index it"""
+    return MatchIndex(LiveMatchStore(data_path).frame)
+
+
+def _init_worker(data_path):
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = load_index(data_path)
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-')
+
+
+def team_season_report(index, team, season):
+    """Team analysis, trends and head-to-heads against every other team of the season"""
+    return {
+        'team': team,
+        'season': int(season),
+        'analysis': team_stats(index, team, season),
+        'trends': trend_stats(index, team, season),
+        'head_to_head': [
+            head_to_head_stats(index, team, opponent, season)
+            for opponent in index.teams(season) if opponent != team
+        ],
+    }
+
+
+def render_markdown(report):
+    """Markdown rendering of a team-season report"""
+    team, season = report['team'], report['season']
+    stats, trends = report['analysis'], report['trends']
+    lines = [f"# {team} - Season {season}", ""]
+
+    if stats is not None:
+        lines += [
+            "## Analysis", "",
+            "| Matches | W | D | L | Pts | GF | GA | GD | xG | xGA |",
+            "|---|---|---|---|---|---|---|---|---|---|",
+            f"| {stats['matches']} | {stats['wins']} | {stats['draws']} | {stats['losses']} | {stats['points']} "
+            f"| {stats['gf']} | {stats['ga']} | {stats['goal_difference']} | {stats['avg_xg']:.2f} | {stats['avg_xga']:.2f} |",
+            "",
+            "| Venue | Matches | Pts | GF | GA |",
+            "|---|---|---|---|---|",
+        ]
+        for venue in ('home', 'away'):
+            row = stats[venue]
+            lines.append(f"| {venue.title()} | {row['matches']} | {row['points']} | {row['gf']} | {row['ga']} |")
+        lines.append("")
+
+    if trends is not None:
+        lines += ["## Trends", "", "| Week | Points |", "|---|---|"]
+        lines += [f"| {entry['week']} | {entry['points']} |" for entry in trends['progression']]
+        lines += [
+            "",
+            f"Recent form: {' - '.join(trends['recent_results'])} ({trends['recent_points']}/15)",
+            "",
+        ]
+        for label in ('best', 'worst'):
+            match = trends[label]
+            lines.append(
+                f"{label.title()} performance: week {match['week']}, {match['team']} "
+                f"{match['gf']}-{match['ga']} {match['opponent']} ({match['venue']})"
+            )
+        lines.append("")
+
+    lines += ["## Head-to-head", ""]
+    for pairing in report['head_to_head']:
+        if not pairing['matches']:
+            continue
+        lines.append(f"### vs {pairing['team2']}")
+        lines += [
+            f"- {match['date']}: {match['team']} {match['gf']}-{match['ga']} {match['opponent']} ({match['venue']})"
+            for match in pairing['matches']
+        ]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def write_report(task):
+    """Build one team-season report in a worker and write it; returns the written paths"""
+    season, team, output_dir, formats = task
+    report = team_season_report(_INDEX, team, season)
+
+    season_dir = os.path.join(output_dir, str(season))
+    os.makedirs(season_dir, exist_ok=True)
+    stem = os.path.join(season_dir, slugify(team))
+    paths = []
+    if 'json' in formats:
+        with open(f'{stem}.json', 'w') as handle:
+            json.dump(report, handle, indent=2)
+        paths.append(f'{stem}.json')
+    if 'markdown' in formats:
+        with open(f'{stem}.md', 'w') as handle:
+            handle.write(render_markdown(report))
+        paths.append(f'{stem}.md')
+    return paths
+
+
+def generate_reports(output_dir='reports', formats=REPORT_FORMATS, seasons=None, teams=None,
+                     workers=None, data_path=DATA_FILE):
+    """Fan the team-season reports out over a process pool; returns the written paths"""
+    global _INDEX
+    _INDEX = load_index(data_path)
+
+    seasons = seasons or _INDEX.seasons
+    tasks = [
+        (season, team, output_dir, tuple(formats))
+        for season in seasons
+        for team in _INDEX.teams(season)
+        if not teams or team in teams
+    ]
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with context.Pool(workers, initializer=_init_worker, initargs=(data_path,)) as pool:
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+        written = [path for paths in pool.imap_unordered(write_report, tasks, chunksize) for path in paths]
+
+    # A filter that matches nothing leaves no worker to have created output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'index.json'), 'w') as handle:
+        json.dump(sorted(written), handle, indent=2)
+    return written
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Generate Premier League reports for every team and season')
+    parser.add_argument('--output-dir', default='reports', help='directory to write reports into')
+    parser.add_argument('--format', choices=REPORT_FORMATS, action='append', help='report format (default: all)')
+    parser.add_argument('--season', type=int, action='append', help='season to report on (default: all)')
+    parser.add_argument('--team', action='append', help='team to report on (default: all)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--data', default=DATA_FILE, help='source match CSV')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = generate_reports(args.output_dir, args.format or REPORT_FORMATS, args.season, args.team,
+                               args.workers, args.data)
+    print(f"Wrote {len(written)} report files to {args.output_dir} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the loading, aggregation and dashboard hot paths
+Times each path on final_matches.csv and on synthetic copies scaled up with the same schema
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from features import SORT_COLUMNS, FormFeaturePipeline
+from match_store import DATA_FILE, load_matches
+from standings import build_standings
+from streaming import stream_aggregates
+
+DEFAULT_SCALES = (1, 10, 100)
+# The dashboard is driven through Streamlit's AppTest, which is slow to start; keep it to small data
+DASHBOARD_MAX_SCALE = 10
+REGRESSION_THRESHOLD = 0.20
+
+
+def synthetic_matches(raw, scale):
+    """Replicate the raw CSV rows `scale` times as later seasons, keeping the schema intact"""
+    n_seasons = raw['season'].nunique()
+    dates = pd.to_datetime(raw['date'])
+    copies = []
+    for k in range(scale):
+        copy = raw.copy()
+        copy['season'] = raw['season'] + k * n_seasons
+        copy['date'] = (dates + pd.DateOffset(years=k * n_seasons)).dt.strftime('%Y-%m-%d')
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def measure(func, repeat=3):
+    """Median/min wall time over `repeat` runs, plus peak traced memory of one extra run"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'median_s': statistics.median(timings), 'min_s': min(timings), 'peak_mb': peak / 1e6}
+
+
+def dashboard_benchmarks(workdir, repeat):
+    """Cold first render and warm rerun of the Streamlit dashboard, run from workdir"""
+    try:
+        import streamlit as st
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {}
+
+    # AppTest runs without a server; silence the bare-mode warnings it triggers on every run
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    script = os.path.abspath('premier_league_analytics.py')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        # Streamlit caches are process-wide; clear them so a first render really is cold
+        def first_render():
+            st.cache_resource.clear()
+            st.cache_data.clear()
+            AppTest.from_file(script, default_timeout=600).run()
+
+        first_render()
+        app = AppTest.from_file(script, default_timeout=600)
+        app.run()
+        return {
+            'dashboard_first_render': measure(first_render, repeat=1),
+            'dashboard_rerun': measure(app.run, repeat),
+        }
+    finally:
+        os.chdir(cwd)
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=3, dashboard=True):
+    """Run every benchmark at every scale; returns {scale: {benchmark: stats}}"""
+    raw = pd.read_csv(DATA_FILE)
+    results = {}
+    for scale in scales:
+        workdir = tempfile.mkdtemp(prefix=f'bench_x{scale}_')
+        try:
+            path = os.path.join(workdir, DATA_FILE)
+            synthetic_matches(raw, scale).to_csv(path, index=False)
+
+            df = load_matches(path)
+            ordered = df.sort_values(SORT_COLUMNS, ignore_index=True)
+            standings = build_standings(df)
+            season = max(standings.seasons)
+            week = standings.max_week(season) // 2
+
+            scale_results = {
+                'rows': len(df),
+                'load_csv': measure(lambda: load_matches(path, use_cache=False), repeat),
+                'load_cached': measure(lambda: load_matches(path), repeat),
+                'standings_build': measure(lambda: build_standings(df), repeat),
+                'standings_table': measure(lambda: standings.table(season, week), repeat),
+                'rolling_features': measure(lambda: FormFeaturePipeline().fit_transform(ordered), repeat),
+                'stream_aggregates': measure(lambda: stream_aggregates(path), repeat),
+            }
+            if dashboard and scale <= DASHBOARD_MAX_SCALE:
+                scale_results.update(dashboard_benchmarks(workdir, repeat))
+            results[scale] = scale_results
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_results(results):
+    print(f"{'scale':>6} {'rows':>9} {'benchmark':<24} {'median':>10} {'min':>10} {'peak MB':>9}")
+    for scale, scale_results in results.items():
+        for name, stats in scale_results.items():
+            if name == 'rows':
+                continue
+            print(f"{scale:>5}x {scale_results['rows']:>9} {name:<24} "
+                  f"{stats['median_s'] * 1e3:>8.2f}ms {stats['min_s'] * 1e3:>8.2f}ms {stats['peak_mb']:>9.1f}")
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """List benchmarks whose median time grew by more than threshold against a saved baseline"""
+    regressions = []
+    for scale, scale_results in results.items():
+        for name, stats in scale_results.items():
+            previous = baseline.get(str(scale), {}).get(name)
+            if name == 'rows' or not previous:
+                continue
+            change = stats['median_s'] / previous['median_s'] - 1
+            if change > threshold:
+                regressions.append(f"{scale}x {name}: {change:+.0%} ({previous['median_s'] * 1e3:.2f}ms -> {stats['median_s'] * 1e3:.2f}ms)")
+    return regressions
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark the Premier League analytics hot paths')
+    parser.add_argument('--scale', type=int, action='append', help='dataset scale factor (default: 1, 10, 100)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark')
+    parser.add_argument('--no-dashboard', action='store_true', help='skip the Streamlit rerun benchmarks')
+    parser.add_argument('--json', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON to check for regressions')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scale or DEFAULT_SCALES, args.repeat, not args.no_dashboard)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(results, json.load(handle))
+        if regressions:
+            print("\nREGRESSIONS:")
+            print("\n".join(regressions))
+            raise SystemExit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Precomputed aggregation cube
+Sums and counts of the key match metrics over season, team, venue, formation, opposition
+formation, referee, kickoff time and day, so roll-ups and slices never touch the raw rows
+"""
+
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from match_store import DATA_FILE, cache_paths, dataset_digest, load_matches
+
+DIMENSIONS = ['season', 'team', 'venue', 'formation', 'opp formation', 'referee', 'time', 'day']
+METRICS = ['gf', 'ga', 'xg', 'xga', 'poss', 'sh', 'sot', 'dist', 'fk', 'pk', 'pkatt', 'attendance', 'points']
+STATS = ('mean', 'sum', 'count')
+
+# Bump whenever the stored cuboids change shape so stale cubes are rebuilt
+CUBE_VERSION = 1
+
+# Cuboids materialized up front besides the finest one: every single dimension, and
+# every other dimension by season and by (season, team), which is what the views slice on
+MATERIALIZED = (
+    [[dimension] for dimension in DIMENSIONS]
+    + [['season', dimension] for dimension in DIMENSIONS[1:]]
+    + [['season', 'team', dimension] for dimension in DIMENSIONS[2:]]
+)
+
+
+def aggregate(rows, dimensions):
+    """One cuboid: per-cell row count plus sum and non-null count of every metric"""
+    # Integer metrics keep integer sums; the rest accumulate in float64
+    sums = {
+        f'{metric}_sum': rows[metric].fillna(0).to_numpy(
+            dtype=np.int64 if pd.api.types.is_integer_dtype(rows[metric]) else np.float64
+        )
+        for metric in METRICS
+    }
+    counts = {f'{metric}_count': rows[metric].notna().to_numpy(dtype=np.int64) for metric in METRICS}
+    frame = pd.concat([
+        rows[dimensions].reset_index(drop=True),
+        pd.DataFrame({'rows': np.ones(len(rows), dtype=np.int64), **sums, **counts}),
+    ], axis=1)
+    return frame.groupby(dimensions, observed=True, dropna=False, sort=True).sum().reset_index()
+
+
+def cuboid_name(dimensions):
+    return '__'.join(re.sub(r'\W+', '_', dimension) for dimension in dimensions)
+
+
+class MatchCube:
+    """A set of cuboids, each keyed by its dimensions
+
+    Any roll-up is answered from the smallest stored cuboid whose dimensions cover
+    it, and the result is kept for the next query.
+    """
+
+    def __init__(self, cuboids):
+        self.cuboids = {tuple(sorted(dimensions)): frame for dimensions, frame in cuboids.items()}
+
+    @classmethod
+    @timed('cube_build')
+    def build(cls, df, materialized=MATERIALIZED):
+        """Aggregate the finest cuboid from the rows, then roll the materialized ones up from it"""
+        base = aggregate(df, DIMENSIONS)
+        cube = cls({tuple(DIMENSIONS): base})
+        for dimensions in materialized:
+            cube.rollup(dimensions)
+        return cube
+
+    def rollup(self, dimensions):
+        """Cuboid over the given dimensions (a list; empty for the grand total)"""
+        key = tuple(sorted(dimensions))
+        if key not in self.cuboids:
+            ancestors = [stored for stored in self.cuboids if set(key) <= set(stored)]
+            source = min(ancestors, key=lambda stored: len(self.cuboids[stored]))
+            frame = self.cuboids[source]
+            totals = frame.drop(columns=list(source))
+            if key:
+                rolled = totals.groupby([frame[dimension] for dimension in key], observed=True, dropna=False, sort=True).sum()
+                self.cuboids[key] = rolled.reset_index()
+            else:
+                self.cuboids[key] = totals.sum().to_frame().T.astype(totals.dtypes.to_dict())
+        return self.cuboids[key]
+
+    @timed('cube_query')
+    def query(self, dimensions, metrics=None, stat='mean', **filters):
+        """Slice and roll up: one row per combination of dimensions, with metrics as the chosen stat
+
+        Filters are keyword arguments on dimensions (spaces as underscores), each a
+        value or a list of values, e.g. query(['formation'], season=2025, team='Arsenal').
+        """
+        if stat not in STATS:
+            raise ValueError(f"stat must be one of {', '.join(STATS)}")
+        metrics = list(metrics or METRICS)
+        filters = {name.replace('_', ' '): value for name, value in filters.items()}
+        unknown = set(dimensions) | set(filters)
+        unknown -= set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(sorted(unknown))}")
+
+        frame = self.rollup(list(dict.fromkeys([*dimensions, *filters])))
+        for dimension, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            frame = frame[frame[dimension].isin(values)]
+
+        columns = ['rows'] + [f'{metric}_{suffix}' for metric in metrics for suffix in ('sum', 'count')]
+        if list(dimensions):
+            totals = frame.groupby(list(dimensions), observed=True, dropna=False, sort=True)[columns].sum()
+        else:
+            totals = frame[columns].sum().to_frame().T.astype(frame[columns].dtypes.to_dict())
+        result = pd.DataFrame(index=totals.index)
+        for metric in metrics:
+            if stat == 'mean':
+                counts = totals[f'{metric}_count']
+                result[metric] = (totals[f'{metric}_sum'] / counts).where(counts > 0)
+            else:
+                result[metric] = totals[f'{metric}_{stat}']
+        result['matches'] = totals['rows']
+        return result
+
+    def save(self, directory, metadata=None):
+        """Write every cuboid as Parquet plus a manifest"""
+        os.makedirs(directory, exist_ok=True)
+        manifest = {'version': CUBE_VERSION, 'source': metadata, 'cuboids': {}}
+        for dimensions, frame in self.cuboids.items():
+            name = cuboid_name(dimensions) or 'total'
+            frame.to_parquet(os.path.join(directory, f'{name}.parquet'), index=False)
+            manifest['cuboids'][name] = list(dimensions)
+        with open(os.path.join(directory, 'manifest.json'), 'w') as handle:
+            json.dump(manifest, handle, indent=2)
+
+    @classmethod
+    def load(cls, directory):
+        """Read a saved cube; returns (cube, source metadata)"""
+        with open(os.path.join(directory, 'manifest.json')) as handle:
+            manifest = json.load(handle)
+        if manifest.get('version') != CUBE_VERSION:
+            raise ValueError('Cube was written by a different version')
+        cuboids = {
+            tuple(dimensions): pd.read_parquet(os.path.join(directory, f'{name}.parquet'))
+            for name, dimensions in manifest['cuboids'].items()
+        }
+        return cls(cuboids), manifest.get('source')
+
+
+def cube_dir(path=DATA_FILE, cache_dir=None):
+    parquet_path, _ = cache_paths(path, cache_dir)
+    return os.path.splitext(parquet_path)[0] + '.cube'
+
+
+def load_cube(path=DATA_FILE, cache_dir=None):
+    """The cube for a match CSV, rebuilt only when the CSV's digest differs from the one it was built from"""
+    directory = cube_dir(path, cache_dir)
+    try:
+        cube, built_from = MatchCube.load(directory)
+    except (OSError, ValueError, ImportError):
+        cube, built_from = None, None
+
+    # The match cache metadata records the CSV digest; trust it while the CSV's mtime and size are unchanged
+    if cube is not None and dataset_digest(path, cache_dir) == built_from:
+        return cube
+
+    df = load_matches(path, cache_dir=cache_dir)
+    digest = dataset_digest(path, cache_dir)
+    if cube is not None and digest and digest == built_from:
+        return cube
+
+    cube = MatchCube.build(df)
+    try:
+        cube.save(directory, digest)
+    except (OSError, ImportError):
+        # Read-only checkout or no Parquet engine: serve the cube from memory
+        pass
+    return cube
+
+
+def main():
+    """Print a slice of the cube"""
+    parser = argparse.ArgumentParser(description='Roll-ups and slices of the precomputed match cube')
+    parser.add_argument('dimensions', nargs='*', default=['time'], help=f"group by these ({', '.join(DIMENSIONS)})")
+    parser.add_argument('--metric', action='append', choices=METRICS, help='metric to show (default: all)')
+    parser.add_argument('--stat', choices=STATS, default='mean')
+    parser.add_argument('--season', type=int, action='append', help='only these seasons')
+    parser.add_argument('--team', action='append', help='only these teams')
+    parser.add_argument('--data', default=DATA_FILE, help='source match CSV')
+    args = parser.parse_args()
+
+    filters = {name: value for name, value in (('season', args.season), ('team', args.team)) if value}
+    result = load_cube(args.data).query(args.dimensions, args.metric, args.stat, **filters)
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_rows', None):
+        print(result.round(2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Plotly figure builders for the dashboard
+Each builder takes precomputed profiles, so figures can be cached per (season, team, chart)
+"""
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+def least_squares_line(x, y):
+    """Endpoints of the ordinary least squares fit of y on x (what trendline='ols' draws)"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    design = np.column_stack([x, np.ones_like(x)])
+    (slope, intercept), *_ = np.linalg.lstsq(design, y, rcond=None)
+    ends = np.array([x.min(), x.max()])
+    return ends, slope * ends + intercept
+
+
+def progression_figure(profile, values, title, yaxis_title, name, color):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=profile.match_week,
+        y=values,
+        mode='lines+markers',
+        name=name,
+        line=dict(color=color, width=3),
+        marker=dict(size=8)
+    ))
+    fig.update_layout(
+        title=f'{profile.team} {title}',
+        xaxis_title='Match Week',
+        yaxis_title=yaxis_title,
+        height=400
+    )
+    return fig
+
+
+def points_progression(profile):
+    return progression_figure(profile, profile.cumulative_points, 'Points Progression',
+                              'Cumulative Points', 'Points', '#1f77b4')
+
+
+def goal_difference_progression(profile):
+    return progression_figure(profile, profile.cumulative_goal_difference, 'Goal Difference Progression',
+                              'Cumulative Goal Difference', 'Goal Difference', '#ff7f0e')
+
+
+def results_distribution(profile):
+    return px.pie(
+        values=profile.results.values,
+        names=profile.results.index,
+        title=f'{profile.team} Results Distribution',
+        color_discrete_map={'W': '#2ca02c', 'D': '#ff7f0e', 'L': '#d62728'}
+    )
+
+
+def xg_over_time(profile):
+    fig = go.Figure()
+    for values, name, color in ((profile.xg, 'xG', '#2ca02c'), (profile.xga, 'xGA', '#d62728')):
+        fig.add_trace(go.Scatter(
+            x=profile.match_week,
+            y=values,
+            mode='lines+markers',
+            name=name,
+            line=dict(color=color, width=2)
+        ))
+    fig.update_layout(
+        title=f'{profile.team} xG vs xGA Over Time',
+        xaxis_title='Match Week',
+        yaxis_title='Expected Goals',
+        height=400
+    )
+    return fig
+
+
+def venue_points(profile):
+    return px.bar(
+        x=profile.venue_points.index.astype(str),
+        y=profile.venue_points.values,
+        title=f'{profile.team} Points by Venue',
+        color=profile.venue_points.index.astype(str),
+        color_discrete_map={'Home': '#1f77b4', 'Away': '#ff7f0e'}
+    )
+
+
+def venue_goals(profile):
+    goals = profile.venue_goals
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=goals.index.astype(str),
+        y=goals['gf'],
+        name='Goals For',
+        marker_color='#2ca02c'
+    ))
+    fig.add_trace(go.Bar(
+        x=goals.index.astype(str),
+        y=goals['ga'],
+        name='Goals Against',
+        marker_color='#d62728'
+    ))
+    fig.update_layout(
+        title=f'{profile.team} Goals by Venue',
+        xaxis_title='Venue',
+        yaxis_title='Goals',
+        barmode='group',
+        height=400
+    )
+    return fig
+
+
+def comparison_bars(series, title):
+    return px.bar(
+        x=series.index,
+        y=series.values,
+        title=title,
+        color=series.index
+    )
+
+
+def possession_vs_points(season_profile):
+    """Possession vs points scatter with a NumPy least-squares trendline (no statsmodels)"""
+    data = season_profile.possession_points
+    fig = px.scatter(
+        data,
+        x='poss',
+        y='points',
+        text='team',
+        title='Possession vs Points Correlation'
+    )
+    fig.update_traces(textposition="top center")
+    if len(data) > 1:
+        x, y = least_squares_line(data['poss'], data['points'])
+        fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name='OLS trendline', showlegend=False))
+    return fig
+
+
+def formation_performance(profile):
+    fig = px.scatter(
+        profile.formation_performance.assign(formation=lambda frame: frame['formation'].astype(str)),
+        x='xg',
+        y='xga',
+        size='points',
+        text='formation',
+        title=f'{profile.team} Formation Performance',
+        labels={'xg': 'Average xG', 'xga': 'Average xGA', 'points': 'Average Points'}
+    )
+    fig.update_traces(textposition="top center")
+    return fig
+
+
+def season_overlay(curves, teams, metric='points', group='champion', title=None):
+    """Chosen teams' cumulative curves in every season, over a percentile band of a finishing group"""
+    weeks = np.arange(1, curves.weeks + 1)
+    low, median, high = curves.band(group, metric)
+    label = group.replace('_', ' ')
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=weeks, y=high, mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(
+        x=weeks, y=low, mode='lines', line=dict(width=0), fill='tonexty',
+        fillcolor='rgba(31, 119, 180, 0.15)', name=f'{label} p10-p90'
+    ))
+    fig.add_trace(go.Scatter(x=weeks, y=median, mode='lines', name=f'{label} median', line=dict(color='#1f77b4', dash='dash')))
+    for team in teams:
+        team_curves = curves.team_curves(team, metric)
+        for s, season in enumerate(curves.seasons):
+            if np.isnan(team_curves[s]).all():
+                continue
+            fig.add_trace(go.Scatter(x=weeks, y=team_curves[s], mode='lines', name=f'{team} {season}'))
+    fig.update_layout(
+        title=title or f"Cumulative {metric.replace('_', ' ')} by season vs {label} pace",
+        xaxis_title='Match Week',
+        yaxis_title=f"Cumulative {metric.replace('_', ' ').title()}",
+        height=500
+    )
+    return fig
+
+
+TEAM_FIGURES = {
+    'points_progression': points_progression,
+    'goal_difference_progression': goal_difference_progression,
+    'results_distribution': results_distribution,
+    'xg_over_time': xg_over_time,
+    'venue_points': venue_points,
+    'venue_goals': venue_goals,
+    'formation_performance': formation_performance,
+}
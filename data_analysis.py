@@ -4,50 +4,48 @@ Premier League Data Analysis Script
 Quick analysis and insights from final_matches.csv
 """
 
+import argparse
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 
+from ingest import LiveMatchStore
+from instrumentation import timed, trace, write_json_log
+from match_index import as_index
+from match_store import quarantine_path, read_validation
+from report_columns import FORMATS, ReportColumns, decode_results, render
+from standings import build_standings
+from streaming import insight_stats, stream_aggregates, team_venue_totals
+
 def load_and_clean_data():
     """Load and preprocess the Premier League data"""
     print("Loading Premier League data...")
-    df = pd.read_csv('final_matches.csv')
-    
-    # Convert date column
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Create additional features
-    df['goal_difference'] = df['gf'] - df['ga']
-    df['points'] = np.where(df['result'] == 'W', 3, np.where(df['result'] == 'D', 1, 0))
-    df['match_week'] = df['round'].str.extract(r'(\d+)').astype(int)
+    # Includes any matchweeks added with ingest.py since the CSV was last exported
+    df = LiveMatchStore('final_matches.csv').frame
     
     print(f"Data loaded successfully! Shape: {df.shape}")
-    print(f"Seasons: {sorted(df['season'].unique())}")
+    validation = read_validation('final_matches.csv')
+    if validation and validation['quarantined']:
+        print(f"Quarantined {validation['quarantined']} rows that failed validation ({quarantine_path('final_matches.csv')})")
+    print(f"Seasons: {sorted(df['season'].unique().tolist())}")
     print(f"Teams: {len(df['team'].unique())} teams")
     
     return df
 
-def season_summary(df, season=2025):
+@timed('report_season_summary')
+def season_summary(df, season=2025, standings=None):
     """Generate season summary statistics"""
     print(f"\n{'='*50}")
     print(f"SEASON {season} SUMMARY")
     print(f"{'='*50}")
     
-    season_data = df[df['season'] == season]
-    
-    # League table
-    league_table = season_data.groupby('team').agg({
-        'points': 'sum',
-        'gf': 'sum',
-        'ga': 'sum',
-        'result': 'count'
-    }).reset_index()
-    
-    league_table['goal_difference'] = league_table['gf'] - league_table['ga']
-    league_table = league_table.sort_values(['points', 'goal_difference'], ascending=[False, False])
-    league_table['position'] = range(1, len(league_table) + 1)
+    # League table, ordered by points, goal difference, goals scored and head-to-head
+    if standings is None:
+        standings = build_standings(as_index(df).season(season))
+    league_table = standings.table(season)
     
     print("\nTOP 5 TEAMS:")
     print(league_table[['position', 'team', 'points', 'gf', 'ga', 'goal_difference']].head())
@@ -57,175 +55,291 @@ def season_summary(df, season=2025):
     
     return league_table
 
-def team_analysis(df, team_name, season=2025):
-    """Analyze specific team performance"""
+def venue_stats(rows):
+    """Matches, points and goals for a set of rows"""
+    return {
+        'matches': len(rows),
+        'points': int(rows['points'].sum()),
+        'gf': int(rows['gf'].sum()),
+        'ga': int(rows['ga'].sum()),
+    }
+
+# Text templates over ReportColumns names
+PROGRESSION_LINE = "Week {week}: {points} points"
+MATCH_LINE = "{date}: {team} {gf}-{ga} {opponent} ({venue})"
+WEEK_MATCH_LINE = "Week {week}: {team} {gf}-{ga} {opponent} ({venue})"
+RATED_MATCH_LINE = MATCH_LINE + " - pre-match Elo {team_elo:.0f} v {opponent_elo:.0f}"
+
+def team_stats(df, team_name, season=2025):
+    """Team performance figures for a season as plain Python values, or None if there is no data"""
+    team_data = as_index(df).team_season(team_name, season)
+    
+    if len(team_data) == 0:
+        return None
+    
+    stats = venue_stats(team_data)
+    results = team_data['result'].value_counts()
+    avg_xg = float(team_data['xg'].mean())
+    avg_xga = float(team_data['xga'].mean())
+    stats.update({
+        'team': team_name,
+        'season': int(season),
+        'wins': int(results.get('W', 0)),
+        'draws': int(results.get('D', 0)),
+        'losses': int(results.get('L', 0)),
+        'goal_difference': stats['gf'] - stats['ga'],
+        'home': venue_stats(team_data[team_data['venue'] == 'Home']),
+        'away': venue_stats(team_data[team_data['venue'] == 'Away']),
+        'avg_xg': avg_xg,
+        'avg_xga': avg_xga,
+        'xg_difference': avg_xg - avg_xga,
+    })
+    return stats
+
+def trend_columns(df, team_name, season=2025):
+    """Points progression, last five matches and best/worst matches as ReportColumns, or None"""
+    team_data = as_index(df).team_season(team_name, season)
+    
+    if len(team_data) == 0:
+        return None
+    
+    matches = ReportColumns.from_matches(team_data)
+    points = team_data['points'].to_numpy(dtype=np.int64)
+    goal_difference = team_data['goal_difference'].to_numpy()
+    return {
+        'progression': ReportColumns(week=matches['week'], points=np.cumsum(points)),
+        'recent': matches.take(slice(-5, None)),
+        'recent_points': int(points[-5:].sum()),
+        'best': matches.take([int(np.argmax(goal_difference))]),
+        'worst': matches.take([int(np.argmin(goal_difference))]),
+    }
+
+def trend_stats(df, team_name, season=2025):
+    """Points progression, recent form and best/worst matches, or None if there is no data"""
+    trends = trend_columns(df, team_name, season)
+    
+    if trends is None:
+        return None
+    
+    return {
+        'team': team_name,
+        'season': int(season),
+        'progression': trends['progression'].records(),
+        'recent_results': decode_results(trends['recent']['result']).tolist(),
+        'recent_points': trends['recent_points'],
+        'best': trends['best'].records()[0],
+        'worst': trends['worst'].records()[0],
+    }
+
+def head_to_head_columns(df, team1, team2, season=2025):
+    """Matches between two teams, each listed once from team1's perspective, as ReportColumns"""
+    fixtures = as_index(df).fixtures
+    return fixtures.perspective_columns(fixtures.pair_positions(team1, team2, season), team1)
+
+def head_to_head_stats(df, team1, team2, season=2025):
+    """Matches between two teams, each listed once from team1's perspective, as plain Python values"""
+    matches = head_to_head_columns(df, team1, team2, season)
+    return {'team1': team1, 'team2': team2, 'season': int(season), 'matches': matches.records()}
+
+def print_team_stats(team_name, season, stats):
+    """Print team_stats() figures, from the in-memory frame or streamed aggregates"""
     print(f"\n{'='*50}")
     print(f"{team_name.upper()} ANALYSIS - SEASON {season}")
     print(f"{'='*50}")
     
-    team_data = df[(df['team'] == team_name) & (df['season'] == season)]
-    
-    if len(team_data) == 0:
+    if stats is None:
         print(f"No data found for {team_name} in season {season}")
-        return None
+        return
     
     # Basic stats
-    wins = len(team_data[team_data['result'] == 'W'])
-    draws = len(team_data[team_data['result'] == 'D'])
-    losses = len(team_data[team_data['result'] == 'L'])
-    points = team_data['points'].sum()
-    goals_for = team_data['gf'].sum()
-    goals_against = team_data['ga'].sum()
-    
-    print(f"Matches played: {len(team_data)}")
-    print(f"Wins: {wins}, Draws: {draws}, Losses: {losses}")
-    print(f"Points: {points}")
-    print(f"Goals: {goals_for} for, {goals_against} against")
-    print(f"Goal difference: {goals_for - goals_against}")
+    print(f"Matches played: {stats['matches']}")
+    print(f"Wins: {stats['wins']}, Draws: {stats['draws']}, Losses: {stats['losses']}")
+    print(f"Points: {stats['points']}")
+    print(f"Goals: {stats['gf']} for, {stats['ga']} against")
+    print(f"Goal difference: {stats['goal_difference']}")
     
     # Home vs Away
-    home_data = team_data[team_data['venue'] == 'Home']
-    away_data = team_data[team_data['venue'] == 'Away']
-    
-    print(f"\nHOME PERFORMANCE:")
-    print(f"Matches: {len(home_data)}")
-    print(f"Points: {home_data['points'].sum()}")
-    print(f"Goals: {home_data['gf'].sum()} for, {home_data['ga'].sum()} against")
-    
-    print(f"\nAWAY PERFORMANCE:")
-    print(f"Matches: {len(away_data)}")
-    print(f"Points: {away_data['points'].sum()}")
-    print(f"Goals: {away_data['gf'].sum()} for, {away_data['ga'].sum()} against")
+    for venue in ('home', 'away'):
+        print(f"\n{venue.upper()} PERFORMANCE:")
+        print(f"Matches: {stats[venue]['matches']}")
+        print(f"Points: {stats[venue]['points']}")
+        print(f"Goals: {stats[venue]['gf']} for, {stats[venue]['ga']} against")
     
     # xG analysis
-    avg_xg = team_data['xg'].mean()
-    avg_xga = team_data['xga'].mean()
     print(f"\nEXPECTED GOALS:")
-    print(f"Average xG: {avg_xg:.2f}")
-    print(f"Average xGA: {avg_xga:.2f}")
-    print(f"xG difference: {avg_xg - avg_xga:.2f}")
+    print(f"Average xG: {stats['avg_xg']:.2f}")
+    print(f"Average xGA: {stats['avg_xga']:.2f}")
+    print(f"xG difference: {stats['xg_difference']:.2f}")
+
+@timed('report_team')
+def team_analysis(df, team_name, season=2025):
+    """Analyze specific team performance"""
+    stats = team_stats(df, team_name, season)
+    print_team_stats(team_name, season, stats)
+    
+    if stats is None:
+        return None
     
-    return team_data
+    return as_index(df).team_season(team_name, season)
 
-def performance_trends(df, team_name, season=2025):
+@timed('report_trends')
+def performance_trends(df, team_name, season=2025, fmt='text'):
     """Analyze performance trends over the season"""
     print(f"\n{'='*50}")
     print(f"{team_name.upper()} PERFORMANCE TRENDS - SEASON {season}")
     print(f"{'='*50}")
     
-    team_data = df[(df['team'] == team_name) & (df['season'] == season)].sort_values('match_week')
+    trends = trend_columns(df, team_name, season)
     
-    if len(team_data) == 0:
+    if trends is None:
         print(f"No data found for {team_name} in season {season}")
         return
     
     # Points progression
-    cumulative_points = team_data['points'].cumsum()
     print("\nPOINTS PROGRESSION:")
-    for i, (week, points) in enumerate(zip(team_data['match_week'], cumulative_points)):
-        print(f"Week {week}: {points} points")
+    print(render(trends['progression'], fmt, PROGRESSION_LINE))
     
     # Recent form (last 5 matches)
-    recent_matches = team_data.tail(5)
-    recent_results = recent_matches['result'].tolist()
-    recent_points = recent_matches['points'].sum()
-    
     print(f"\nRECENT FORM (Last 5 matches):")
-    print(f"Results: {' - '.join(recent_results)}")
-    print(f"Points: {recent_points}/15")
+    print(f"Results: {' - '.join(decode_results(trends['recent']['result']))}")
+    print(f"Points: {trends['recent_points']}/15")
     
     # Best and worst performances
-    best_match = team_data.loc[team_data['goal_difference'].idxmax()]
-    worst_match = team_data.loc[team_data['goal_difference'].idxmin()]
-    
-    print(f"\nBEST PERFORMANCE:")
-    print(f"Week {best_match['match_week']}: {best_match['team']} {best_match['gf']}-{best_match['ga']} {best_match['opponent']} ({best_match['venue']})")
-    
-    print(f"\nWORST PERFORMANCE:")
-    print(f"Week {worst_match['match_week']}: {worst_match['team']} {worst_match['gf']}-{worst_match['ga']} {worst_match['opponent']} ({worst_match['venue']})")
+    for label, key in (('BEST', 'best'), ('WORST', 'worst')):
+        print(f"\n{label} PERFORMANCE:")
+        print(render(trends[key], 'text', WEEK_MATCH_LINE))
 
-def head_to_head_analysis(df, team1, team2, season=2025):
+@timed('report_head_to_head')
+def head_to_head_analysis(df, team1, team2, season=2025, fmt='text'):
     """Analyze head-to-head performance between two teams"""
     print(f"\n{'='*50}")
     print(f"HEAD-TO-HEAD: {team1.upper()} vs {team2.upper()} - SEASON {season}")
     print(f"{'='*50}")
     
-    # Find matches between these teams
-    matches = df[
-        ((df['team'] == team1) & (df['opponent'] == team2)) |
-        ((df['team'] == team2) & (df['opponent'] == team1))
-    ]
-    
-    matches = matches[matches['season'] == season]
+    # Find matches between these teams, one row per fixture
+    matches = head_to_head_columns(df, team1, team2, season)
     
     if len(matches) == 0:
         print(f"No matches found between {team1} and {team2} in season {season}")
         return
     
     print(f"Matches found: {len(matches)}")
-    
-    for _, match in matches.iterrows():
-        if match['team'] == team1:
-            print(f"{match['date'].strftime('%Y-%m-%d')}: {team1} {match['gf']}-{match['ga']} {team2} ({match['venue']})")
-        else:
-            print(f"{match['date'].strftime('%Y-%m-%d')}: {team2} {match['gf']}-{match['ga']} {team1} ({match['venue']})")
+    print(render(matches, fmt, RATED_MATCH_LINE if 'team_elo' in matches else MATCH_LINE))
 
-def generate_insights(df):
-    """Generate general insights from the data"""
+def print_insights(season, insights):
+    """Print insight_stats() figures, from the in-memory frame or streamed aggregates"""
     print(f"\n{'='*50}")
     print("GENERAL INSIGHTS")
     print(f"{'='*50}")
     
-    # Most recent season
-    latest_season = df['season'].max()
-    season_data = df[df['season'] == latest_season]
-    
-    # Highest scoring team
-    highest_scoring = season_data.groupby('team')['gf'].sum().idxmax()
-    highest_goals = season_data.groupby('team')['gf'].sum().max()
-    
-    # Best defensive team
-    best_defense = season_data.groupby('team')['ga'].sum().idxmin()
-    fewest_goals = season_data.groupby('team')['ga'].sum().min()
-    
-    # Most possession
-    highest_possession = season_data.groupby('team')['poss'].mean().idxmax()
-    avg_possession = season_data.groupby('team')['poss'].mean().max()
-    
-    print(f"Season {latest_season} Insights:")
-    print(f"Highest scoring team: {highest_scoring} ({highest_goals} goals)")
-    print(f"Best defensive team: {best_defense} ({fewest_goals} goals conceded)")
-    print(f"Highest average possession: {highest_possession} ({avg_possession:.1f}%)")
+    print(f"Season {season} Insights:")
+    print(f"Highest scoring team: {insights['highest_scoring']} ({insights['highest_goals']} goals)")
+    print(f"Best defensive team: {insights['best_defense']} ({insights['fewest_goals']} goals conceded)")
+    print(f"Highest average possession: {insights['highest_possession']} ({insights['avg_possession']:.1f}%)")
     
     # Home advantage analysis
-    home_points = season_data[season_data['venue'] == 'Home']['points'].sum()
-    away_points = season_data[season_data['venue'] == 'Away']['points'].sum()
-    total_matches = len(season_data)
+    home_points = insights['home_points']
+    away_points = insights['away_points']
+    total_matches = insights['total_matches']
     
     print(f"\nHome advantage:")
     print(f"Home points: {home_points} ({home_points/total_matches:.1f} per match)")
     print(f"Away points: {away_points} ({away_points/total_matches:.1f} per match)")
 
+@timed('report_insights')
+def generate_insights(df):
+    """Generate general insights from the data"""
+    # Most recent season
+    index = as_index(df)
+    latest_season = max(index.seasons)
+    
+    # Same per-team totals the streaming mode merges chunk by chunk
+    insights = insight_stats(team_venue_totals(index.season(latest_season)))
+    print_insights(latest_season, insights)
+    return insights
+
+def stream_analysis(source, team_name, season=None, workers=None):
+    """Insights, season summary and team figures from chunked aggregates, without loading the full table"""
+    print(f"Streaming match data from {source}...")
+    aggregates = stream_aggregates(source, workers=workers or 1)
+    seasons = aggregates.season_keys()
+    print(f"Seasons: {seasons}")
+    
+    latest_season = max(seasons)
+    print_insights(latest_season, aggregates.insights(latest_season))
+    
+    season = season or latest_season
+    season_summary(None, season, standings=aggregates)
+    print_team_stats(team_name, season, aggregates.team_stats(team_name, season))
+    return aggregates
+
 def main():
     """Main analysis function"""
+    parser = argparse.ArgumentParser(description='Premier League data analysis')
+    parser.add_argument('--team', default='Arsenal', help='team to analyse')
+    parser.add_argument('--opponent', default='Manchester City', help='head-to-head opponent')
+    parser.add_argument('--season', type=int, default=2025, help='season to analyse')
+    parser.add_argument('--batch', metavar='OUTPUT_DIR',
+                        help='write JSON/Markdown reports for every team and season instead')
+    parser.add_argument('--stream', metavar='SOURCE',
+                        help='summarise a match CSV or partition directory chunk by chunk, with bounded memory')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes for --batch/--stream')
+    parser.add_argument('--format', choices=FORMATS, default='text',
+                        help='format of the progression and head-to-head tables')
+    parser.add_argument('--timings', action='store_true', help='print a per-stage timing breakdown at the end')
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help='append stage latency histograms and cache counters to this JSON-lines log')
+    args = parser.parse_args()
+    
+    with trace() as run:
+        run_analysis(args)
+    
+    if args.timings:
+        print_timings(run)
+    if args.metrics_json:
+        write_json_log(args.metrics_json, command='data_analysis', argv=vars(args))
+
+def print_timings(run):
+    """Print the stages of one run, slowest first"""
+    stages, caches = run.breakdown()
+    print(f"\n{'='*50}")
+    print("TIMINGS")
+    print(f"{'='*50}")
+    for row in stages:
+        print(f"{row['stage']:<28} {row['calls']:>5} calls {row['total_ms']:>10.1f} ms")
+    for name, count in caches.items():
+        print(f"{name:<28} {count:>5}")
+
+def run_analysis(args):
+    """Run the reports selected by the command line"""
+    if args.stream:
+        stream_analysis(args.stream, args.team, args.season, args.workers)
+        return
+    
+    if args.batch:
+        from batch_reports import generate_reports
+        written = generate_reports(args.batch, workers=args.workers)
+        print(f"Wrote {len(written)} report files to {args.batch}")
+        return
+    
     print("⚽ PREMIER LEAGUE DATA ANALYSIS")
     print("="*50)
     
-    # Load data
-    df = load_and_clean_data()
+    # Load data and index it once for every report below
+    df = as_index(load_and_clean_data())
     
     # Generate insights
     generate_insights(df)
     
     # Season summary
-    season_summary(df, 2025)
+    season_summary(df, args.season)
     
-    # Team analysis (example with Arsenal)
-    team_analysis(df, 'Arsenal', 2025)
-    performance_trends(df, 'Arsenal', 2025)
+    # Team analysis (Arsenal unless --team is given)
+    team_analysis(df, args.team, args.season)
+    performance_trends(df, args.team, args.season, args.format)
     
     # Head-to-head analysis
-    head_to_head_analysis(df, 'Arsenal', 'Manchester City', 2025)
+    head_to_head_analysis(df, args.team, args.opponent, args.season, args.format)
     
     print(f"\n{'='*50}")
     print("ANALYSIS COMPLETE!")
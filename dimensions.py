@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Interned dimension tables
+Captain, referee and formation strings as small integer IDs with lookup tables, and the
+analyses built on them: results by captain, referee home bias and formation matchups
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from report_columns import result_codes
+
+# Column -> dimension table; both formation columns share one table so their IDs line up
+DIMENSION_COLUMNS = {
+    'captain': 'captain',
+    'referee': 'referee',
+    'formation': 'formation',
+    'opp formation': 'formation',
+}
+
+
+class DimensionTable:
+    """Sorted distinct values of a dimension; ID i is values[i], -1 is missing"""
+
+    def __init__(self, values):
+        self.values = np.asarray(sorted({str(value) for value in values}), dtype=object)
+        self.ids = {value: i for i, value in enumerate(self.values)}
+        self.dtype = np.int8 if len(self.values) < 2 ** 7 else np.int16 if len(self.values) < 2 ** 15 else np.int32
+
+    def __len__(self):
+        return len(self.values)
+
+    def id(self, value):
+        """ID of a value, or -1 if the table does not hold it"""
+        return self.ids.get(value, -1)
+
+    def intern(self, column):
+        """IDs of a column, mapping each distinct value once through the column's categories"""
+        column = column.astype('category') if not hasattr(column, 'cat') else column
+        lookup = np.asarray([self.id(str(value)) for value in column.cat.categories], dtype=self.dtype)
+        codes = column.cat.codes.to_numpy()
+        return np.where(codes >= 0, lookup[codes], -1).astype(self.dtype)
+
+    def lookup(self, ids):
+        """Values of an ID array (None for -1)"""
+        ids = np.asarray(ids)
+        return np.where(ids >= 0, self.values[np.maximum(ids, 0)], None)
+
+
+def _category_values(column):
+    return column.cat.categories if hasattr(column, 'cat') else column.dropna().unique()
+
+
+def _outcome_counts(key, results, size):
+    """Matches, wins, draws and losses per key via bincount"""
+    matches = np.bincount(key, minlength=size)
+    wins = np.bincount(key, weights=results == 1, minlength=size).astype(np.int64)
+    draws = np.bincount(key, weights=results == 0, minlength=size).astype(np.int64)
+    return matches, wins, draws, matches - wins - draws
+
+
+class DimensionStore:
+    """Interned ID columns for the dimension strings plus the integer match columns the analyses use"""
+
+    @timed('dimension_tables')
+    def __init__(self, df):
+        values = {}
+        for column, table in DIMENSION_COLUMNS.items():
+            values.setdefault(table, set()).update(str(value) for value in _category_values(df[column]))
+        self.tables = {table: DimensionTable(table_values) for table, table_values in values.items()}
+        self.ids = {column: self.tables[table].intern(df[column]) for column, table in DIMENSION_COLUMNS.items()}
+
+        teams = df['team'].astype('category')
+        self.teams = DimensionTable(teams.cat.categories)
+        self.ids['team'] = self.teams.intern(teams)
+        self.season = df['season'].to_numpy(dtype=np.int16)
+        self.home = (df['venue'] == 'Home').to_numpy()
+        self.result = result_codes(df['result'])
+        self.points = df['points'].to_numpy(dtype=np.int8)
+        self.goal_difference = df['goal_difference'].to_numpy(dtype=np.int8)
+        self.source_bytes = int(df[list(DIMENSION_COLUMNS)].astype(object).memory_usage(index=False, deep=True).sum())
+
+    def __len__(self):
+        return len(self.season)
+
+    def memory_usage(self):
+        """Bytes of the dimension columns as Python strings versus ID arrays plus lookup tables"""
+        interned = sum(ids.nbytes for column, ids in self.ids.items() if column in DIMENSION_COLUMNS)
+        tables = sum(int(pd.Series(table.values).memory_usage(index=False, deep=True)) for table in self.tables.values())
+        return {'strings': self.source_bytes, 'interned': interned + tables}
+
+    def mask(self, season=None, team=None):
+        """Rows of the given season(s) and team"""
+        keep = np.ones(len(self), dtype=bool)
+        if season is not None:
+            keep &= np.isin(self.season, np.atleast_1d(season))
+        if team is not None:
+            keep &= self.ids['team'] == self.teams.id(team)
+        return keep
+
+    @timed('captain_results')
+    def captain_results(self, season=None, team=None, min_matches=1):
+        """W/D/L, points per game and win rate of every (team, captain), most matches first"""
+        keep = self.mask(season, team) & (self.ids['captain'] >= 0)
+        n_captains = len(self.tables['captain'])
+        key = self.ids['team'][keep].astype(np.int64) * n_captains + self.ids['captain'][keep]
+        size = len(self.teams) * n_captains
+        matches, wins, draws, losses = _outcome_counts(key, self.result[keep], size)
+        points = np.bincount(key, weights=self.points[keep], minlength=size)
+
+        cells = np.flatnonzero(matches >= max(min_matches, 1))
+        result = pd.DataFrame({
+            'team': self.teams.values[cells // n_captains],
+            'captain': self.tables['captain'].values[cells % n_captains],
+            'matches': matches[cells],
+            'wins': wins[cells],
+            'draws': draws[cells],
+            'losses': losses[cells],
+            'points_per_game': points[cells] / matches[cells],
+            'win_rate': wins[cells] / matches[cells],
+        })
+        return result.sort_values(['matches', 'points_per_game'], ascending=False, kind='stable', ignore_index=True)
+
+    @timed('referee_home_bias')
+    def referee_home_bias(self, season=None, min_matches=1):
+        """Home-side outcomes per referee against the league-wide home record, each match counted once
+
+        home_bias is the referee's home points per match minus the league's over the
+        same rows; a positive value means home sides did better with this referee.
+        """
+        keep = self.mask(season) & self.home & (self.ids['referee'] >= 0)
+        key = self.ids['referee'][keep].astype(np.int64)
+        size = len(self.tables['referee'])
+        matches, home_wins, draws, away_wins = _outcome_counts(key, self.result[keep], size)
+        home_points = np.bincount(key, weights=self.points[keep], minlength=size)
+        goal_difference = np.bincount(key, weights=self.goal_difference[keep], minlength=size)
+        league_home_ppg = self.points[keep].mean() if keep.any() else np.nan
+
+        cells = np.flatnonzero(matches >= max(min_matches, 1))
+        result = pd.DataFrame({
+            'referee': self.tables['referee'].values[cells],
+            'matches': matches[cells],
+            'home_wins': home_wins[cells],
+            'draws': draws[cells],
+            'away_wins': away_wins[cells],
+            'home_win_rate': home_wins[cells] / matches[cells],
+            'home_points_per_match': home_points[cells] / matches[cells],
+            'home_goal_difference': goal_difference[cells] / matches[cells],
+        })
+        result['home_bias'] = result['home_points_per_match'] - league_home_ppg
+        return result.sort_values('home_bias', ascending=False, kind='stable', ignore_index=True)
+
+    @timed('formation_matchups')
+    def formation_matchups(self, season=None, team=None, min_matches=1):
+        """Win/draw/loss rates of each formation against each opposition formation"""
+        keep = self.mask(season, team) & (self.ids['formation'] >= 0) & (self.ids['opp formation'] >= 0)
+        n_formations = len(self.tables['formation'])
+        key = self.ids['formation'][keep].astype(np.int64) * n_formations + self.ids['opp formation'][keep]
+        size = n_formations * n_formations
+        matches, wins, draws, losses = _outcome_counts(key, self.result[keep], size)
+        points = np.bincount(key, weights=self.points[keep], minlength=size)
+
+        cells = np.flatnonzero(matches >= max(min_matches, 1))
+        formations = self.tables['formation'].values
+        result = pd.DataFrame({
+            'formation': formations[cells // n_formations],
+            'opp formation': formations[cells % n_formations],
+            'matches': matches[cells],
+            'win_rate': wins[cells] / matches[cells],
+            'draw_rate': draws[cells] / matches[cells],
+            'loss_rate': losses[cells] / matches[cells],
+            'points_per_game': points[cells] / matches[cells],
+        })
+        return result.sort_values(['matches', 'win_rate'], ascending=False, kind='stable', ignore_index=True)
+
+
+def main():
+    """Print one of the dimension analyses"""
+    from match_store import DATA_FILE, load_matches
+
+    parser = argparse.ArgumentParser(description='Captain, referee and formation-matchup analyses')
+    parser.add_argument('analysis', choices=['captains', 'referees', 'matchups', 'memory'])
+    parser.add_argument('--season', type=int, action='append', help='only these seasons')
+    parser.add_argument('--team', default=None, help='only this team (captains, matchups)')
+    parser.add_argument('--min-matches', type=int, default=1, help='hide groups with fewer matches')
+    parser.add_argument('--top', type=int, default=20, help='rows to print')
+    parser.add_argument('--data', default=DATA_FILE, help='source match CSV')
+    args = parser.parse_args()
+
+    store = DimensionStore(load_matches(args.data))
+    if args.analysis == 'memory':
+        usage = store.memory_usage()
+        print(f"Dimension strings: {usage['strings'] / 1024:.1f} KiB, interned: {usage['interned'] / 1024:.1f} KiB")
+        return
+    if args.analysis == 'captains':
+        result = store.captain_results(args.season, args.team, args.min_matches)
+    elif args.analysis == 'referees':
+        result = store.referee_home_bias(args.season, args.min_matches)
+    else:
+        result = store.formation_matchups(args.season, args.team, args.min_matches)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(result.head(args.top).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
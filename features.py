@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Rolling form features for the Premier League match table
+Rolling-window and exponentially weighted means per (team, season), computed in batched NumPy passes
+"""
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+
+FORM_METRICS = ['xg', 'xga', 'gf', 'ga', 'sh', 'sot', 'poss', 'points']
+ROLLING_WINDOWS = (3, 5, 10)
+EWM_SPANS = (5,)
+GROUP_COLUMNS = ['team', 'season']
+# Form follows the order matches were played in, so rescheduled matches count from their actual date
+SORT_COLUMNS = ['team', 'season', 'date', 'match_week']
+
+
+def rolling_means(values, group_start, window):
+    """Trailing mean over `window` rows that never reaches back past the row's group start
+
+    Missing values are skipped, matching pandas' rolling(window, min_periods=1).mean().
+    """
+    valid = ~np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    sums = np.vstack([zeros, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.vstack([zeros, np.cumsum(valid, axis=0)])
+    rows = np.arange(len(values))
+    low = np.maximum(rows - window + 1, group_start)
+    window_counts = counts[rows + 1] - counts[low]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (sums[rows + 1] - sums[low]) / window_counts
+    means[window_counts == 0] = np.nan
+    return means
+
+
+def ewm_means(values, group_id, position, span, numerator, denominator):
+    """Exponentially weighted means (adjust=True) per group, seeded from running totals
+
+    Steps through the rows one group position at a time, so the Python loop runs
+    once per matchweek rather than once per row. numerator and denominator are
+    updated in place and hold the running state for the next append.
+    """
+    decay = 1.0 - 2.0 / (span + 1.0)
+    means = np.full(values.shape, np.nan)
+    order = np.argsort(position, kind='stable')
+    steps = np.bincount(position, minlength=1)
+    for rows in np.split(order, np.cumsum(steps)[:-1]):
+        groups = group_id[rows]
+        x = values[rows]
+        valid = ~np.isnan(x)
+        numerator[groups] = numerator[groups] * decay + np.where(valid, x, 0.0)
+        denominator[groups] = denominator[groups] * decay + valid
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[rows] = numerator[groups] / denominator[groups]
+    return means
+
+
+class FormFeaturePipeline:
+    """Rolling and EWM form features with append-only incremental updates
+
+    The pipeline keeps, per (team, season), the last max(windows) - 1 rows of
+    each metric and the EWM running totals, so appending new matches only
+    touches the groups they belong to.
+    """
+
+    def __init__(self, metrics=FORM_METRICS, windows=ROLLING_WINDOWS, ewm_spans=EWM_SPANS):
+        self.metrics = list(metrics)
+        self.windows = tuple(windows)
+        self.ewm_spans = tuple(ewm_spans)
+        self.history = max(self.windows) - 1 if self.windows else 0
+        self.reset()
+
+    @property
+    def feature_names(self):
+        names = [f'rolling_{metric}_{window}' for window in self.windows for metric in self.metrics]
+        names += [f'ewm_{metric}_{span}' for span in self.ewm_spans for metric in self.metrics]
+        return names
+
+    def reset(self):
+        """Forget all per-group state"""
+        n_metrics = len(self.metrics)
+        self.group_ids = {}
+        self.tail = np.empty((0, self.history, n_metrics))
+        self.ewm_state = {span: (np.empty((0, n_metrics)), np.empty((0, n_metrics))) for span in self.ewm_spans}
+
+    def _group_codes(self, rows):
+        """Map each row to a persistent group id, allocating state for unseen groups"""
+        keys = pd.MultiIndex.from_arrays([rows[column].astype(str) for column in GROUP_COLUMNS])
+        codes, uniques = pd.factorize(keys)
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        for i, key in enumerate(uniques):
+            lookup[i] = self.group_ids.setdefault(key, len(self.group_ids))
+
+        n_new = len(self.group_ids) - len(self.tail)
+        if n_new:
+            n_metrics = len(self.metrics)
+            self.tail = np.concatenate([self.tail, np.full((n_new, self.history, n_metrics), np.nan)])
+            for span, (numerator, denominator) in self.ewm_state.items():
+                self.ewm_state[span] = (
+                    np.concatenate([numerator, np.zeros((n_new, n_metrics))]),
+                    np.concatenate([denominator, np.zeros((n_new, n_metrics))]),
+                )
+        return lookup[codes]
+
+    @timed('form_features')
+    def fit_transform(self, df):
+        """Compute features for the whole table, replacing any previous state"""
+        self.reset()
+        return self.append(df)
+
+    @timed('form_features_replace')
+    def replace(self, rows):
+        """Recompute features for complete team-seasons (e.g. after a late result), discarding their state"""
+        if len(rows):
+            groups = np.unique(self._group_codes(rows))
+            self.tail[groups] = np.nan
+            for numerator, denominator in self.ewm_state.values():
+                numerator[groups] = 0.0
+                denominator[groups] = 0.0
+        return self.append(rows)
+
+    @timed('form_features_append')
+    def append(self, rows):
+        """Compute features for new rows that follow the existing matches of their team-season"""
+        if len(rows) == 0:
+            return pd.DataFrame(index=rows.index, columns=self.feature_names, dtype='float32')
+
+        rows = rows.sort_values(SORT_COLUMNS, kind='stable')
+        group_id = self._group_codes(rows)
+        values = rows[self.metrics].to_numpy(dtype=np.float64)
+
+        # Position of each new row within its group's new rows
+        order = np.argsort(group_id, kind='stable')
+        sorted_groups = group_id[order]
+        affected, first, counts = np.unique(sorted_groups, return_index=True, return_counts=True)
+        position = np.empty(len(rows), dtype=np.int64)
+        position[order] = np.arange(len(rows)) - np.repeat(first, counts)
+
+        # Lay out [stored tail | new rows] per affected group and run the window kernel over it
+        block_sizes = self.history + counts
+        block_offsets = np.concatenate([[0], np.cumsum(block_sizes)[:-1]])
+        block = np.empty((block_sizes.sum(), len(self.metrics)))
+        tail_rows = (block_offsets[:, None] + np.arange(self.history)).ravel()
+        block[tail_rows] = self.tail[affected].reshape(-1, len(self.metrics))
+        affected_index = np.searchsorted(affected, group_id)
+        new_rows = block_offsets[affected_index] + self.history + position
+        block[new_rows] = values
+        block_start = np.repeat(block_offsets, block_sizes)
+
+        columns = [rolling_means(block, block_start, window)[new_rows] for window in self.windows]
+        for span, (numerator, denominator) in self.ewm_state.items():
+            columns.append(ewm_means(values, group_id, position, span, numerator, denominator))
+
+        # Keep the last `history` rows of each affected group for the next append
+        keep = (block_offsets[:, None] + counts[:, None] + np.arange(self.history)).ravel()
+        self.tail[affected] = block[keep].reshape(len(affected), self.history, len(self.metrics))
+
+        features = pd.DataFrame(
+            np.hstack(columns).astype(np.float32),
+            index=rows.index,
+            columns=self.feature_names,
+        )
+        return features
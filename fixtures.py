@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Canonical fixture table
+One row per match, built by pairing the two perspective rows of final_matches.csv with a
+vectorized self-join on (date, team, opponent), plus a report of pairs that disagree
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from match_index import _runs
+from report_columns import ReportColumns, encode_results, format_dates
+
+FIXTURE_COLUMNS = [
+    'date', 'season', 'match_week', 'home_id', 'away_id', 'home', 'away',
+    'home_goals', 'away_goals', 'home_xg', 'away_xg', 'home_row', 'away_row',
+]
+MIRRORED_RESULTS = {'W': 'L', 'D': 'D', 'L': 'W'}
+XG_TOLERANCE = 1e-3
+
+
+def team_codes(df):
+    """Codes of team and opponent_team in one shared, sorted team list"""
+    teams = df['team'].cat.categories.union(df['opponent_team'].cat.categories)
+    team = teams.get_indexer(df['team'].cat.categories)[df['team'].cat.codes.to_numpy()]
+    opponent = teams.get_indexer(df['opponent_team'].cat.categories)[df['opponent_team'].cat.codes.to_numpy()]
+    return teams, team.astype(np.int32), opponent.astype(np.int32)
+
+
+class FixtureTable:
+    """One row per match with home/away team IDs and the positions of its perspective rows
+
+    home_row/away_row index the source frame (-1 when that side's row is missing);
+    a match with a single perspective row still becomes a fixture, oriented by its venue.
+    """
+
+    @timed('fixture_table')
+    def __init__(self, df):
+        self.source = df
+        self.teams, team, opponent = team_codes(df)
+        n = len(df)
+        rows = pd.DataFrame({
+            'date': df['date'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+            'team': team,
+            'opponent': opponent,
+            'row': np.arange(n),
+        })
+
+        # A repeated (date, team, opponent) row would pair with everything; keep the first
+        repeated = rows.duplicated(['date', 'team', 'opponent']).to_numpy()
+        self.duplicate_rows = np.flatnonzero(repeated)
+        rows = rows[~repeated]
+
+        mirror = rows.rename(columns={'team': 'opponent', 'opponent': 'team', 'row': 'other'})
+        pairs = rows.merge(mirror, on=['date', 'team', 'opponent'], how='left', sort=False)
+        row = pairs['row'].to_numpy()
+        other = pairs['other'].fillna(-1).to_numpy(dtype=np.int64)
+
+        is_home = (df['venue'] == 'Home').to_numpy()
+        paired = other >= 0
+        row_home = is_home[row]
+        same_venue = paired & (row_home == is_home[np.where(paired, other, 0)])
+        # The home side anchors each fixture; if both rows claim the same venue, the lower row does
+        anchor = np.where(same_venue, row < other, row_home | ~paired)
+        row, other = row[anchor], other[anchor]
+        # A same-venue pair is oriented with its anchor at home
+        row_is_home = row_home[anchor] | same_venue[anchor]
+
+        home_row = np.where(row_is_home, row, other)
+        away_row = np.where(row_is_home, other, row)
+        # Values come from the home row when present, else from the away row with sides swapped
+        from_home = home_row >= 0
+        source = np.where(from_home, home_row, away_row)
+
+        def pick(home_column, away_column):
+            home_values = df[home_column].to_numpy()[source]
+            away_values = df[away_column].to_numpy()[source]
+            return np.where(from_home, home_values, away_values), np.where(from_home, away_values, home_values)
+
+        home_id, away_id = np.where(from_home, team[source], opponent[source]), np.where(from_home, opponent[source], team[source])
+        home_goals, away_goals = pick('gf', 'ga')
+        home_xg, away_xg = pick('xg', 'xga')
+        frame = pd.DataFrame({
+            'date': df['date'].to_numpy()[source],
+            'season': df['season'].to_numpy()[source],
+            'match_week': df['match_week'].to_numpy()[source],
+            'home_id': home_id.astype(np.int32),
+            'away_id': away_id.astype(np.int32),
+            'home': pd.Categorical.from_codes(home_id, categories=self.teams),
+            'away': pd.Categorical.from_codes(away_id, categories=self.teams),
+            'home_goals': home_goals,
+            'away_goals': away_goals,
+            'home_xg': home_xg,
+            'away_xg': away_xg,
+            'home_row': home_row,
+            'away_row': away_row,
+        }, columns=FIXTURE_COLUMNS)
+        from ratings import RATING_COLUMNS  # ratings.py rates this table
+        # Copied onto the fixture from whichever perspective row carries them
+        if all(column in df for column in RATING_COLUMNS):
+            frame['home_elo'], frame['away_elo'] = pick('elo', 'opponent_elo')
+        self.frame = frame.sort_values(['date', 'home_id'], kind='stable', ignore_index=True)
+
+        # Fixture positions per unordered team pair, for head-to-head lookups
+        low = np.minimum(self.frame['home_id'], self.frame['away_id']).to_numpy()
+        high = np.maximum(self.frame['home_id'], self.frame['away_id']).to_numpy()
+        order = np.lexsort((np.arange(len(low)), high, low))
+        starts, stops = _runs(low[order], high[order])
+        self.pair_fixtures = {(low[order[start]], high[order[start]]): order[start:stop] for start, stop in zip(starts, stops)}
+        self._report_arrays = None
+
+    def __len__(self):
+        return len(self.frame)
+
+    def team_id(self, team):
+        position = self.teams.get_indexer([team])[0]
+        return int(position)
+
+    def pair_positions(self, team1, team2, season=None):
+        """Positions of the fixtures between two teams, in date order"""
+        first, second = self.team_id(team1), self.team_id(team2)
+        positions = self.pair_fixtures.get((min(first, second), max(first, second)), np.empty(0, dtype=np.int64))
+        if season is not None:
+            positions = positions[self.report_arrays['season'][positions] == season]
+        return positions
+
+    @property
+    def report_arrays(self):
+        """Whole-table NumPy columns for report lookups, with dates formatted once"""
+        if self._report_arrays is None:
+            frame = self.frame
+            arrays = {
+                'season': frame['season'].to_numpy(),
+                'week': frame['match_week'].to_numpy(dtype=np.int64),
+                'date': format_dates(frame['date'].to_numpy()),
+                'home_id': frame['home_id'].to_numpy(),
+                'away_id': frame['away_id'].to_numpy(),
+                'home_goals': frame['home_goals'].to_numpy(dtype=np.int64),
+                'away_goals': frame['away_goals'].to_numpy(dtype=np.int64),
+            }
+            if 'home_elo' in frame:
+                arrays['home_elo'] = np.round(frame['home_elo'].to_numpy(dtype=np.float64), 1)
+                arrays['away_elo'] = np.round(frame['away_elo'].to_numpy(dtype=np.float64), 1)
+            self._report_arrays = arrays
+        return self._report_arrays
+
+    def perspective_columns(self, positions, team):
+        """The fixtures at positions seen from team's side (names, venue, gf/ga and, if rated, pre-match Elo) as ReportColumns"""
+        arrays = self.report_arrays
+        names = np.asarray(self.teams, dtype=object)
+        at_home = arrays['home_id'][positions] == self.team_id(team)
+
+        def side(home_column, away_column):
+            return np.where(at_home, arrays[home_column][positions], arrays[away_column][positions])
+
+        gf, ga = side('home_goals', 'away_goals'), side('away_goals', 'home_goals')
+        columns = {
+            'week': arrays['week'][positions],
+            'date': arrays['date'][positions],
+            'team': names[side('home_id', 'away_id')],
+            'opponent': names[side('away_id', 'home_id')],
+            'venue': np.where(at_home, 'Home', 'Away'),
+            'gf': gf,
+            'ga': ga,
+            'result': encode_results(gf, ga),
+        }
+        if 'home_elo' in arrays:
+            columns['team_elo'] = side('home_elo', 'away_elo')
+            columns['opponent_elo'] = side('away_elo', 'home_elo')
+        return ReportColumns(**columns)
+
+    def mismatches(self):
+        """Perspective rows that disagree with their counterpart, lack one, or repeat another
+
+        One row per problem, with the fixture's date, teams and the source row positions.
+        """
+        df = self.source
+        fixtures = self.frame
+        home_row = fixtures['home_row'].to_numpy()
+        away_row = fixtures['away_row'].to_numpy()
+        paired = (home_row >= 0) & (away_row >= 0)
+        h, a = home_row[paired], away_row[paired]
+
+        def values(column):
+            return df[column].to_numpy()[h], df[column].to_numpy()[a]
+
+        home_gf, away_gf = values('gf')
+        home_ga, away_ga = values('ga')
+        home_xg, away_xg = values('xg')
+        home_xga, away_xga = values('xga')
+        home_result, away_result = (np.asarray(column.astype(str)) for column in (df['result'].iloc[h], df['result'].iloc[a]))
+        home_venue, away_venue = (np.asarray(column.astype(str)) for column in (df['venue'].iloc[h], df['venue'].iloc[a]))
+        mirrored = pd.Series(home_result).map(MIRRORED_RESULTS).to_numpy()
+
+        checks = {
+            'home gf != away ga': home_gf != away_ga,
+            'home ga != away gf': home_ga != away_gf,
+            'home xg != away xga': ~np.isclose(home_xg, away_xga, atol=XG_TOLERANCE, equal_nan=True),
+            'home xga != away xg': ~np.isclose(home_xga, away_xg, atol=XG_TOLERANCE, equal_nan=True),
+            'results do not mirror': mirrored != away_result,
+            'both rows have the same venue': home_venue == away_venue,
+        }
+        paired_fixtures = np.flatnonzero(paired)
+        problems = [
+            pd.DataFrame({'fixture': paired_fixtures[failed], 'problem': problem})
+            for problem, failed in ((problem, np.flatnonzero(mask)) for problem, mask in checks.items())
+            if len(failed)
+        ]
+        unpaired = np.flatnonzero(~paired)
+        if len(unpaired):
+            problems.append(pd.DataFrame({'fixture': unpaired, 'problem': 'missing counterpart row'}))
+
+        report = pd.concat(problems, ignore_index=True) if problems else pd.DataFrame({'fixture': [], 'problem': []})
+        report = fixtures.iloc[report['fixture'].to_numpy(dtype=np.int64)][
+            ['date', 'season', 'home', 'away', 'home_row', 'away_row']
+        ].reset_index(drop=True).assign(problem=report['problem'].to_numpy())
+
+        if len(self.duplicate_rows):
+            duplicates = df.iloc[self.duplicate_rows]
+            report = pd.concat([report, pd.DataFrame({
+                'date': duplicates['date'].to_numpy(),
+                'season': duplicates['season'].to_numpy(),
+                'home': duplicates['team'].astype(str).to_numpy(),
+                'away': duplicates['opponent_team'].astype(str).to_numpy(),
+                'home_row': self.duplicate_rows,
+                'away_row': -1,
+                'problem': 'duplicate perspective row',
+            })], ignore_index=True)
+        return report
+
+
+def build_fixtures(df):
+    """Build the fixture table for a derived match frame"""
+    return FixtureTable(df)
+
+
+def main():
+    """Report how the perspective rows pair up into fixtures"""
+    from match_store import load_matches
+
+    parser = argparse.ArgumentParser(description='Pair perspective rows into fixtures and report mismatches')
+    parser.add_argument('--data', default=None, help='match CSV (default: final_matches.csv)')
+    args = parser.parse_args()
+
+    df = load_matches(args.data) if args.data else load_matches()
+    fixtures = build_fixtures(df)
+    report = fixtures.mismatches()
+    print(f"{len(df)} perspective rows -> {len(fixtures)} fixtures")
+    if len(report):
+        print(f"{len(report)} problems:")
+        print(report.to_string(index=False))
+    else:
+        print("Every fixture has two consistent perspective rows.")
+
+
+if __name__ == "__main__":
+    main()
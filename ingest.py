@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Incremental match ingestion
+Appends new match rows to the loaded store and updates only the derived artifacts they touch
+"""
+
+import argparse
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from features import FormFeaturePipeline, SORT_COLUMNS
+from fixtures import FixtureTable
+from instrumentation import timed
+from match_index import MatchIndex
+from match_store import (
+    CSV_COLUMNS, DATA_FILE, cache_paths, coerce_lenient, coerce_matches, concat_matches,
+    derive_columns, load_matches, parse_matches, read_matches,
+)
+from ratings import RATING_COLUMNS, EloRatings
+from standings import SeasonStandings, build_standings
+from validation import validate_matches
+
+KEY_COLUMNS = ['date', 'team']
+
+
+def ingest_log_path(path=DATA_FILE, cache_dir=None):
+    """Append-only CSV log holding rows ingested on top of the source CSV"""
+    parquet_path, _ = cache_paths(path, cache_dir)
+    return os.path.splitext(parquet_path)[0] + '.ingested.csv'
+
+
+def ingest_quarantine_path(path=DATA_FILE, cache_dir=None):
+    """CSV collecting ingested rows that failed validation, batch after batch"""
+    return os.path.splitext(ingest_log_path(path, cache_dir))[0] + '.quarantine.csv'
+
+
+def read_rows(rows):
+    """Turn a CSV path/text/buffer, a DataFrame or a list of dicts into match rows in the CSV schema
+
+    Values that do not fit their column are left missing for validation to quarantine.
+    """
+    if isinstance(rows, (list, tuple)):
+        rows = pd.DataFrame.from_records(rows)
+    if isinstance(rows, pd.DataFrame):
+        try:
+            return coerce_matches(rows.copy())
+        except (ValueError, TypeError):
+            return coerce_lenient(rows.reindex(columns=CSV_COLUMNS))
+    if isinstance(rows, str) and not os.path.exists(rows):
+        rows = io.StringIO(rows)
+    return read_matches(rows)
+
+
+class LiveMatchStore:
+    """The loaded match table plus its form features and standings, kept current by appends
+
+    append() validates new rows with the same checks as a load (see validation.py),
+    quarantines the ones that fail and merges the rest; it recomputes form features for the new
+    rows only (or the whole team-season for a late row) and rebuilds standings for
+    the seasons they belong to. Rows are also
+    written to an append-only log next to the Parquet cache; other processes pick
+    them up with sync() without re-reading the source CSV.
+    """
+
+    def __init__(self, path=DATA_FILE, cache_dir=None, pipeline=None):
+        self.path = path
+        self.log_path = ingest_log_path(path, cache_dir)
+        self.quarantine_path = ingest_quarantine_path(path, cache_dir)
+        self.last_validation = None
+        self.pipeline = pipeline or FormFeaturePipeline()
+        self.lock = threading.RLock()
+        self.version = 0
+
+        matches = load_matches(path, cache_dir=cache_dir).sort_values(SORT_COLUMNS, ignore_index=True)
+        self.ratings = EloRatings.from_matches(matches)
+        self.frame = matches.join(self.pipeline.fit_transform(matches)).join(self.ratings.match_ratings(matches))
+        self.keys = pd.MultiIndex.from_arrays([self.frame[column] for column in KEY_COLUMNS])
+        self.standings = build_standings(self.frame)
+        self.last_date = self._latest_dates(self.frame)
+        self.logged_rows = 0
+        self.log_mtime = None
+        self._index = None
+        self.sync()
+
+    @staticmethod
+    def _latest_dates(rows):
+        """Latest match date per (team, season)"""
+        return rows.groupby([rows['team'].astype(str), rows['season']])['date'].max()
+
+    def _late_rows(self, rows):
+        """Mask of rows dated before an already stored match of the same team-season"""
+        keys = pd.MultiIndex.from_arrays([rows['team'].astype(str), rows['season']])
+        latest = self.last_date.reindex(keys).to_numpy()
+        return rows['date'].to_numpy() <= latest
+
+    @timed('ingest_merge')
+    def _merge(self, rows):
+        """Merge validated typed (optionally derived) rows; returns the rows actually added
+
+        Rows dated before stored matches of their team-season (rescheduled fixtures
+        arriving late) are accepted: that team-season's form features are
+        recomputed in date order, and the Elo ratings replay from the late date.
+        """
+        keys = pd.MultiIndex.from_arrays([rows[column] for column in KEY_COLUMNS])
+        rows = rows[~keys.isin(self.keys)]
+        if len(rows) == 0:
+            return rows
+
+        rows = rows.reset_index(drop=True)
+        if 'opponent_team' not in rows:
+            rows = derive_columns(rows)
+        rows = rows.sort_values(SORT_COLUMNS, ignore_index=True)
+        fixtures = FixtureTable(rows).frame
+        replay = self.ratings.size > 0 and fixtures['date'].min() < self.ratings.latest_date
+        self.ratings.extend(fixtures)
+
+        groups = pd.MultiIndex.from_arrays([rows['team'].astype(str), rows['season']])
+        late_groups = groups[self._late_rows(rows)].unique()
+        in_late_group = groups.isin(late_groups)
+        fresh = rows[~in_late_group]
+        parts = [fresh.join(self.pipeline.append(fresh))]
+        stored = self.frame
+        if len(late_groups):
+            stored_groups = pd.MultiIndex.from_arrays([stored['team'].astype(str), stored['season']])
+            redo = stored_groups.isin(late_groups)
+            group_rows = concat_matches([stored.loc[redo, rows.columns], rows[in_late_group]])
+            group_rows = group_rows.sort_values(SORT_COLUMNS, ignore_index=True)
+            parts.append(group_rows.join(self.pipeline.replace(group_rows)))
+            stored = stored[~redo]
+        merged = concat_matches(parts)
+        merged = merged.join(self.ratings.match_ratings(merged))
+        frame = concat_matches([stored, merged])
+        if replay:
+            # Every rating after the late date moved
+            frame[RATING_COLUMNS] = self.ratings.match_ratings(frame)
+        for season in np.unique(rows['season']):
+            self.standings.seasons[int(season)] = SeasonStandings(int(season), frame[frame['season'] == season])
+
+        self.frame = frame
+        self.keys = self.keys.append(pd.MultiIndex.from_arrays([rows[column] for column in KEY_COLUMNS]))
+        # Team-seasons absent from this batch keep their stored date
+        self.last_date = pd.concat([self.last_date, self._latest_dates(rows)]).groupby(level=[0, 1]).max()
+        self.version += 1
+        added = pd.MultiIndex.from_arrays([frame[column] for column in KEY_COLUMNS]).isin(
+            pd.MultiIndex.from_arrays([rows[column] for column in KEY_COLUMNS]))
+        return frame[added]
+
+    def append(self, rows, persist=True):
+        """Validate and merge new match rows (CSV path/text/buffer, DataFrame or list of dicts)
+
+        Rows already stored are skipped. Rows failing an error check, including a pair
+        check against their stored or batch counterpart, are left out and appended to
+        quarantine_path; the batch summary is kept in last_validation.
+        """
+        rows = read_rows(rows)
+
+        with self.lock:
+            keys = pd.MultiIndex.from_arrays([rows[column] for column in KEY_COLUMNS])
+            rows = rows[~keys.isin(self.keys)].reset_index(drop=True)
+            clean, report = validate_matches(rows, stored=self.frame)
+            self.last_validation = report.to_dict()
+            if persist and len(report.quarantined):
+                os.makedirs(os.path.dirname(self.quarantine_path), exist_ok=True)
+                write_header = not os.path.exists(self.quarantine_path) or os.path.getsize(self.quarantine_path) == 0
+                rows.iloc[report.quarantined][CSV_COLUMNS].to_csv(
+                    self.quarantine_path, mode='a', header=write_header, index_label='source_row', date_format='%Y-%m-%d')
+
+            added = self._merge(clean)
+            if persist and len(added):
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                write_header = not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0
+                added[CSV_COLUMNS].to_csv(self.log_path, mode='a', header=write_header, index=False, date_format='%Y-%m-%d')
+                self.logged_rows += len(added)
+            return added
+
+    def sync(self):
+        """Merge rows other processes appended to the ingest log since the last sync"""
+        with self.lock:
+            try:
+                mtime = os.stat(self.log_path).st_mtime_ns
+            except OSError:
+                return 0
+            if mtime == self.log_mtime:
+                return 0
+            self.log_mtime = mtime
+            logged = parse_matches(self.log_path)
+            fresh = logged.iloc[self.logged_rows:]
+            self.logged_rows = len(logged)
+            if len(fresh) == 0:
+                return 0
+            return len(self._merge(fresh))
+
+    @property
+    def index(self):
+        """MatchIndex over the current frame, rebuilt only after a merge"""
+        with self.lock:
+            if self._index is None or self._index[0] != self.version:
+                self._index = (self.version, MatchIndex(self.frame))
+            return self._index[1]
+
+
+def main():
+    """Append a CSV chunk of new matches to the store"""
+    parser = argparse.ArgumentParser(description='Ingest new Premier League match rows')
+    parser.add_argument('rows', help='CSV file with the same columns as final_matches.csv')
+    parser.add_argument('--data', default=DATA_FILE, help='source match CSV')
+    args = parser.parse_args()
+
+    store = LiveMatchStore(args.data)
+    added = store.append(args.rows)
+    print(f"Ingested {len(added)} new rows ({len(store.frame)} total)")
+    if store.last_validation['quarantined']:
+        print(f"Quarantined {store.last_validation['quarantined']} rows that failed validation ({store.quarantine_path})")
+    for season in sorted(added['season'].unique()):
+        print(f"Season {season} standings updated through matchweek {store.standings.max_week(season)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Hot-path instrumentation
+Per-stage latency histograms and cache hit/miss counters, exported as Prometheus text or JSON,
+plus a per-run trace of the stages that ran (used by the dashboard's debug panel)
+"""
+
+import contextvars
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram upper bounds in seconds, as in Prometheus' default buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_TRACE = contextvars.ContextVar('instrumentation_trace', default=None)
+_CACHE_MISS = contextvars.ContextVar('instrumentation_cache_miss', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else repr(bound)] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class Registry:
+    """Process-wide stage histograms and cache counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.cache_hits = {}
+        self.cache_misses = {}
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(seconds)
+        trace = _TRACE.get()
+        if trace is not None:
+            trace.append((stage, seconds))
+
+    def count_cache(self, name, hit):
+        with self.lock:
+            counters = self.cache_hits if hit else self.cache_misses
+            counters[name] = counters.get(name, 0) + 1
+        trace = _TRACE.get()
+        if trace is not None:
+            trace.append((f'cache {"hit" if hit else "miss"}: {name}', None))
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.cache_hits.clear()
+            self.cache_misses.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'stages': {stage: histogram.snapshot() for stage, histogram in sorted(self.histograms.items())},
+                'cache': {
+                    name: {'hits': self.cache_hits.get(name, 0), 'misses': self.cache_misses.get(name, 0)}
+                    for name in sorted(set(self.cache_hits) | set(self.cache_misses))
+                },
+            }
+
+    def prometheus_text(self, prefix='pl_analytics'):
+        """Exposition-format text of every histogram and counter"""
+        snapshot = self.snapshot()
+        lines = [
+            f'# HELP {prefix}_stage_seconds Wall time of instrumented stages',
+            f'# TYPE {prefix}_stage_seconds histogram',
+        ]
+        for stage, histogram in snapshot['stages'].items():
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        for kind in ('hits', 'misses'):
+            lines.append(f'# HELP {prefix}_cache_{kind}_total Cache lookups that {"were served from" if kind == "hits" else "had to compute"} the cache')
+            lines.append(f'# TYPE {prefix}_cache_{kind}_total counter')
+            for name, counters in snapshot['cache'].items():
+                lines.append(f'{prefix}_cache_{kind}_total{{cache="{name}"}} {counters[kind]}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class timed:
+    """Time a stage, as a context manager (`with timed('load'):`) or a decorator (`@timed('load')`)"""
+
+    def __init__(self, stage, registry=REGISTRY):
+        self.stage = stage
+        self.registry = registry
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        self.registry.observe(self.stage, self.elapsed)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage, self.registry):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class trace:
+    """Collect the stages and cache lookups that run inside the block, in order"""
+
+    def __enter__(self):
+        self.events = []
+        self.token = _TRACE.set(self.events)
+        return self
+
+    def __exit__(self, *exc_info):
+        _TRACE.reset(self.token)
+        return False
+
+    def breakdown(self):
+        """Per-stage calls and total milliseconds, slowest first, plus hit/miss counts per cache"""
+        stages = {}
+        caches = {}
+        for stage, seconds in self.events:
+            if seconds is None:
+                caches[stage] = caches.get(stage, 0) + 1
+                continue
+            calls, total = stages.get(stage, (0, 0.0))
+            stages[stage] = (calls + 1, total + seconds)
+        rows = [
+            {'stage': stage, 'calls': calls, 'total_ms': total * 1e3}
+            for stage, (calls, total) in sorted(stages.items(), key=lambda item: -item[1][1])
+        ]
+        return rows, caches
+
+
+def counted_cache(name, cache_decorator, registry=REGISTRY):
+    """Apply a memoizing decorator (e.g. st.cache_resource(...)) while counting hits and misses
+
+    The wrapped function only runs on a miss, so it flags the miss and is timed as
+    stage `name`; the outer wrapper counts every lookup.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            _CACHE_MISS.set(True)
+            with timed(name, registry):
+                return func(*args, **kwargs)
+
+        cached = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def lookup(*args, **kwargs):
+            token = _CACHE_MISS.set(False)
+            try:
+                result = cached(*args, **kwargs)
+                registry.count_cache(name, hit=not _CACHE_MISS.get())
+                return result
+            finally:
+                _CACHE_MISS.reset(token)
+
+        lookup.clear = getattr(cached, 'clear', None)
+        return lookup
+    return decorate
+
+
+def write_json_log(path, registry=REGISTRY, **fields):
+    """Append one JSON line with a timestamp, any extra fields and the current snapshot"""
+    with open(path, 'a') as handle:
+        handle.write(json.dumps({'time': time.time(), **fields, **registry.snapshot()}) + '\n')
+
+
+def serve_prometheus(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve /metrics in Prometheus text format from a daemon thread; returns the server"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
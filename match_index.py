@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Indexed query layer over the match table
+Sorts the rows once by (season, team, match_week) so team-season lookups are contiguous slices
+"""
+
+import numpy as np
+
+INDEX_COLUMNS = ['season', 'team', 'match_week']
+
+
+def _runs(*keys):
+    """Start/stop offsets of the runs of equal consecutive key tuples"""
+    n = len(keys[0])
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    change = np.zeros(n - 1, dtype=bool)
+    for key in keys:
+        change |= key[1:] != key[:-1]
+    starts = np.concatenate([[0], np.flatnonzero(change) + 1])
+    stops = np.concatenate([starts[1:], [n]])
+    return starts, stops
+
+
+class MatchIndex:
+    """Row ranges keyed by season and by (season, team)
+
+    Season and team-season lookups return slices of the sorted frame rather than
+    boolean-mask copies; head-to-head lookups go through the fixtures table.
+    """
+
+    def __init__(self, df):
+        self.frame = df.sort_values(INDEX_COLUMNS, kind='stable', ignore_index=True)
+        seasons = self.frame['season'].to_numpy()
+        teams = np.asarray(self.frame['team'].astype(str))
+
+        starts, stops = _runs(seasons)
+        self.season_ranges = {int(seasons[start]): (start, stop) for start, stop in zip(starts, stops)}
+
+        starts, stops = _runs(seasons, teams)
+        self.team_season_ranges = {
+            (int(seasons[start]), teams[start]): (start, stop) for start, stop in zip(starts, stops)
+        }
+        team_ranges = {}
+        for (_, team), (start, stop) in self.team_season_ranges.items():
+            team_ranges.setdefault(team, []).append(np.arange(start, stop))
+        self.team_rows = {team: np.concatenate(ranges) for team, ranges in team_ranges.items()}
+        self._fixtures = None
+
+    @property
+    def seasons(self):
+        return sorted(self.season_ranges)
+
+    def teams(self, season=None):
+        """Sorted team names, optionally restricted to one season"""
+        if season is None:
+            return sorted({team for _, team in self.team_season_ranges})
+        return sorted(team for s, team in self.team_season_ranges if s == season)
+
+    def season(self, season):
+        """All rows of a season"""
+        start, stop = self.season_ranges.get(int(season), (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def team_season(self, team, season):
+        """One team's rows for a season, ordered by match week"""
+        start, stop = self.team_season_ranges.get((int(season), team), (0, 0))
+        return self.frame.iloc[start:stop]
+
+    @property
+    def fixtures(self):
+        """Canonical one-row-per-match FixtureTable over the indexed frame, built on first use"""
+        if self._fixtures is None:
+            from fixtures import FixtureTable  # fixtures.py reuses _runs from this module
+            self._fixtures = FixtureTable(self.frame)
+        return self._fixtures
+
+
+def as_index(data):
+    """Accept either a match DataFrame or an existing MatchIndex"""
+    return data if isinstance(data, MatchIndex) else MatchIndex(data)
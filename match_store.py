@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Shared Premier League match store
+Loads final_matches.csv once with explicit dtypes and keeps a columnar cache of the result
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+
+DATA_FILE = 'final_matches.csv'
+CACHE_DIR = '.match_cache'
+
+# Bump whenever the cached columns or dtypes change so stale caches are rebuilt
+SCHEMA_VERSION = 4
+
+CATEGORICAL_COLUMNS = [
+    'time', 'comp', 'round', 'day', 'venue', 'result', 'opponent', 'captain',
+    'formation', 'opp formation', 'referee', 'match report', 'notes', 'team',
+]
+
+CSV_DTYPES = {
+    **{column: 'category' for column in CATEGORICAL_COLUMNS},
+    'gf': 'int8',
+    'ga': 'int8',
+    'xg': 'float32',
+    'xga': 'float32',
+    'poss': 'float32',
+    'attendance': 'float32',
+    'sh': 'float32',
+    'sot': 'float32',
+    'dist': 'float32',
+    'fk': 'float32',
+    'pk': 'int8',
+    'pkatt': 'int8',
+    'season': 'int16',
+}
+
+POINTS_BY_RESULT = {'W': 3, 'D': 1, 'L': 0}
+
+# The source lists opponents by their short names; map them onto the 'team' spelling
+TEAM_ALIASES = {
+    'Brighton': 'Brighton And Hove Albion',
+    'Manchester Utd': 'Manchester United',
+    'Newcastle Utd': 'Newcastle United',
+    "Nott'ham Forest": 'Nottingham Forest',
+    'Sheffield Utd': 'Sheffield United',
+    'Tottenham': 'Tottenham Hotspur',
+    'West Brom': 'West Bromwich Albion',
+    'West Ham': 'West Ham United',
+    'Wolves': 'Wolverhampton Wanderers',
+}
+
+
+def category_lookup(series, mapping_func, dtype):
+    """Apply mapping_func to each category once and broadcast the results through the codes"""
+    categories = series.cat.categories
+    values = np.asarray([mapping_func(category) for category in categories], dtype=dtype)
+    codes = series.cat.codes.to_numpy()
+    # Code -1 marks a missing value; it indexes the trailing fill slot
+    values = np.append(values, np.zeros(1, dtype=dtype))
+    return values[codes]
+
+
+def round_to_match_week(round_name):
+    """Extract the match week number from a round label such as 'Matchweek 12'"""
+    digits = ''.join(ch for ch in str(round_name) if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+CSV_COLUMNS = [
+    'date', 'time', 'comp', 'round', 'day', 'venue', 'result', 'gf', 'ga', 'opponent',
+    'xg', 'xga', 'poss', 'attendance', 'captain', 'formation', 'opp formation', 'referee',
+    'match report', 'notes', 'sh', 'sot', 'dist', 'fk', 'pk', 'pkatt', 'team', 'season',
+]
+
+
+@timed('parse_csv')
+def parse_matches(source):
+    """Parse match rows from a CSV path or buffer using the declared dtypes"""
+    return pd.read_csv(source, dtype=CSV_DTYPES, parse_dates=['date'], date_format='%Y-%m-%d')
+
+
+def parse_lenient(source):
+    """Parse match rows keeping malformed values as missing instead of failing, for validation to quarantine"""
+    return coerce_lenient(pd.read_csv(source, dtype={column: 'category' for column in CATEGORICAL_COLUMNS}))
+
+
+def coerce_lenient(frame):
+    """Cast raw match rows to the CSV schema where they fit, leaving malformed numbers and dates missing"""
+    for column, dtype in CSV_DTYPES.items():
+        if column not in frame:
+            continue
+        if dtype == 'category':
+            frame[column] = frame[column].astype('category')
+        else:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    if 'date' in frame:
+        frame['date'] = pd.to_datetime(frame['date'], format='%Y-%m-%d', errors='coerce')
+    return frame
+
+
+def read_matches(path):
+    """Parse a match CSV strictly, falling back to a lenient parse when some value does not fit its dtype"""
+    try:
+        frame = parse_matches(path)
+    except (ValueError, TypeError):
+        if hasattr(path, 'seek'):
+            path.seek(0)
+        frame = parse_lenient(path)
+    missing = [column for column in CSV_COLUMNS if column not in frame]
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+    if not pd.api.types.is_datetime64_any_dtype(frame['date']):
+        # An unparseable date leaves the whole column as text
+        frame['date'] = pd.to_datetime(frame['date'], format='%Y-%m-%d', errors='coerce')
+    return frame
+
+
+def coerce_matches(frame):
+    """Cast an in-memory frame of raw match rows (e.g. built from dicts) to the CSV schema"""
+    frame = frame.reindex(columns=CSV_COLUMNS)
+    frame['date'] = pd.to_datetime(frame['date'])
+    return frame.astype(CSV_DTYPES)
+
+
+def concat_matches(frames):
+    """Concatenate typed match frames, unioning categories so categorical columns stay categorical"""
+    frames = [frame for frame in frames if len(frame)]
+    if len(frames) == 1:
+        return frames[0]
+    categorical = [column for column in frames[0].columns if isinstance(frames[0][column].dtype, pd.CategoricalDtype)]
+    # team and opponent_team share one category set so their codes stay comparable
+    shared = [column for column in ('team', 'opponent_team') if column in categorical]
+    categories = {}
+    for column in categorical:
+        values = pd.Index([], dtype=object)
+        for frame in frames:
+            values = values.union(frame[column].cat.categories)
+        categories[column] = values
+    if shared:
+        team_categories = categories[shared[0]]
+        for column in shared[1:]:
+            team_categories = team_categories.union(categories[column])
+        categories.update({column: team_categories for column in shared})
+    frames = [
+        frame.astype({column: pd.CategoricalDtype(categories[column]) for column in categorical})
+        for frame in frames
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def canonical_opponents(df):
+    """Return the opponent column spelled like 'team', sharing its categories so the codes line up"""
+    names = df['opponent'].cat.categories.map(lambda name: TEAM_ALIASES.get(name, name))
+    categories = df['team'].cat.categories.union(names.unique())
+    lookup = categories.get_indexer(names)
+    codes = df['opponent'].cat.codes.to_numpy()
+    opponent_codes = np.where(codes >= 0, lookup[codes], -1)
+    return pd.Categorical.from_codes(opponent_codes, categories=categories)
+
+
+@timed('derive_columns')
+def derive_columns(df):
+    """Add the derived columns shared by every entry point"""
+    df['opponent_team'] = canonical_opponents(df)
+    df['team'] = df['team'].cat.set_categories(df['opponent_team'].cat.categories)
+    df['goal_difference'] = (df['gf'] - df['ga']).astype('int8')
+    df['points'] = category_lookup(df['result'], lambda result: POINTS_BY_RESULT.get(result, 0), 'int8')
+    df['match_week'] = category_lookup(df['round'], round_to_match_week, 'int8')
+    df['season_week'] = (df['season'].astype(str) + '_' + df['match_week'].astype(str)).astype('category')
+    return df
+
+
+def file_sha1(path):
+    """Hash a file in chunks"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_paths(path, cache_dir=None):
+    """Return the (parquet, metadata) paths used to cache a CSV file"""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'{stem}.parquet'), os.path.join(cache_dir, f'{stem}.json')
+
+
+def _read_metadata(meta_path):
+    try:
+        with open(meta_path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_metadata(meta_path, metadata):
+    with open(meta_path, 'w') as handle:
+        json.dump(metadata, handle)
+
+
+def _cache_is_fresh(path, parquet_path, meta_path, stat):
+    """Check the cache against the CSV, hashing only when the mtime or size moved
+
+    Returns (fresh, sha1) where sha1 is the CSV digest if it had to be computed.
+    """
+    metadata = _read_metadata(meta_path)
+    if not metadata or metadata.get('schema') != SCHEMA_VERSION or not os.path.exists(parquet_path):
+        return False, None
+    if metadata.get('mtime_ns') == stat.st_mtime_ns and metadata.get('size') == stat.st_size:
+        return True, None
+    digest = file_sha1(path)
+    if metadata.get('sha1') != digest:
+        return False, digest
+    # Touched but unchanged: refresh the recorded mtime so the next check is cheap
+    metadata.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    _write_metadata(meta_path, metadata)
+    return True, digest
+
+
+def quarantine_path(path, cache_dir=None):
+    """CSV of the source rows the last validated load set aside"""
+    parquet_path, _ = cache_paths(path, cache_dir)
+    return os.path.splitext(parquet_path)[0] + '.quarantine.csv'
+
+
+def parse_source(path, validate=True, quarantine=None):
+    """Parse and derive a match CSV; returns (frame, validation summary or None)
+
+    With validate set, rows failing an error check are dropped and, if quarantine
+    is a path, written there in their source form.
+    """
+    if not validate:
+        return derive_columns(parse_matches(path)), None
+    from validation import validate_matches  # validation.py builds on this module
+
+    raw = read_matches(path).reset_index(drop=True)
+    df, report = validate_matches(raw)
+    if quarantine:
+        if len(report.quarantined):
+            os.makedirs(os.path.dirname(quarantine), exist_ok=True)
+            raw.iloc[report.quarantined].to_csv(quarantine, index_label='source_row', date_format='%Y-%m-%d')
+        elif os.path.exists(quarantine):
+            os.remove(quarantine)
+    return df, report.to_dict()
+
+
+def dataset_digest(path=DATA_FILE, cache_dir=None):
+    """SHA-1 of the CSV recorded by the last cached load, or None if there is none or the CSV has changed since"""
+    _, meta_path = cache_paths(path, cache_dir)
+    metadata = _read_metadata(meta_path) or {}
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if metadata.get('mtime_ns') != stat.st_mtime_ns or metadata.get('size') != stat.st_size:
+        return None
+    return metadata.get('sha1')
+
+
+def read_validation(path=DATA_FILE, cache_dir=None):
+    """Validation summary recorded by the last cached load of a CSV, or None"""
+    _, meta_path = cache_paths(path, cache_dir)
+    return (_read_metadata(meta_path) or {}).get('validation')
+
+
+@timed('load_matches')
+def load_matches(path=DATA_FILE, use_cache=True, cache_dir=None, validate=True):
+    """Load the typed match table, reusing the Parquet cache while the CSV is unchanged
+
+    Rows failing validation are quarantined rather than failing the load; the
+    summary is kept in the cache metadata (see read_validation()).
+    """
+    if not use_cache:
+        return parse_source(path, validate)[0]
+
+    parquet_path, meta_path = cache_paths(path, cache_dir)
+    stat = os.stat(path)
+    fresh, digest = _cache_is_fresh(path, parquet_path, meta_path, stat)
+    if fresh:
+        try:
+            return pd.read_parquet(parquet_path)
+        except (ImportError, OSError, ValueError):
+            pass
+
+    try:
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    except OSError:
+        pass
+    df, validation = parse_source(path, validate, quarantine_path(path, cache_dir) if validate else None)
+    try:
+        df.to_parquet(parquet_path, index=False)
+    except (ImportError, OSError):
+        # No Parquet engine or read-only checkout: serve the parsed frame uncached
+        return df
+
+    if digest is None:
+        digest = file_sha1(path)
+    _write_metadata(meta_path, {
+        'schema': SCHEMA_VERSION,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha1': digest,
+        'validation': validation,
+    })
+    return df
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Match outcome model
+Multinomial logistic regression of home win / draw / away win on both sides' pre-match
+rolling form and Elo, with season-ordered cross-validation and an on-disk model cache
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from match_store import DATA_FILE, cache_paths, dataset_digest
+
+OUTCOMES = ('home', 'draw', 'away')
+# Form features per side, each as of the side's previous match in the season
+FORM_FEATURES = [
+    'rolling_xg_5', 'rolling_xga_5', 'rolling_points_5',
+    'rolling_xg_10', 'rolling_xga_10', 'rolling_points_10',
+    'ewm_xg_5', 'ewm_xga_5', 'ewm_gf_5', 'ewm_ga_5',
+]
+L2_GRID = (0.3, 3.0, 30.0, 300.0)
+NEWTON_ITERATIONS = 50
+
+# Bump whenever the features or the stored parameters change so cached models are retrained
+MODEL_VERSION = 2
+
+
+def pre_match_form(frame, columns=FORM_FEATURES):
+    """Each row's form features from the team's latest match of the season dated before it (NaN before the first)
+
+    Rows are ordered by date within each team-season, not by match week, so a
+    rescheduled match only counts once it has actually been played.
+    """
+    values = frame[columns].to_numpy(dtype=np.float64)
+    seasons = frame['season'].to_numpy()
+    teams = frame['team'].cat.codes.to_numpy() if hasattr(frame['team'], 'cat') else frame['team'].to_numpy()
+    order = np.lexsort((frame['date'].to_numpy(), teams, seasons))
+    seasons, teams = seasons[order], teams[order]
+    first = np.ones(len(frame), dtype=bool)
+    first[1:] = (seasons[1:] != seasons[:-1]) | (teams[1:] != teams[:-1])
+    shifted = np.full(values.shape, np.nan)
+    shifted[order[1:]] = values[order[:-1]]
+    shifted[order[first]] = np.nan
+    return shifted
+
+
+def fixture_features(index, columns=FORM_FEATURES):
+    """(features, outcome codes) for every fixture of a MatchIndex, one row per match
+
+    Features are both sides' pre-match form plus the pre-match Elo gap; outcomes are
+    0 home win, 1 draw, 2 away win.
+    """
+    fixtures = index.fixtures.frame
+    form = pre_match_form(index.frame, columns)
+    blocks, names = [], []
+    for side in ('home', 'away'):
+        rows = fixtures[f'{side}_row'].to_numpy()
+        block = np.full((len(fixtures), len(columns)), np.nan)
+        block[rows >= 0] = form[rows[rows >= 0]]
+        blocks.append(block)
+        names += [f'{side}_{column}' for column in columns]
+    if 'home_elo' in fixtures:
+        blocks.append((fixtures['home_elo'] - fixtures['away_elo']).to_numpy(dtype=np.float64)[:, None])
+        names.append('elo_difference')
+    features = pd.DataFrame(np.hstack(blocks), columns=names, index=fixtures.index)
+
+    margin = fixtures['home_goals'].to_numpy(dtype=np.int64) - fixtures['away_goals'].to_numpy(dtype=np.int64)
+    outcomes = np.where(margin > 0, 0, np.where(margin == 0, 1, 2))
+    return features, outcomes
+
+
+def _design(values, mean, std):
+    """Standardized features (missing at the mean) with a leading intercept column"""
+    standardized = np.nan_to_num((values - mean) / std)
+    return np.hstack([np.ones((len(values), 1)), standardized])
+
+
+def _softmax_logits(design, coef):
+    # Home win is the reference class with logit 0
+    logits = np.hstack([np.zeros((len(design), 1)), design @ coef])
+    logits -= logits.max(axis=1, keepdims=True)
+    probabilities = np.exp(logits)
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+class OutcomeModel:
+    """Ridge-penalized multinomial logit fitted by Newton's method
+
+    Parameters are kept for the draw and away classes against home wins, so the
+    fit is identifiable; the intercepts are not penalized.
+    """
+
+    def __init__(self, l2=3.0, feature_names=None):
+        self.l2 = l2
+        self.feature_names = list(feature_names or [])
+        self.coef = None
+        self.mean = None
+        self.std = None
+        self.cv = None
+
+    @timed('outcome_model_fit')
+    def fit(self, features, outcomes):
+        values = np.asarray(features, dtype=np.float64)
+        if isinstance(features, pd.DataFrame):
+            self.feature_names = list(features.columns)
+        self.mean = np.nanmean(values, axis=0)
+        self.std = np.nanstd(values, axis=0)
+        self.std[~(self.std > 0)] = 1.0
+        design = _design(values, self.mean, self.std)
+        n, d = design.shape
+        classes = len(OUTCOMES) - 1
+        targets = np.eye(len(OUTCOMES))[outcomes][:, 1:]
+        penalty = np.full(d, self.l2)
+        penalty[0] = 0.0
+
+        coef = np.zeros((d, classes))
+        for _ in range(NEWTON_ITERATIONS):
+            probabilities = _softmax_logits(design, coef)[:, 1:]
+            gradient = design.T @ (probabilities - targets) + penalty[:, None] * coef
+            hessian = np.empty((classes * d, classes * d))
+            for k in range(classes):
+                for l in range(classes):
+                    weights = probabilities[:, k] * ((k == l) - probabilities[:, l])
+                    hessian[k * d:(k + 1) * d, l * d:(l + 1) * d] = (design * weights[:, None]).T @ design
+            hessian += np.diag(np.tile(penalty, classes)) + 1e-9 * np.eye(classes * d)
+            step = np.linalg.solve(hessian, gradient.T.ravel()).reshape(classes, d).T
+            coef -= step
+            if np.abs(step).max() < 1e-8:
+                break
+        self.coef = coef
+        return self
+
+    def predict_proba(self, features):
+        """(n, 3) home/draw/away probabilities for a whole batch of fixtures in one pass"""
+        values = np.asarray(features, dtype=np.float64)
+        return _softmax_logits(_design(values, self.mean, self.std), self.coef)
+
+    def save(self, path, key):
+        np.savez(path, key=key, l2=self.l2, coef=self.coef, mean=self.mean, std=self.std,
+                 feature_names=np.asarray(self.feature_names), cv=json.dumps(self.cv or []))
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved model; returns (model, key)"""
+        with np.load(path, allow_pickle=False) as stored:
+            model = cls(float(stored['l2']), stored['feature_names'].tolist())
+            model.coef, model.mean, model.std = stored['coef'], stored['mean'], stored['std']
+            model.cv = json.loads(str(stored['cv']))
+            return model, str(stored['key'])
+
+
+def scores(probabilities, outcomes):
+    """Log loss, Brier score and accuracy of predicted probabilities"""
+    rows = np.arange(len(outcomes))
+    actual = np.eye(len(OUTCOMES))[outcomes]
+    return {
+        'log_loss': float(-np.log(np.clip(probabilities[rows, outcomes], 1e-15, 1)).mean()),
+        'brier': float(((probabilities - actual) ** 2).sum(axis=1).mean()),
+        'accuracy': float((probabilities.argmax(axis=1) == outcomes).mean()),
+    }
+
+
+@timed('outcome_model_cv')
+def cross_validate(features, outcomes, seasons, l2_grid=L2_GRID):
+    """Expanding-window CV: for each season after the first, train on all earlier seasons and score it"""
+    seasons = np.asarray(seasons)
+    rows = []
+    for season in np.unique(seasons)[1:]:
+        train, test = seasons < season, seasons == season
+        for l2 in l2_grid:
+            model = OutcomeModel(l2).fit(features[train], outcomes[train])
+            rows.append({'l2': l2, 'season': int(season), 'matches': int(test.sum()),
+                         **scores(model.predict_proba(features[test]), outcomes[test])})
+        # Baseline: the outcome frequencies of the training seasons
+        base = np.bincount(outcomes[train], minlength=len(OUTCOMES)) / train.sum()
+        rows.append({'l2': None, 'season': int(season), 'matches': int(test.sum()),
+                     **scores(np.tile(base, (int(test.sum()), 1)), outcomes[test])})
+    return pd.DataFrame(rows)
+
+
+def train_model(index, l2_grid=L2_GRID, before=None):
+    """Pick the penalty by season-ordered CV log loss, then fit on every fixture (or those of seasons before `before`)"""
+    features, outcomes = fixture_features(index)
+    seasons = index.fixtures.frame['season'].to_numpy()
+    if before is not None:
+        earlier = seasons < before
+        features, outcomes, seasons = features[earlier], outcomes[earlier], seasons[earlier]
+    l2 = l2_grid[0]
+    cv = None
+    if len(np.unique(seasons)) > 1:
+        cv = cross_validate(features.to_numpy(), outcomes, seasons, l2_grid)
+        fitted = cv.dropna(subset=['l2'])
+        l2 = float(fitted.groupby('l2')['log_loss'].mean().idxmin())
+    model = OutcomeModel(l2).fit(features, outcomes)
+    if cv is not None:
+        model.cv = json.loads(cv.to_json(orient='records'))
+    return model
+
+
+def model_key(store, before=None):
+    """Data version the model was trained on: source CSV digest, number of match rows and season cutoff"""
+    digest = (dataset_digest(store.path) or 'local')[:12]
+    return f'{MODEL_VERSION}-{digest}-{len(store.frame)}-{before or "all"}'
+
+
+def model_path(path=DATA_FILE, cache_dir=None, before=None):
+    parquet_path, _ = cache_paths(path, cache_dir)
+    suffix = f'.before_{before}' if before is not None else ''
+    return os.path.splitext(parquet_path)[0] + f'.outcome_model{suffix}.npz'
+
+
+def load_or_train(store, cache_dir=None, before=None):
+    """The outcome model for a LiveMatchStore, retrained only when its data version changes
+
+    With before set, the model only sees seasons before it, so probabilities for
+    that season are out of sample; returns None when there is no earlier season.
+    """
+    if before is not None and not any(season < before for season in store.index.seasons):
+        return None
+    path = model_path(store.path, cache_dir, before)
+    key = model_key(store, before)
+    try:
+        model, stored_key = OutcomeModel.load(path)
+        if stored_key == key:
+            return model
+    except (OSError, ValueError, KeyError):
+        pass
+
+    model = train_model(store.index, before=before)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        model.save(path, key)
+    except OSError:
+        # Read-only checkout: keep the model in memory
+        pass
+    return model
+
+
+@timed('outcome_probabilities')
+def matchweek_probabilities(model, index, season, match_week):
+    """Home/draw/away probabilities for every fixture of a matchweek, scored in one batch"""
+    fixtures = index.fixtures.frame
+    features, outcomes = fixture_features(index)
+    selected = ((fixtures['season'] == season) & (fixtures['match_week'] == match_week)).to_numpy()
+    probabilities = model.predict_proba(features.to_numpy()[selected])
+    week = fixtures[selected]
+    return pd.DataFrame({
+        'date': week['date'].dt.strftime('%Y-%m-%d').to_numpy(),
+        'home': week['home'].astype(str).to_numpy(),
+        'away': week['away'].astype(str).to_numpy(),
+        'home_win': probabilities[:, 0],
+        'draw': probabilities[:, 1],
+        'away_win': probabilities[:, 2],
+        'score': (week['home_goals'].astype(str) + '-' + week['away_goals'].astype(str)).to_numpy(),
+        'outcome': np.asarray(OUTCOMES)[outcomes[selected]],
+    })
+
+
+def main():
+    """Print the cross-validation summary or a matchweek's probabilities"""
+    from ingest import LiveMatchStore
+
+    parser = argparse.ArgumentParser(description='Home/draw/away probabilities from pre-match form and Elo')
+    parser.add_argument('--season', type=int, default=None, help='season to score (default: latest)')
+    parser.add_argument('--week', type=int, default=None, help='matchweek to score (default: the last one)')
+    parser.add_argument('--cv', action='store_true', help='print the season-ordered cross-validation scores')
+    parser.add_argument('--data', default=DATA_FILE, help='source match CSV')
+    args = parser.parse_args()
+
+    store = LiveMatchStore(args.data)
+    if args.cv:
+        model = load_or_train(store)
+        cv = pd.DataFrame(model.cv or [])
+        print(f"Chosen l2: {model.l2}")
+        if len(cv):
+            cv['l2'] = cv['l2'].fillna('baseline').astype(str)
+            print(cv.groupby('l2', sort=False)[['log_loss', 'brier', 'accuracy']].mean().round(4).to_string())
+        return
+
+    season = args.season or max(store.index.seasons)
+    week = args.week or store.standings.max_week(season)
+    # Score a season with a model trained only on the seasons before it
+    model = load_or_train(store, before=season)
+    if model is None:
+        parser.error(f"no season before {season} to train on")
+    result = matchweek_probabilities(model, store.index, season, week)
+    print(f"Season {season}, matchweek {week} (model trained on seasons before {season})")
+    print(result.round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
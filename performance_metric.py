@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Match performance metric
+The notebook's weighted, min-max normalized performance metric for every team and season at once
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WEIGHTS = {
+    'gf': 0.30,
+    'ga': -0.20,
+    'xg': 0.20,
+    'xga': -0.10,
+    'poss': 0.10,
+    'sh': 0.05,
+    'sot': 0.05,
+}
+HOME_FACTOR = 1.05
+
+# Normalization scopes: min/max taken within each team-season, or across the whole league each season
+SCOPES = {
+    'team_season': ['team', 'season'],
+    'league': ['season'],
+}
+
+BIG_GAME_OPPONENTS = [
+    'Arsenal', 'Manchester City', 'Manchester United', 'Tottenham Hotspur', 'Chelsea', 'Newcastle United',
+]
+
+
+class PerformanceMetricEngine:
+    """Computes the performance metric for every row, caching per scope and weight vector
+
+    The normalized metric columns depend only on the scope, so they are computed
+    once per scope; each new weight vector then costs a single matrix-vector product.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._normalized = {}
+        self._metrics = {}
+        self._venue_factor = {}
+
+    def normalized(self, columns, scope='team_season'):
+        """Min-max normalized columns within the scope's groups (constant groups map to 0)"""
+        key = (tuple(columns), scope)
+        if key not in self._normalized:
+            groups = self.df.groupby(SCOPES[scope], observed=True, sort=False)[list(columns)]
+            values = self.df[list(columns)].to_numpy(dtype=np.float64)
+            low = groups.transform('min').to_numpy(dtype=np.float64)
+            span = groups.transform('max').to_numpy(dtype=np.float64) - low
+            with np.errstate(invalid='ignore', divide='ignore'):
+                normalized = np.where(span > 0, (values - low) / span, 0.0)
+            self._normalized[key] = np.nan_to_num(normalized)
+        return self._normalized[key]
+
+    def venue_factor(self, home_factor=HOME_FACTOR):
+        if home_factor not in self._venue_factor:
+            self._venue_factor[home_factor] = np.where(self.df['venue'] == 'Home', home_factor, 1.0)
+        return self._venue_factor[home_factor]
+
+    def metric(self, weights=None, scope='team_season', home_factor=HOME_FACTOR):
+        """Performance metric for every row, aligned to the frame's index"""
+        weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        key = (tuple(sorted(weights.items())), scope, home_factor)
+        if key not in self._metrics:
+            columns = sorted(weights)
+            vector = np.array([weights[column] for column in columns])
+            values = self.venue_factor(home_factor) * (self.normalized(columns, scope) @ vector)
+            self._metrics[key] = pd.Series(values, index=self.df.index, name='performance_metric')
+        return self._metrics[key]
+
+    def big_game_performance(self, team, season, opponents=BIG_GAME_OPPONENTS, weights=None,
+                             scope='team_season', home_factor=HOME_FACTOR):
+        """Opponent x venue pivot of the metric for one team-season, sorted by total like the notebook"""
+        df = self.df
+        rows = (df['team'] == team) & (df['season'] == season) & df['opponent_team'].isin(opponents)
+        games = pd.DataFrame({
+            'opponent': df.loc[rows, 'opponent'].astype(str),
+            'venue': df.loc[rows, 'venue'].astype(str),
+            'performance_metric': self.metric(weights, scope, home_factor)[rows].round(2),
+        })
+        pivot = games.pivot_table(index='opponent', columns='venue', values='performance_metric', aggfunc='first')
+        pivot = pivot.reindex(columns=['Home', 'Away'])
+        pivot['total'] = pivot.sum(axis=1)
+        return pivot.sort_values(by='total', ascending=False)
+
+
+def plot_big_game_performance(pivot, path='big_game_performance.png', title='Big Game Performance (Home vs Away)'):
+    """Grouped Home/Away bar chart of a big-game pivot, saved to path"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    x = np.arange(len(pivot.index))
+    bar_width = 0.4
+    plt.figure(figsize=(10, 5))
+    plt.bar(x - bar_width/2, pivot['Home'], width=bar_width, color='blue', label='Home')
+    plt.bar(x + bar_width/2, pivot['Away'], width=bar_width, color='red', label='Away')
+    plt.xticks(x, pivot.index, rotation=45)
+    plt.xlabel('Opponent')
+    plt.ylabel('Performance Metric')
+    plt.title(title)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+    return path
+
+
+def main():
+    """Regenerate the big-game performance chart for any team-season"""
+    from match_store import load_matches
+
+    parser = argparse.ArgumentParser(description='Big-game performance metric chart')
+    parser.add_argument('--team', default='Liverpool')
+    parser.add_argument('--season', type=int, default=2025)
+    parser.add_argument('--scope', choices=sorted(SCOPES), default='team_season')
+    parser.add_argument('--output', default='big_game_performance.png')
+    args = parser.parse_args()
+
+    engine = PerformanceMetricEngine(load_matches())
+    pivot = engine.big_game_performance(args.team, args.season, scope=args.scope)
+    print(pivot)
+    print(f"Saved {plot_big_game_performance(pivot, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
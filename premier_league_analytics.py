@@ -3,13 +3,26 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import seaborn as sns
 import matplotlib.pyplot as plt
 from datetime import datetime
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
+from ingest import LiveMatchStore
+from cube import MatchCube, load_cube
+from dashboard_figures import TEAM_FIGURES, comparison_bars, possession_vs_points, season_overlay
+from instrumentation import counted_cache, serve_prometheus, timed, trace
+from match_store import quarantine_path, read_validation
+from outcome_model import load_or_train, matchweek_probabilities
+from season_curves import BAND_GROUPS, SeasonCurves
+from season_simulator import simulate_season
+from similarity import MatchSimilarityIndex
+from team_profile import SeasonProfile, TeamSeasonProfile
+
 # Page configuration
 st.set_page_config(
     page_title="Premier League Analytics Dashboard",
@@ -43,126 +56,137 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
+@counted_cache('match_store', st.cache_resource)
+def get_match_store():
+    """Load the match store, form features and standings once per server process"""
+    return LiveMatchStore('final_matches.csv')
+
+@counted_cache('cube', st.cache_resource(max_entries=4))
+def get_cube(version):
+    """Aggregation cube over the store; the persisted cube serves until rows are ingested"""
+    store = get_match_store()
+    if store.logged_rows == 0:
+        return load_cube(store.path)
+    return MatchCube.build(store.frame)
+
+@counted_cache('team_profile', st.cache_resource(max_entries=256))
+def get_team_profile(season, team, version):
+    """Team-season aggregates, shared across sessions; version changes when new rows are ingested"""
+    return TeamSeasonProfile(team, season, get_match_store().index.team_season(team, season), get_cube(version))
+
+@counted_cache('season_profile', st.cache_resource(max_entries=32))
+def get_season_profile(season, version):
+    """League-wide per-team aggregates for a season"""
+    return SeasonProfile(season, get_cube(version))
+
+@counted_cache('projection', st.cache_data(max_entries=64))
+def get_projection(season, match_week, version, n_sims=20_000):
+    """Monte Carlo projection of the rest of the season from match_week (fixed seed, so reruns agree)"""
+    summary, _ = simulate_season(get_match_store().index.season(season), match_week, n_sims, seed=0)
+    return summary
+
+@counted_cache('outcome_model', st.cache_resource(max_entries=8))
+def get_outcome_model(season, version):
+    """Outcome model trained on the seasons before `season` (None for the first), from the on-disk cache"""
+    return load_or_train(get_match_store(), before=season)
+
+@counted_cache('outcome_probabilities', st.cache_data(max_entries=64))
+def get_matchweek_probabilities(season, match_week, version):
+    """Home/draw/away probabilities for one matchweek, scored in one batch; None without an earlier season"""
+    model = get_outcome_model(season, version)
+    if model is None:
+        return None
+    return matchweek_probabilities(model, get_match_store().index, season, match_week)
+
+@counted_cache('season_curves', st.cache_resource(max_entries=2))
+def get_season_curves(version):
+    """(team, season, week) curve arrays for every season, pivoted once per data version"""
+    store = get_match_store()
+    return SeasonCurves(store.frame, store.standings)
+
+@counted_cache('season_overlay_figure', st.cache_data(max_entries=64))
+def get_season_overlay_figure(teams, metric, group, version):
+    """Cross-season overlay of the chosen teams over a finishing group's band, as figure JSON"""
+    return season_overlay(get_season_curves(version), teams, metric, group).to_json()
+
+@counted_cache('similarity_index', st.cache_resource)
+def get_similarity_index(version):
+    """Nearest-neighbour index over every team-match, rebuilt only when matches are ingested"""
+    return MatchSimilarityIndex(get_match_store().frame)
+
+@counted_cache('team_figure', st.cache_data(max_entries=512))
+def get_team_figure(chart, season, team, version):
+    """Build a team chart once per (chart, season, team) and keep its JSON; reruns skip the builder"""
+    profile = get_team_profile(season, team, version)
+    with timed(f'chart {chart}'):
+        return TEAM_FIGURES[chart](profile).to_json()
+
+@counted_cache('possession_figure', st.cache_data(max_entries=32))
+def get_possession_figure(season, version):
+    """Possession vs points scatter with its least-squares trendline, as figure JSON"""
+    return possession_vs_points(get_season_profile(season, version)).to_json()
+
+@counted_cache('comparison_figures', st.cache_data(max_entries=128))
+def get_comparison_figures(season, teams, version):
+    """Points and average xG bars for a set of teams, as figure JSON"""
+    team_points, team_xg = get_season_profile(season, version).compare(teams)
+    return (comparison_bars(team_points, 'Points Comparison').to_json(),
+            comparison_bars(team_xg, 'Average xG Comparison').to_json())
+
+def show_figure(spec):
+    """Render cached figure JSON; each session gets its own figure, so nothing shared is mutated"""
+    st.plotly_chart(pio.from_json(spec, skip_invalid=True), use_container_width=True)
+
+@st.cache_resource
+def start_metrics_server(port):
+    """Serve Prometheus metrics from this server process, once"""
+    return serve_prometheus(port)
+
 def load_data():
     """Load and preprocess the Premier League data"""
     try:
-        df = pd.read_csv('final_matches.csv')
-        
-        # Convert date column
-        df['date'] = pd.to_datetime(df['date'])
+        store = get_match_store()
         
-        # Create additional features
-        df['goal_difference'] = df['gf'] - df['ga']
-        df['points'] = np.where(df['result'] == 'W', 3, np.where(df['result'] == 'D', 1, 0))
-        df['match_week'] = df['round'].str.extract(r'(\d+)').astype(int)
-        df['season_week'] = df['season'].astype(str) + '_' + df['match_week'].astype(str)
+        # Pick up matchweeks ingested since the last rerun (python ingest.py new_rows.csv)
+        store.sync()
         
-        # Calculate rolling averages
-        df = df.sort_values(['team', 'season', 'match_week'])
-        df['rolling_xg_5'] = df.groupby('team')['xg'].rolling(5, min_periods=1).mean().reset_index(0, drop=True)
-        df['rolling_xga_5'] = df.groupby('team')['xga'].rolling(5, min_periods=1).mean().reset_index(0, drop=True)
+        # Rows that failed validation were set aside rather than failing the load
+        validation = read_validation(store.path)
+        if validation and validation['quarantined']:
+            st.sidebar.warning(
+                f"⚠️ {validation['quarantined']} of {validation['rows']} match rows failed validation and were "
+                f"left out (see {quarantine_path(store.path)})"
+            )
         
-        return df
+        return store.frame
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
 
-def main():
-    # Header
-    st.markdown('<h1 class="main-header">⚽ Premier League Analytics Dashboard</h1>', unsafe_allow_html=True)
-    
-    # Load data
-    df = load_data()
-    if df is None:
-        st.error("Failed to load data. Please check if 'final_matches.csv' is in the current directory.")
-        return
-    
-    # Sidebar
-    st.sidebar.title("📊 Dashboard Controls")
-    
-    # Season selector
-    seasons = sorted(df['season'].unique())
-    selected_season = st.sidebar.selectbox("Select Season", seasons, index=len(seasons)-1)
-    
-    # Team selector
-    teams = sorted(df[df['season'] == selected_season]['team'].unique())
-    selected_team = st.sidebar.selectbox("Select Team", teams, index=teams.index('Arsenal') if 'Arsenal' in teams else 0)
-    
-    # Filter data
-    season_data = df[df['season'] == selected_season]
-    team_data = df[(df['team'] == selected_team) & (df['season'] == selected_season)]
-    
-    # Main content
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        wins = len(team_data[team_data['result'] == 'W'])
-        st.metric("Wins", wins)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        draws = len(team_data[team_data['result'] == 'D'])
-        st.metric("Draws", draws)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        losses = len(team_data[team_data['result'] == 'L'])
-        st.metric("Losses", losses)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        points = team_data['points'].sum()
-        st.metric("Points", points)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
+SECTIONS = [
+    "📈 Performance",
+    "🏠 Home vs Away",
+    "🏆 League Analysis",
+    "🔬 Advanced Analytics",
+    "📋 Match Details",
+    "📅 Season Comparison",
+]
+
+def show_team_chart(chart, season, team, version):
+    show_figure(get_team_figure(chart, season, team, version))
+
+def render_performance(season, team, version):
     # Team Performance Analysis
-    st.header(f"📈 {selected_team} Performance Analysis - {selected_season}")
+    st.header(f"📈 {team} Performance Analysis - {season}")
     
     # Performance over time
     col1, col2 = st.columns(2)
     
     with col1:
-        # Points progression
-        fig_points = go.Figure()
-        fig_points.add_trace(go.Scatter(
-            x=team_data['match_week'],
-            y=team_data['points'].cumsum(),
-            mode='lines+markers',
-            name='Points',
-            line=dict(color='#1f77b4', width=3),
-            marker=dict(size=8)
-        ))
-        fig_points.update_layout(
-            title=f'{selected_team} Points Progression',
-            xaxis_title='Match Week',
-            yaxis_title='Cumulative Points',
-            height=400
-        )
-        st.plotly_chart(fig_points, use_container_width=True)
+        show_team_chart('points_progression', season, team, version)
     
     with col2:
-        # Goal difference progression
-        fig_gd = go.Figure()
-        fig_gd.add_trace(go.Scatter(
-            x=team_data['match_week'],
-            y=team_data['goal_difference'].cumsum(),
-            mode='lines+markers',
-            name='Goal Difference',
-            line=dict(color='#ff7f0e', width=3),
-            marker=dict(size=8)
-        ))
-        fig_gd.update_layout(
-            title=f'{selected_team} Goal Difference Progression',
-            xaxis_title='Match Week',
-            yaxis_title='Cumulative Goal Difference',
-            height=400
-        )
-        st.plotly_chart(fig_gd, use_container_width=True)
+        show_team_chart('goal_difference_progression', season, team, version)
     
     # Match Results and Performance Metrics
     st.subheader("🎯 Match Results and Performance Metrics")
@@ -170,104 +194,37 @@ def main():
     col1, col2 = st.columns(2)
     
     with col1:
-        # Results distribution
-        results = team_data['result'].value_counts()
-        fig_results = px.pie(
-            values=results.values,
-            names=results.index,
-            title=f'{selected_team} Results Distribution',
-            color_discrete_map={'W': '#2ca02c', 'D': '#ff7f0e', 'L': '#d62728'}
-        )
-        st.plotly_chart(fig_results, use_container_width=True)
+        show_team_chart('results_distribution', season, team, version)
     
     with col2:
-        # xG vs xGA comparison
-        fig_xg = go.Figure()
-        fig_xg.add_trace(go.Scatter(
-            x=team_data['match_week'],
-            y=team_data['xg'],
-            mode='lines+markers',
-            name='xG',
-            line=dict(color='#2ca02c', width=2)
-        ))
-        fig_xg.add_trace(go.Scatter(
-            x=team_data['match_week'],
-            y=team_data['xga'],
-            mode='lines+markers',
-            name='xGA',
-            line=dict(color='#d62728', width=2)
-        ))
-        fig_xg.update_layout(
-            title=f'{selected_team} xG vs xGA Over Time',
-            xaxis_title='Match Week',
-            yaxis_title='Expected Goals',
-            height=400
-        )
-        st.plotly_chart(fig_xg, use_container_width=True)
-    
+        show_team_chart('xg_over_time', season, team, version)
+
+def render_venue(season, team, version):
     # Home vs Away Performance
-    st.subheader("🏠 Home vs Away Performance")
+    st.header("🏠 Home vs Away Performance")
     
     col1, col2 = st.columns(2)
     
     with col1:
-        # Home vs Away points
-        venue_points = team_data.groupby('venue')['points'].sum()
-        fig_venue = px.bar(
-            x=venue_points.index,
-            y=venue_points.values,
-            title=f'{selected_team} Points by Venue',
-            color=venue_points.index,
-            color_discrete_map={'Home': '#1f77b4', 'Away': '#ff7f0e'}
-        )
-        st.plotly_chart(fig_venue, use_container_width=True)
+        show_team_chart('venue_points', season, team, version)
     
     with col2:
-        # Home vs Away goals
-        venue_goals = team_data.groupby('venue')[['gf', 'ga']].sum()
-        fig_goals = go.Figure()
-        fig_goals.add_trace(go.Bar(
-            x=venue_goals.index,
-            y=venue_goals['gf'],
-            name='Goals For',
-            marker_color='#2ca02c'
-        ))
-        fig_goals.add_trace(go.Bar(
-            x=venue_goals.index,
-            y=venue_goals['ga'],
-            name='Goals Against',
-            marker_color='#d62728'
-        ))
-        fig_goals.update_layout(
-            title=f'{selected_team} Goals by Venue',
-            xaxis_title='Venue',
-            yaxis_title='Goals',
-            barmode='group',
-            height=400
-        )
-        st.plotly_chart(fig_goals, use_container_width=True)
-    
+        show_team_chart('venue_goals', season, team, version)
+
+@st.fragment
+def render_league(store, season, team, teams, table_week, max_week):
     # League Table and Comparisons
     st.header("🏆 League Analysis")
     
     # League table
-    st.subheader("📊 League Table")
-    
-    # Calculate league table
-    league_table = season_data.groupby('team').agg({
-        'points': 'sum',
-        'gf': 'sum',
-        'ga': 'sum',
-        'result': 'count'
-    }).reset_index()
+    st.subheader(f"📊 League Table - Matchweek {table_week}")
     
-    league_table['goal_difference'] = league_table['gf'] - league_table['ga']
-    league_table = league_table.sort_values(['points', 'goal_difference'], ascending=[False, False])
-    league_table['position'] = range(1, len(league_table) + 1)
+    # League table as of the selected matchweek, with full tiebreakers
+    league_table = store.standings.table(season, table_week)
     
     # Highlight selected team
     def highlight_team(row):
-        if row['team'] == selected_team:
+        if row['team'] == team:
             return ['background-color: #e8f4fd'] * len(row)
         return [''] * len(row)
     
@@ -276,6 +233,36 @@ def main():
         use_container_width=True
     )
     
+    # Season projection from the selected matchweek
+    if table_week < max_week and st.checkbox(f"🔮 Project the rest of the season from Matchweek {table_week}"):
+        projection = get_projection(season, table_week, store.version)
+        st.dataframe(
+            projection.style.format({
+                'expected_points': '{:.1f}',
+                'title': '{:.1%}',
+                'top_four': '{:.1%}',
+                'relegation': '{:.1%}'
+            }).apply(highlight_team, axis=1),
+            use_container_width=True
+        )
+    
+    # Outcome probabilities for the next matchweek, from form and Elo before kickoff
+    if table_week < max_week:
+        st.subheader(f"🎲 Matchweek {table_week + 1} Outcome Probabilities")
+        probabilities = get_matchweek_probabilities(season, table_week + 1, store.version)
+        if probabilities is None:
+            st.info(f"No season before {season} to train the outcome model on")
+        else:
+            st.dataframe(
+                probabilities.style.format({'home_win': '{:.1%}', 'draw': '{:.1%}', 'away_win': '{:.1%}'}),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(
+                f"Multinomial model on both sides' rolling xG, xGA, points and Elo before each match, trained only on "
+                f"seasons before {season} (out of sample); score and outcome show what happened"
+            )
+    
     # Team Comparisons
     st.subheader("🔍 Team Comparisons")
     
@@ -283,36 +270,47 @@ def main():
     teams_to_compare = st.multiselect(
         "Select teams to compare",
         teams,
-        default=[selected_team, 'Manchester City', 'Liverpool'] if selected_team in ['Manchester City', 'Liverpool'] else [selected_team, 'Manchester City']
+        default=[team, 'Manchester City', 'Liverpool'] if team in ['Manchester City', 'Liverpool'] else [team, 'Manchester City']
     )
     
     if teams_to_compare:
-        comparison_data = season_data[season_data['team'].isin(teams_to_compare)]
+        fig_comp_points, fig_comp_xg = get_comparison_figures(season, tuple(teams_to_compare), store.version)
         
         col1, col2 = st.columns(2)
         
         with col1:
-            # Points comparison
-            team_points = comparison_data.groupby('team')['points'].sum().sort_values(ascending=False)
-            fig_comp_points = px.bar(
-                x=team_points.index,
-                y=team_points.values,
-                title='Points Comparison',
-                color=team_points.index
-            )
-            st.plotly_chart(fig_comp_points, use_container_width=True)
+            show_figure(fig_comp_points)
         
         with col2:
-            # xG comparison
-            team_xg = comparison_data.groupby('team')['xg'].mean().sort_values(ascending=False)
-            fig_comp_xg = px.bar(
-                x=team_xg.index,
-                y=team_xg.values,
-                title='Average xG Comparison',
-                color=team_xg.index
-            )
-            st.plotly_chart(fig_comp_xg, use_container_width=True)
+            show_figure(fig_comp_xg)
+
+@st.fragment
+def render_season_comparison(team, version):
+    # Multi-season trajectories, all slices of one (team, season, week) array
+    st.header("📅 Season Comparison")
+    curves = get_season_curves(version)
     
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        teams = st.multiselect("Teams", curves.teams, default=[team])
+    with col2:
+        metric = st.radio("Metric", ['points', 'goal_difference'], format_func=lambda name: name.replace('_', ' ').title(), horizontal=True)
+    with col3:
+        bands = {f"{name.replace('_', ' ').title()} pace": name for name in BAND_GROUPS}
+        group = bands[st.selectbox("Pace band", list(bands))]
+    
+    show_figure(get_season_overlay_figure(tuple(teams), metric, group, version))
+    
+    # Final totals against the band's median finish
+    if teams:
+        median = curves.band(group, metric, (50,))[0][-1]
+        finals = curves.overlay(teams, metric)
+        finals = finals[finals['match_week'] == curves.weeks].drop(columns='match_week')
+        finals['vs_median'] = finals[metric] - median
+        st.dataframe(finals, use_container_width=True, hide_index=True)
+    st.caption("Band: 10th-90th percentile of every team-season that finished in the chosen group; dashed line is the median")
+
+def render_advanced(season, team, version):
     # Advanced Analytics
     st.header("🔬 Advanced Analytics")
     
@@ -320,53 +318,137 @@ def main():
     
     with col1:
         # Possession vs Points correlation
-        possession_points = season_data.groupby('team').agg({
-            'poss': 'mean',
-            'points': 'sum'
-        }).reset_index()
-        
-        fig_corr = px.scatter(
-            possession_points,
-            x='poss',
-            y='points',
-            text='team',
-            title='Possession vs Points Correlation',
-            trendline="ols"
-        )
-        fig_corr.update_traces(textposition="top center")
-        st.plotly_chart(fig_corr, use_container_width=True)
+        show_figure(get_possession_figure(season, version))
     
     with col2:
         # Formation analysis
-        formation_performance = team_data.groupby('formation').agg({
-            'points': 'mean',
-            'xg': 'mean',
-            'xga': 'mean'
-        }).reset_index()
-        
-        if len(formation_performance) > 1:
-            fig_formation = px.scatter(
-                formation_performance,
-                x='xg',
-                y='xga',
-                size='points',
-                text='formation',
-                title=f'{selected_team} Formation Performance',
-                labels={'xg': 'Average xG', 'xga': 'Average xGA', 'points': 'Average Points'}
-            )
-            fig_formation.update_traces(textposition="top center")
-            st.plotly_chart(fig_formation, use_container_width=True)
-    
+        if len(get_team_profile(season, team, version).formation_performance) > 1:
+            show_team_chart('formation_performance', season, team, version)
+
+@st.fragment
+def render_match_details(season, team, version):
     # Match Details
     st.header("📋 Match Details")
     
     # Show recent matches
-    st.subheader(f"Recent Matches - {selected_team}")
+    st.subheader(f"Recent Matches - {team}")
+    
+    profile = get_team_profile(season, team, version)
+    st.dataframe(profile.recent_matches, use_container_width=True)
     
-    recent_matches = team_data[['date', 'opponent', 'venue', 'result', 'gf', 'ga', 'xg', 'xga', 'poss']].tail(10)
-    recent_matches['date'] = recent_matches['date'].dt.strftime('%Y-%m-%d')
+    # Similar matches
+    st.subheader("🧭 Similar Matches")
+    
+    matches = get_match_store().index.team_season(team, season)
+    labels = [
+        f"Week {week}: vs {opponent} ({venue}) {gf}-{ga}"
+        for week, opponent, venue, gf, ga in zip(matches['match_week'], matches['opponent'], matches['venue'], matches['gf'], matches['ga'])
+    ]
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        choice = st.selectbox("Find matches that looked like", range(len(labels)), index=len(labels) - 1,
+                              format_func=lambda i: labels[i])
+    with col2:
+        k = st.number_input("Matches", min_value=1, max_value=50, value=10)
+    
+    similar = get_similarity_index(version).similar(matches['date'].iloc[choice], team, int(k))
+    similar['date'] = similar['date'].dt.strftime('%Y-%m-%d')
+    st.dataframe(similar.round({'distance': 2}), use_container_width=True, hide_index=True)
+    st.caption("Nearest neighbours by xG, xGA, possession, shots, shots on target, shot distance, free kicks, penalties and both formations (standardized)")
+
+def main():
+    # Optional scrape endpoint for stage latencies and cache counters: PL_METRICS_PORT=9108 streamlit run ...
+    if os.environ.get('PL_METRICS_PORT'):
+        start_metrics_server(int(os.environ['PL_METRICS_PORT']))
+    
+    with trace() as run:
+        render_dashboard()
+    show_timings(run)
+
+def show_timings(run):
+    """Debug panel: where this rerun's time went and which caches it hit"""
+    if not st.sidebar.checkbox("🐞 Show rerun timings"):
+        return
+    stages, caches = run.breakdown()
+    st.sidebar.caption("Stage totals include the stages nested inside them")
+    st.sidebar.dataframe(pd.DataFrame(stages, columns=['stage', 'calls', 'total_ms']).round({'total_ms': 1}),
+                         use_container_width=True, hide_index=True)
+    st.sidebar.dataframe(pd.DataFrame(list(caches.items()), columns=['cache lookup', 'count']),
+                         use_container_width=True, hide_index=True)
+
+def render_dashboard():
+    # Header
+    st.markdown('<h1 class="main-header">⚽ Premier League Analytics Dashboard</h1>', unsafe_allow_html=True)
+    
+    # Load data
+    df = load_data()
+    if df is None:
+        st.error("Failed to load data. Please check if 'final_matches.csv' is in the current directory.")
+        return
+    store = get_match_store()
+    index = store.index
+    
+    # Sidebar
+    st.sidebar.title("📊 Dashboard Controls")
+    
+    # Season selector
+    seasons = index.seasons
+    selected_season = st.sidebar.selectbox("Select Season", seasons, index=len(seasons)-1)
+    
+    # Team selector
+    teams = index.teams(selected_season)
+    selected_team = st.sidebar.selectbox("Select Team", teams, index=teams.index('Arsenal') if 'Arsenal' in teams else 0)
+    
+    # League table matchweek
+    max_week = store.standings.max_week(selected_season)
+    if max_week > 1:
+        table_week = st.sidebar.slider("League Table as of Matchweek", 1, max_week, max_week)
+    else:
+        # A slider needs min < max; a season that has only reached matchweek 1 has one table
+        table_week = max_week
+        st.sidebar.caption(f"League Table as of Matchweek {max_week}")
+    
+    # Precomputed aggregates; widget changes only re-render figures from these
+    profile = get_team_profile(selected_season, selected_team, store.version)
+    
+    # Main content
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+        st.metric("Wins", profile.wins)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+        st.metric("Draws", profile.draws)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+        st.metric("Losses", profile.losses)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+        st.metric("Points", profile.points)
+        st.markdown('</div>', unsafe_allow_html=True)
     
-    st.dataframe(recent_matches, use_container_width=True)
+    # Only the selected section is built and sent to the browser
+    section = st.radio("Section", SECTIONS, horizontal=True, label_visibility="collapsed")
+    
+    if section == SECTIONS[0]:
+        render_performance(selected_season, selected_team, store.version)
+    elif section == SECTIONS[1]:
+        render_venue(selected_season, selected_team, store.version)
+    elif section == SECTIONS[2]:
+        render_league(store, selected_season, selected_team, teams, table_week, max_week)
+    elif section == SECTIONS[3]:
+        render_advanced(selected_season, selected_team, store.version)
+    elif section == SECTIONS[4]:
+        render_match_details(selected_season, selected_team, store.version)
+    else:
+        render_season_comparison(selected_team, store.version)
     
     # Footer
     st.markdown("---")
@@ -381,4 +463,4 @@ def main():
     )
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
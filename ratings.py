@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Elo team ratings
+Rates every fixture of the canonical fixture table in date order across all seasons;
+new results are appended without replaying the history
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from fixtures import FixtureTable
+from instrumentation import timed
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+HOME_ADVANTAGE = 60.0
+# Share of a team's distance from the initial rating it keeps into a new season
+SEASON_CARRYOVER = 0.8
+# Weight of the xG margin (vs the goal margin) in the margin-of-victory multiplier; 0 disables it
+XG_WEIGHT = 0.0
+
+# Pre-match Elo columns added to team-perspective match rows
+RATING_COLUMNS = ['elo', 'opponent_elo']
+
+
+def margin_multiplier(margin):
+    """K multiplier for a (possibly fractional) winning margin: 1 up to one goal, 1.5 at two, (11 + m) / 8 beyond"""
+    if margin <= 3:
+        return float(np.interp(margin, [0, 1, 2, 3], [1.0, 1.0, 1.5, 1.75]))
+    return (11 + margin) / 8
+
+
+class EloRatings:
+    """Chronological Elo ratings with the full pre-match history in compact arrays
+
+    History arrays grow by doubling, so append() is amortized O(1); a
+    (date, team) lookup gives any match's pre-match ratings without a replay.
+    """
+
+    def __init__(self, k=K_FACTOR, home_advantage=HOME_ADVANTAGE, xg_weight=XG_WEIGHT,
+                 initial=INITIAL_RATING, carryover=SEASON_CARRYOVER):
+        self.k = k
+        self.home_advantage = home_advantage
+        self.xg_weight = xg_weight
+        self.initial = initial
+        self.carryover = carryover
+        self.reset()
+
+    def reset(self):
+        """Forget every rated match"""
+        self.teams = []
+        self.team_index = {}
+        self.ratings = np.empty(0, dtype=np.float64)
+        self.last_season = np.empty(0, dtype=np.int32)
+        self.team_matches = {}
+
+        self.size = 0
+        self.date = np.empty(0, dtype='datetime64[ns]')
+        self.home = np.empty(0, dtype=np.int32)
+        self.away = np.empty(0, dtype=np.int32)
+        self.home_pre = np.empty(0, dtype=np.float32)
+        self.away_pre = np.empty(0, dtype=np.float32)
+        self.change = np.empty(0, dtype=np.float32)
+        # The inputs of each rated match, kept so a late result can be replayed in date order
+        self.season = np.empty(0, dtype=np.int32)
+        self.home_goals = np.empty(0, dtype=np.int32)
+        self.away_goals = np.empty(0, dtype=np.int32)
+        self.home_xg = np.empty(0, dtype=np.float64)
+        self.away_xg = np.empty(0, dtype=np.float64)
+        self._fixture_of = {}
+
+    def _team(self, name, season):
+        """Index of a team, registering it and applying the between-season regression as needed"""
+        i = self.team_index.get(name)
+        if i is None:
+            i = self.team_index[name] = len(self.teams)
+            self.teams.append(name)
+            self.ratings = np.append(self.ratings, self.initial)
+            self.last_season = np.append(self.last_season, season)
+            self.team_matches[name] = []
+        elif season > self.last_season[i]:
+            self.ratings[i] = self.initial + self.carryover * (self.ratings[i] - self.initial)
+            self.last_season[i] = season
+        return i
+
+    def _grow(self):
+        capacity = max(64, 2 * len(self.home))
+        for name in ('date', 'home', 'away', 'home_pre', 'away_pre', 'change',
+                     'season', 'home_goals', 'away_goals', 'home_xg', 'away_xg'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, date, season, home, away, home_goals, away_goals, home_xg=np.nan, away_xg=np.nan):
+        """Rate one match; returns the (home, away) pre-match ratings"""
+        date = np.datetime64(pd.Timestamp(date), 'ns')
+        key = (date, home)
+        if key in self._fixture_of:
+            row = self._fixture_of[key]
+            return float(self.home_pre[row]), float(self.away_pre[row])
+        if self.size and date < self.date[self.size - 1]:
+            raise ValueError(f"Cannot rate {home} v {away} on {date}: ratings are already past {self.date[self.size - 1]}")
+
+        h = self._team(home, season)
+        a = self._team(away, season)
+        home_rating, away_rating = self.ratings[h], self.ratings[a]
+        expected = 1 / (1 + 10 ** ((away_rating - home_rating - self.home_advantage) / 400))
+        score = 1.0 if home_goals > away_goals else 0.5 if home_goals == away_goals else 0.0
+
+        margin = abs(home_goals - away_goals)
+        if self.xg_weight and not (np.isnan(home_xg) or np.isnan(away_xg)):
+            margin = (1 - self.xg_weight) * margin + self.xg_weight * abs(home_xg - away_xg)
+        change = self.k * margin_multiplier(margin) * (score - expected)
+        self.ratings[h] += change
+        self.ratings[a] -= change
+
+        if self.size == len(self.home):
+            self._grow()
+        row = self.size
+        self.date[row] = date
+        self.home[row] = h
+        self.away[row] = a
+        self.home_pre[row] = home_rating
+        self.away_pre[row] = away_rating
+        self.change[row] = change
+        self.season[row] = season
+        self.home_goals[row] = home_goals
+        self.away_goals[row] = away_goals
+        self.home_xg[row] = home_xg
+        self.away_xg[row] = away_xg
+        self.size += 1
+        self._fixture_of[key] = row
+        self._fixture_of[(date, away)] = row
+        self.team_matches[home].append(row)
+        self.team_matches[away].append(row)
+        return float(home_rating), float(away_rating)
+
+    @property
+    def latest_date(self):
+        """Date of the latest rated match, or None before any"""
+        return self.date[self.size - 1] if self.size else None
+
+    def fixtures(self):
+        """The rated matches as fixture rows (the columns extend() reads), in rating order"""
+        names = np.asarray(self.teams, dtype=object)
+        rows = slice(0, self.size)
+        return pd.DataFrame({
+            'date': self.date[rows],
+            'season': self.season[rows],
+            'home': names[self.home[rows]] if self.size else np.empty(0, dtype=object),
+            'away': names[self.away[rows]] if self.size else np.empty(0, dtype=object),
+            'home_goals': self.home_goals[rows],
+            'away_goals': self.away_goals[rows],
+            'home_xg': self.home_xg[rows],
+            'away_xg': self.away_xg[rows],
+        })
+
+    def extend(self, fixture_rows):
+        """Rate a fixture table frame in order
+
+        Fixtures dated before the latest rated match (late or rescheduled results)
+        change every later rating, so the whole history is replayed in date order
+        with them included.
+        """
+        dates = fixture_rows['date'].to_numpy(dtype='datetime64[ns]')
+        rated = [(date, str(home)) in self._fixture_of for date, home in zip(dates, fixture_rows['home'])]
+        fixture_rows = fixture_rows[~np.array(rated, dtype=bool)]
+        if len(fixture_rows) and self.size and fixture_rows['date'].min() < self.latest_date:
+            # Same order as FixtureTable: date, then home team (team codes are sorted by name)
+            stored = self.fixtures()
+            fixture_rows = pd.concat([stored, fixture_rows[stored.columns].astype({'home': str, 'away': str})],
+                                     ignore_index=True)
+            fixture_rows = fixture_rows.sort_values(['date', 'home'], kind='stable', ignore_index=True)
+            self.reset()
+        for fixture in fixture_rows.itertuples(index=False):
+            self.append(fixture.date, fixture.season, str(fixture.home), str(fixture.away),
+                        fixture.home_goals, fixture.away_goals, fixture.home_xg, fixture.away_xg)
+        return self
+
+    @classmethod
+    @timed('elo_ratings')
+    def from_matches(cls, df, **options):
+        """Rate every match in a team-perspective match frame"""
+        return cls(**options).extend(FixtureTable(df).frame)
+
+    def match_ratings(self, rows):
+        """Pre-match elo/opponent_elo columns aligned to team-perspective rows (NaN if unrated)"""
+        dates = rows['date'].to_numpy(dtype='datetime64[ns]')
+        teams = rows['team'].astype(str).to_numpy()
+        positions = np.array([self._fixture_of.get((date, team), -1) for date, team in zip(dates, teams)], dtype=np.int64)
+        rated = positions >= 0
+        safe = np.where(rated, positions, 0)
+        is_home = rated & (self.home[safe] == np.array([self.team_index.get(team, -1) for team in teams]))
+        own = np.where(is_home, self.home_pre[safe], self.away_pre[safe])
+        other = np.where(is_home, self.away_pre[safe], self.home_pre[safe])
+        return pd.DataFrame({
+            'elo': np.where(rated, own, np.nan).astype(np.float32),
+            'opponent_elo': np.where(rated, other, np.nan).astype(np.float32),
+        }, index=rows.index)
+
+    def history(self, team):
+        """A team's pre- and post-match rating for every match it played, in date order"""
+        rows = np.asarray(self.team_matches.get(team, []), dtype=np.int64)
+        is_home = self.home[rows] == self.team_index.get(team, -1)
+        # Stored as float32; widen so rounding for display does not show float32 noise
+        pre = np.where(is_home, self.home_pre[rows], self.away_pre[rows]).astype(np.float64)
+        change = np.where(is_home, self.change[rows], -self.change[rows]).astype(np.float64)
+        opponents = np.where(is_home, self.away[rows], self.home[rows])
+        return pd.DataFrame({
+            'date': self.date[rows],
+            'opponent': np.asarray(self.teams, dtype=object)[opponents] if len(rows) else np.empty(0, dtype=object),
+            'venue': np.where(is_home, 'Home', 'Away'),
+            'pre_rating': pre,
+            'post_rating': pre + change,
+        })
+
+    def table(self):
+        """Current rating of every team, highest first"""
+        table = pd.DataFrame({'team': self.teams, 'rating': self.ratings.astype(np.float64)})
+        return table.sort_values('rating', ascending=False, ignore_index=True)
+
+
+def main():
+    """Print the current ratings, or one team's rating history"""
+    from match_store import load_matches
+
+    parser = argparse.ArgumentParser(description='Elo ratings for every Premier League team')
+    parser.add_argument('--team', default=None, help='print this team\'s rating history instead')
+    parser.add_argument('--xg-weight', type=float, default=XG_WEIGHT,
+                        help='weight of the xG margin in the margin-of-victory multiplier (0-1)')
+    args = parser.parse_args()
+
+    ratings = EloRatings.from_matches(load_matches(), xg_weight=args.xg_weight)
+    if args.team:
+        print(ratings.history(args.team).round({'pre_rating': 1, 'post_rating': 1}).to_string(index=False))
+    else:
+        print(ratings.table().round({'rating': 1}).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Columnar report results
+Report rows held as NumPy columns (dates formatted in one pass, W/D/L as int8) and
+rendered in bulk as text, Markdown, JSON or CSV
+"""
+
+import csv
+import io
+import json
+
+import numpy as np
+
+# Results are stored as int8 1/0/-1 (W/D/L, the sign of the goal margin); RESULT_LABELS[code + 1] decodes them
+RESULT_LABELS = np.array(['L', 'D', 'W'])
+
+FORMATS = ('text', 'markdown', 'json', 'csv')
+
+
+def encode_results(gf, ga):
+    """int8 W/D/L codes (1/0/-1) from goals for and against"""
+    return np.sign(np.asarray(gf, dtype=np.int64) - np.asarray(ga, dtype=np.int64)).astype(np.int8)
+
+
+def result_codes(results):
+    """int8 codes of a W/D/L label column"""
+    labels = np.asarray(results.astype(str)) if hasattr(results, 'astype') else np.asarray(results)
+    return np.select([labels == 'W', labels == 'D'], [1, 0], -1).astype(np.int8)
+
+
+def decode_results(codes):
+    return RESULT_LABELS[np.asarray(codes, dtype=np.int64) + 1]
+
+
+def format_dates(dates):
+    """YYYY-MM-DD strings for a whole date column at once"""
+    return np.datetime_as_string(np.asarray(dates).astype('datetime64[D]'), unit='D')
+
+
+def _column(values):
+    return np.asarray(values.astype(str)) if hasattr(values, 'cat') else np.asarray(values)
+
+
+class ReportColumns:
+    """Equal-length named NumPy columns; rows only become Python objects when rendered"""
+
+    def __init__(self, **columns):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError('Report columns differ in length')
+
+    @classmethod
+    def from_matches(cls, rows):
+        """Match columns from team-perspective match rows"""
+        gf = rows['gf'].to_numpy(dtype=np.int64)
+        ga = rows['ga'].to_numpy(dtype=np.int64)
+        columns = {
+            'week': rows['match_week'].to_numpy(dtype=np.int64),
+            'date': format_dates(rows['date'].to_numpy()),
+            'team': _column(rows['team']),
+            'opponent': _column(rows['opponent']),
+            'venue': _column(rows['venue']),
+            'gf': gf,
+            'ga': ga,
+            'result': result_codes(rows['result']) if 'result' in rows else encode_results(gf, ga),
+        }
+        if 'elo' in rows:
+            columns['team_elo'] = np.round(rows['elo'].to_numpy(dtype=np.float64), 1)
+            columns['opponent_elo'] = np.round(rows['opponent_elo'].to_numpy(dtype=np.float64), 1)
+        return cls(**columns)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    def take(self, positions):
+        """The rows at the given positions, still columnar"""
+        return ReportColumns(**{name: values[positions] for name, values in self.columns.items()})
+
+    def lists(self):
+        """Each column as a list of plain Python values; result codes decode to W/D/L"""
+        return {
+            name: (decode_results(values) if name == 'result' else values).tolist()
+            for name, values in self.columns.items()
+        }
+
+    def records(self):
+        """Rows as plain-Python dicts, converted column by column"""
+        lists = self.lists()
+        return [dict(zip(lists, row)) for row in zip(*lists.values())]
+
+
+def render_text(columns, line=None):
+    """One line per row from a str.format template over the column names (default: space-separated)"""
+    if line is None:
+        line = ' '.join(f'{{{name}}}' for name in columns.names)
+    lists = columns.lists()
+    return '\n'.join(line.format_map(dict(zip(lists, row))) for row in zip(*lists.values()))
+
+
+def render_markdown(columns, line=None):
+    lists = columns.lists()
+    lines = ['| ' + ' | '.join(lists) + ' |', '|' + '---|' * len(lists)]
+    lines += ['| ' + ' | '.join(map(str, row)) + ' |' for row in zip(*lists.values())]
+    return '\n'.join(lines)
+
+
+def render_json(columns, line=None):
+    return json.dumps(columns.records(), indent=2)
+
+
+def render_csv(columns, line=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    lists = columns.lists()
+    writer.writerow(lists)
+    writer.writerows(zip(*lists.values()))
+    return buffer.getvalue().rstrip('\n')
+
+
+RENDERERS = {
+    'text': render_text,
+    'markdown': render_markdown,
+    'json': render_json,
+    'csv': render_csv,
+}
+
+
+def render(columns, fmt='text', line=None):
+    """Render report columns in one of FORMATS; line is the text template"""
+    if fmt not in RENDERERS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return RENDERERS[fmt](columns, line)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Multi-season curves
+Cumulative points and goal difference for every (team, season, match week), pivoted once
+into dense NumPy arrays, with overlays and percentile bands such as title-winning pace
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from standings import build_standings
+
+METRICS = ('points', 'goal_difference')
+# Final-position groups a band can be drawn from: name -> positions (1-based, inclusive), or None for all
+BAND_GROUPS = {
+    'champion': (1, 1),
+    'top_four': (1, 4),
+    'relegated': (-3, -1),
+    'all': None,
+}
+BAND_PERCENTILES = (10, 50, 90)
+
+
+class SeasonCurves:
+    """Dense (team, season, week) arrays of per-match and cumulative points and goal difference
+
+    Cells of seasons a team did not play are NaN; a week a team skipped carries its
+    previous cumulative value forward. Final positions come from the league table
+    (standings, built from df if not given), head-to-head tiebreaks included.
+    """
+
+    @timed('season_curves')
+    def __init__(self, df, standings=None):
+        team_names = df['team'].astype(str)
+        self.teams = sorted(team_names.unique())
+        self.seasons = sorted(int(season) for season in df['season'].unique())
+        self.weeks = int(df['match_week'].max()) if len(df) else 0
+
+        team = pd.Index(self.teams).get_indexer(team_names)
+        season = pd.Index(self.seasons).get_indexer(df['season'].astype(int))
+        week = df['match_week'].to_numpy(dtype=np.int64) - 1
+        shape = (len(self.teams), len(self.seasons), self.weeks)
+
+        # The one pivot pass: scatter every row into its (team, season, week) cell
+        self.per_match = {}
+        for metric in METRICS:
+            cells = np.zeros(shape)
+            np.add.at(cells, (team, season, week), df[metric].to_numpy(dtype=np.float64))
+            self.per_match[metric] = cells
+        self.played = np.zeros(shape, dtype=bool)
+        self.played[team, season, week] = True
+
+        active = self.played.any(axis=2)
+        self.cumulative = {}
+        for metric, cells in self.per_match.items():
+            cumulative = np.cumsum(cells, axis=2)
+            cumulative[~active] = np.nan
+            self.cumulative[metric] = cumulative
+
+        # Final positions as the league table orders them
+        standings = standings if standings is not None else build_standings(df)
+        self.final_position = np.zeros(shape[:2], dtype=np.int64)
+        for s, season in enumerate(self.seasons):
+            table = standings[season]
+            teams = pd.Index(self.teams).get_indexer(table.teams[table.order()])
+            self.final_position[teams, s] = np.arange(1, len(teams) + 1)
+
+    def team_curves(self, team, metric='points'):
+        """(seasons, weeks) cumulative curves of one team; rows of seasons it did not play are NaN"""
+        if team not in self.teams:
+            raise KeyError(f"Unknown team {team!r}; teams are {', '.join(self.teams)}")
+        return self.cumulative[metric][self.teams.index(team)]
+
+    def group_mask(self, group):
+        """(team, season) cells of teams that finished in a BAND_GROUPS position range"""
+        positions = BAND_GROUPS[group]
+        active = self.final_position > 0
+        if positions is None:
+            return active
+        low, high = positions
+        if low < 0:
+            # Counted from the bottom of each season's table
+            size = active.sum(axis=0, keepdims=True)
+            low, high = size + low + 1, size + high + 1
+        return active & (self.final_position >= low) & (self.final_position <= high)
+
+    def band(self, group='champion', metric='points', percentiles=BAND_PERCENTILES):
+        """Percentiles per week of the curves of every team-season in a finishing group: (len(percentiles), weeks)"""
+        curves = self.cumulative[metric][self.group_mask(group)]
+        if len(curves) == 0:
+            return np.full((len(percentiles), self.weeks), np.nan)
+        return np.nanpercentile(curves, percentiles, axis=0)
+
+    def overlay(self, teams, metric='points', seasons=None):
+        """Long frame of the chosen teams' curves in every (or the given) season they played"""
+        frames = []
+        for team in teams:
+            curves = self.team_curves(team, metric)
+            for s, season in enumerate(self.seasons):
+                if (seasons is not None and season not in seasons) or np.isnan(curves[s]).all():
+                    continue
+                frames.append(pd.DataFrame({
+                    'team': team,
+                    'season': season,
+                    'match_week': np.arange(1, self.weeks + 1),
+                    metric: curves[s],
+                }))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['team', 'season', 'match_week', metric])
+
+    def pace(self, team, season, group='champion', metric='points'):
+        """A team-season's cumulative curve minus the group's median curve, week by week"""
+        median = self.band(group, metric, (50,))[0]
+        return self.team_curves(team, metric)[self.seasons.index(season)] - median
+
+
+def main():
+    """Print a team's cumulative points by season against the title-winning pace"""
+    from match_store import load_matches
+
+    matches = load_matches()
+    parser = argparse.ArgumentParser(description="Compare a team's trajectory across seasons")
+    parser.add_argument('team', choices=sorted(matches['team'].astype(str).unique()), metavar='team')
+    parser.add_argument('--metric', choices=METRICS, default='points')
+    parser.add_argument('--band', choices=list(BAND_GROUPS), default='champion')
+    parser.add_argument('--every', type=int, default=5, help='print every n-th match week')
+    args = parser.parse_args()
+
+    curves = SeasonCurves(matches)
+    weeks = np.arange(args.every, curves.weeks + 1, args.every)
+    table = pd.DataFrame(curves.team_curves(args.team, args.metric)[:, weeks - 1], index=curves.seasons, columns=weeks)
+    for percentile, values in zip(BAND_PERCENTILES, curves.band(args.band, args.metric)):
+        table.loc[f'{args.band} p{percentile}'] = values[weeks - 1]
+    table.columns.name = 'week'
+    print(table.round(1).to_string())
+
+
+if __name__ == "__main__":
+    main()
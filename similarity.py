@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Match similarity search
+Nearest neighbours over normalized team-match feature vectors: exact batched k-NN,
+or an approximate inverted-file search for large archives
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+
+NUMERIC_FEATURES = ['xg', 'xga', 'poss', 'sh', 'sot', 'dist', 'fk', 'pk']
+CATEGORICAL_FEATURES = ['formation', 'opp formation']
+# Scale of each one-hot block: differing formations add 2 * weight**2 to the squared distance
+FORMATION_WEIGHT = 0.5
+RESULT_COLUMNS = ['date', 'season', 'team', 'opponent', 'venue', 'result', 'gf', 'ga', *NUMERIC_FEATURES, *CATEGORICAL_FEATURES]
+
+# Queries per distance block, keeping the (batch, rows) distance matrix small
+BATCH_SIZE = 1024
+KMEANS_ITERATIONS = 10
+DEFAULT_PROBES = 8
+
+
+def feature_matrix(df, numeric=NUMERIC_FEATURES, categorical=CATEGORICAL_FEATURES, formation_weight=FORMATION_WEIGHT):
+    """Z-scored numeric columns (missing values at the mean) plus weighted one-hot formations"""
+    values = df[numeric].to_numpy(dtype=np.float64)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    blocks = [np.nan_to_num((values - mean) / std)]
+    for column in categorical:
+        codes = df[column].astype('category').cat.codes.to_numpy()
+        width = int(codes.max()) + 1 if len(codes) else 0
+        one_hot = np.zeros((len(df), width))
+        known = codes >= 0
+        one_hot[np.flatnonzero(known), codes[known]] = formation_weight
+        blocks.append(one_hot)
+    return np.hstack(blocks).astype(np.float32)
+
+
+def squared_distances(queries, vectors, vector_norms):
+    """Squared Euclidean distances between every query and every vector, via one matrix product"""
+    query_norms = np.einsum('ij,ij->i', queries, queries)
+    distances = query_norms[:, None] + vector_norms[None, :] - 2 * queries @ vectors.T
+    return np.maximum(distances, 0)
+
+
+def top_k(distances, k):
+    """Column positions of the k smallest distances per row, nearest first"""
+    k = min(k, distances.shape[1])
+    if k == 0:
+        return np.empty((len(distances), 0), dtype=np.int64)
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+def kmeans(vectors, n_lists, rng, iterations=KMEANS_ITERATIONS):
+    """Plain Lloyd iterations; returns (centroids, assignment)"""
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmin(squared_distances(vectors, centroids, np.einsum('ij,ij->i', centroids, centroids)), axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=n_lists)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    assignment = np.argmin(squared_distances(vectors, centroids, np.einsum('ij,ij->i', centroids, centroids)), axis=1)
+    return centroids, assignment
+
+
+class MatchSimilarityIndex:
+    """Nearest-neighbour index over every team-match row of a frame
+
+    Exact search scans all rows in batched matrix products. With approximate=True
+    the rows are clustered into inverted lists once, and a query only scans
+    the lists of its n_probe nearest centroids.
+    """
+
+    @timed('similarity_index')
+    def __init__(self, df, approximate=False, n_lists=None, n_probe=DEFAULT_PROBES, seed=0,
+                 formation_weight=FORMATION_WEIGHT):
+        self.frame = df.reset_index(drop=True)
+        self.vectors = feature_matrix(self.frame, formation_weight=formation_weight)
+        self.norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        self.keys = {
+            (date, team): position for position, (date, team) in
+            enumerate(zip(self.frame['date'].to_numpy(dtype='datetime64[ns]'), self.frame['team'].astype(str)))
+        }
+
+        self.approximate = approximate
+        self.n_probe = n_probe
+        if approximate:
+            n_lists = n_lists or max(1, int(np.sqrt(len(self.vectors))))
+            self.centroids, assignment = kmeans(self.vectors, n_lists, np.random.default_rng(seed))
+            order = np.argsort(assignment, kind='stable')
+            bounds = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+            self.lists = [order[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def position(self, date, team):
+        """Row position of a team's match on date"""
+        key = (np.datetime64(pd.Timestamp(date), 'ns'), team)
+        if key not in self.keys:
+            raise KeyError(f"No match for {team} on {pd.Timestamp(date).date()}")
+        return self.keys[key]
+
+    def _exact(self, queries, k, exclude):
+        neighbours = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), BATCH_SIZE):
+            block = squared_distances(queries[start:start + BATCH_SIZE], self.vectors, self.norms)
+            if exclude is not None:
+                rows = np.arange(len(block))
+                excluded = exclude[start:start + BATCH_SIZE]
+                block[rows[excluded >= 0], excluded[excluded >= 0]] = np.inf
+            nearest = top_k(block, k)
+            neighbours[start:start + BATCH_SIZE] = nearest
+            distances[start:start + BATCH_SIZE] = np.take_along_axis(block, nearest, axis=1)
+        return neighbours, distances
+
+    def _approximate(self, queries, k, exclude):
+        centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        probes = top_k(squared_distances(queries, self.centroids, centroid_norms), self.n_probe)
+        neighbours = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[probe] for probe in probes[i]])
+            if exclude is not None:
+                candidates = candidates[candidates != exclude[i]]
+            block = squared_distances(query[None, :], self.vectors[candidates], self.norms[candidates])
+            nearest = top_k(block, k)[0]
+            neighbours[i, :len(nearest)] = candidates[nearest]
+            distances[i, :len(nearest)] = block[0, nearest]
+        return neighbours, distances
+
+    @timed('similarity_query')
+    def query(self, positions, k=10):
+        """k nearest rows to each row position (excluding itself): (neighbour positions, distances)"""
+        positions = np.atleast_1d(np.asarray(positions, dtype=np.int64))
+        k = min(k, len(self.vectors) - 1)
+        search = self._approximate if self.approximate else self._exact
+        neighbours, squared = search(self.vectors[positions], k, positions)
+        return neighbours, np.sqrt(squared)
+
+    def similar(self, date, team, k=10):
+        """The k matches, from any season, whose feature vectors are closest to team's match on date"""
+        neighbours, distances = self.query([self.position(date, team)], k)
+        found = neighbours[0] >= 0
+        result = self.frame.iloc[neighbours[0][found]][RESULT_COLUMNS].reset_index(drop=True)
+        result.insert(0, 'distance', distances[0][found])
+        return result
+
+
+def similar_matches(df, team, date, k=10, approximate=False):
+    """Matches across the whole frame most like team's match on date, nearest first"""
+    return MatchSimilarityIndex(df, approximate=approximate).similar(date, team, k)
+
+
+def main():
+    """Print the matches most similar to one team-match"""
+    from match_store import load_matches
+
+    parser = argparse.ArgumentParser(description='Find the past matches that looked most like a given one')
+    parser.add_argument('team')
+    parser.add_argument('date', help='match date, YYYY-MM-DD')
+    parser.add_argument('-k', type=int, default=10, help='number of neighbours')
+    parser.add_argument('--approximate', action='store_true', help='probe inverted lists instead of scanning every row')
+    args = parser.parse_args()
+
+    result = similar_matches(load_matches(), args.team, args.date, args.k, args.approximate)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(result.round({'distance': 2}).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Premier League standings engine
+Precomputes cumulative points/goals per (season, team, matchweek) so any table is a lookup
+"""
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+
+TABLE_COLUMNS = ['position', 'team', 'played', 'wins', 'draws', 'losses', 'points', 'gf', 'ga', 'goal_difference']
+
+
+class SeasonStandings:
+    """Cumulative standings arrays for a single season
+
+    Every array is shaped (teams, max_week + 1) and column w holds the running
+    total after matchweek w, so column 0 is the all-zero starting table.
+    """
+
+    def __init__(self, season, season_data):
+        self.season = season
+        self._set_matches(season_data)
+        self._set_totals(self.match_team, self.match_week, {
+            'points': self.match_points,
+            'gf': self.match_gf,
+            'ga': self.match_ga,
+            'played': None,
+            'wins': self.match_points == 3,
+            'draws': self.match_points == 1,
+        })
+
+    @classmethod
+    def from_partials(cls, season, weekly, meetings):
+        """Standings from per-(team, match_week) sums and per-(team, opponent_team, venue) meetings
+
+        weekly holds played/wins/draws/points/gf/ga columns; meetings holds the
+        points, gf, ga and match_week of each meeting and only feeds the
+        head-to-head tiebreak (see streaming.py).
+        """
+        standings = cls.__new__(cls)
+        standings.season = season
+        teams = sorted(set(weekly['team'].astype(str)) | set(meetings['team'].astype(str)))
+        standings._set_matches(meetings, teams)
+        standings._set_totals(
+            pd.Index(standings.teams).get_indexer(weekly['team'].astype(str)),
+            weekly['match_week'].to_numpy(dtype=np.int32),
+            {name: weekly[name].to_numpy() for name in ('points', 'gf', 'ga', 'played', 'wins', 'draws')},
+        )
+        return standings
+
+    def _set_matches(self, rows, teams=None):
+        """Per-row arrays of the matches the head-to-head tiebreak reads"""
+        if teams is None:
+            codes, teams = pd.factorize(rows['team'].astype(str), sort=True)
+        else:
+            codes = pd.Index(teams).get_indexer(rows['team'].astype(str))
+        self.teams = np.asarray(teams, dtype=object)
+        self.team_index = {team: i for i, team in enumerate(self.teams)}
+
+        self.match_team = codes.astype(np.int32)
+        self.match_opponent = pd.Index(self.teams).get_indexer(rows['opponent_team'].astype(str)).astype(np.int32)
+        self.match_week = rows['match_week'].to_numpy(dtype=np.int32)
+        self.match_points = rows['points'].to_numpy(dtype=np.int32)
+        self.match_gf = rows['gf'].to_numpy(dtype=np.int32)
+        self.match_ga = rows['ga'].to_numpy(dtype=np.int32)
+        self.match_away = (rows['venue'] == 'Away').to_numpy()
+
+    def _set_totals(self, team, week, weights):
+        """Cumulative (teams, max_week + 1) arrays from per-(team, week) weights (None counts rows)"""
+        self.max_week = int(week.max()) if len(week) else 0
+        shape = (len(self.teams), self.max_week + 1)
+        flat = team * shape[1] + week
+
+        def cumulative(values):
+            totals = np.bincount(flat, weights=values, minlength=shape[0] * shape[1])
+            return np.cumsum(totals.reshape(shape), axis=1).astype(np.int32)
+
+        for name, values in weights.items():
+            setattr(self, name, cumulative(values))
+        self.goal_difference = self.gf - self.ga
+
+    def _week(self, match_week):
+        if match_week is None:
+            return self.max_week
+        return int(np.clip(match_week, 0, self.max_week))
+
+    def _head_to_head_order(self, group, week, match_points=None, match_gf=None):
+        """Order teams level on points, GD and GF by their results against each other
+
+        match_points and match_gf replace the recorded per-row results (see what_if.py).
+        """
+        match_points = self.match_points if match_points is None else match_points
+        match_gf = self.match_gf if match_gf is None else match_gf
+        members = np.zeros(len(self.teams), dtype=bool)
+        members[group] = True
+        mask = (self.match_week <= week) & members[self.match_team] & (self.match_opponent >= 0)
+        mask &= members[np.maximum(self.match_opponent, 0)]
+        team = self.match_team[mask]
+        h2h_points = np.bincount(team, weights=match_points[mask], minlength=len(self.teams))
+        h2h_away_goals = np.bincount(team, weights=match_gf[mask] * self.match_away[mask], minlength=len(self.teams))
+        names = self.teams[group]
+        # lexsort uses the last key as primary; team name is the final, deterministic fallback
+        order = np.lexsort((names, -h2h_away_goals[group], -h2h_points[group]))
+        return group[order]
+
+    def order(self, match_week=None):
+        """Return team indices in table order as of match_week"""
+        week = self._week(match_week)
+        return self.order_totals(self.points[:, week], self.goal_difference[:, week], self.gf[:, week], week)
+
+    def order_totals(self, points, goal_difference, gf, week, match_points=None, match_gf=None):
+        """Team indices in table order for the given per-team totals as of week
+
+        Teams level on all three are split by head-to-head over the per-row
+        results (the recorded ones unless match_points/match_gf are given).
+        """
+        order = np.lexsort((self.teams, -gf, -goal_difference, -points))
+
+        keys = np.stack([points[order], goal_difference[order], gf[order]], axis=1)
+        level = np.all(keys[1:] == keys[:-1], axis=1)
+        if not level.any():
+            return order
+
+        # Resolve each run of teams level on points, GD and GF with head-to-head
+        boundaries = np.flatnonzero(np.diff(np.concatenate(([0], level.astype(np.int8), [0]))))
+        for start, stop in zip(boundaries[::2], boundaries[1::2]):
+            order[start:stop + 1] = self._head_to_head_order(order[start:stop + 1], week, match_points, match_gf)
+        return order
+
+    @timed('standings_table')
+    def table(self, match_week=None):
+        """League table as of match_week (defaults to the latest week)"""
+        week = self._week(match_week)
+        order = self.order(week)
+        played = self.played[order, week]
+        wins = self.wins[order, week]
+        draws = self.draws[order, week]
+        return pd.DataFrame({
+            'position': np.arange(1, len(order) + 1),
+            'team': self.teams[order],
+            'played': played,
+            'wins': wins,
+            'draws': draws,
+            'losses': played - wins - draws,
+            'points': self.points[order, week],
+            'gf': self.gf[order, week],
+            'ga': self.ga[order, week],
+            'goal_difference': self.goal_difference[order, week],
+        }, columns=TABLE_COLUMNS)
+
+
+class LeagueStandings:
+    """Standings for every season in the match table, built once"""
+
+    def __init__(self, df):
+        self.seasons = {
+            int(season): SeasonStandings(int(season), season_data)
+            for season, season_data in df.groupby('season', sort=True)
+        }
+
+    def __getitem__(self, season):
+        return self.seasons[int(season)]
+
+    def __contains__(self, season):
+        return int(season) in self.seasons
+
+    def table(self, season, match_week=None):
+        """League table for a season as of match_week"""
+        return self[season].table(match_week)
+
+    def max_week(self, season):
+        return self[season].max_week
+
+
+@timed('build_standings')
+def build_standings(df):
+    """Build the standings engine for every season in df"""
+    return LeagueStandings(df)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Out-of-core match aggregation
+Streams match files in chunks (or a directory of per-season partitions) into small mergeable
+partial aggregates, so summaries, league tables and insights never need the whole archive in memory
+"""
+
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from match_store import CSV_DTYPES, DATA_FILE, derive_columns
+from standings import SeasonStandings
+
+CHUNK_SIZE = 100_000
+
+# Per (team, venue) sums; means are taken from these only when the aggregate is finalized
+TOTAL_COLUMNS = ['matches', 'points', 'wins', 'draws', 'losses', 'gf', 'ga', 'xg', 'xga', 'poss', 'poss_matches']
+
+# Per (team, match_week) sums behind the cumulative standings arrays
+WEEKLY_COLUMNS = ['played', 'wins', 'draws', 'points', 'gf', 'ga']
+# Per (team, opponent_team, venue) meeting for head-to-head tiebreaks; match_week is when it was played
+MEETING_AGGREGATES = {'points': 'sum', 'gf': 'sum', 'ga': 'sum', 'match_week': 'max'}
+
+
+def team_venue_totals(rows):
+    """Per (team, venue) sums of one set of match rows - the mergeable unit behind every team figure"""
+    result = rows['result'].astype(str)
+    totals = pd.DataFrame({
+        'team': rows['team'].astype(str).to_numpy(),
+        'venue': rows['venue'].astype(str).to_numpy(),
+        'matches': 1,
+        'points': rows['points'].to_numpy(dtype=np.int64),
+        'wins': (result == 'W').to_numpy(dtype=np.int64),
+        'draws': (result == 'D').to_numpy(dtype=np.int64),
+        'losses': (result == 'L').to_numpy(dtype=np.int64),
+        'gf': rows['gf'].to_numpy(dtype=np.int64),
+        'ga': rows['ga'].to_numpy(dtype=np.int64),
+        'xg': rows['xg'].to_numpy(dtype=np.float64),
+        'xga': rows['xga'].to_numpy(dtype=np.float64),
+        'poss': rows['poss'].fillna(0).to_numpy(dtype=np.float64),
+        'poss_matches': rows['poss'].notna().to_numpy(dtype=np.int64),
+    })
+    return totals.groupby(['team', 'venue'], sort=True)[TOTAL_COLUMNS].sum()
+
+
+def weekly_totals(rows):
+    """Per (team, match_week) played/W/D/points/goals sums of one set of match rows"""
+    points = rows['points'].to_numpy(dtype=np.int64)
+    weekly = pd.DataFrame({
+        'team': rows['team'].astype(str).to_numpy(),
+        'match_week': rows['match_week'].to_numpy(dtype=np.int64),
+        'played': 1,
+        'wins': (points == 3).astype(np.int64),
+        'draws': (points == 1).astype(np.int64),
+        'points': points,
+        'gf': rows['gf'].to_numpy(dtype=np.int64),
+        'ga': rows['ga'].to_numpy(dtype=np.int64),
+    })
+    return weekly.groupby(['team', 'match_week'], sort=True)[WEEKLY_COLUMNS].sum()
+
+
+def meeting_totals(rows):
+    """Per (team, opponent_team, venue) points and goals of one set of match rows, with the week they met"""
+    meetings = pd.DataFrame({
+        'team': rows['team'].astype(str).to_numpy(),
+        'opponent_team': rows['opponent_team'].astype(str).to_numpy(),
+        'venue': rows['venue'].astype(str).to_numpy(),
+        'points': rows['points'].to_numpy(dtype=np.int64),
+        'gf': rows['gf'].to_numpy(dtype=np.int64),
+        'ga': rows['ga'].to_numpy(dtype=np.int64),
+        'match_week': rows['match_week'].to_numpy(dtype=np.int64),
+    })
+    return meetings.groupby(['team', 'opponent_team', 'venue'], sort=True).agg(MEETING_AGGREGATES)
+
+
+def _merge_partials(partial, other, aggregates='sum'):
+    """Combine two keyed partials; keys in both are aggregated"""
+    if partial is None:
+        return other
+    combined = pd.concat([partial, other])
+    return combined.groupby(level=list(range(combined.index.nlevels)), sort=True).agg(aggregates)
+
+
+def insight_stats(totals):
+    """The generate_insights() figures for one season, from its (team, venue) totals"""
+    by_team = totals.groupby(level='team', sort=True).sum()
+    by_venue = totals.groupby(level='venue').sum()
+    possession = by_team['poss'] / by_team['poss_matches']
+    return {
+        'highest_scoring': by_team['gf'].idxmax(),
+        'highest_goals': int(by_team['gf'].max()),
+        'best_defense': by_team['ga'].idxmin(),
+        'fewest_goals': int(by_team['ga'].min()),
+        'highest_possession': possession.idxmax(),
+        'avg_possession': float(possession.max()),
+        'home_points': int(by_venue['points'].get('Home', 0)),
+        'away_points': int(by_venue['points'].get('Away', 0)),
+        'total_matches': int(by_venue['matches'].sum()),
+    }
+
+
+class SeasonAggregate:
+    """Mergeable partial aggregate of one competition-season
+
+    Holds (team, venue) totals, per (team, match week) sums and per (team,
+    opponent, venue) meetings, all bounded by the teams and weeks of the season
+    rather than by the rows streamed; two partials built from disjoint rows
+    merge into the aggregate of both.
+    """
+
+    def __init__(self, comp, season):
+        self.comp = comp
+        self.season = season
+        self.totals = None
+        self.weekly = None
+        self.meetings = None
+        self._standings = None
+
+    def update(self, rows):
+        """Fold a chunk of this season's match rows into the aggregate"""
+        self.merge_totals(team_venue_totals(rows))
+        self.weekly = _merge_partials(self.weekly, weekly_totals(rows))
+        self.meetings = _merge_partials(self.meetings, meeting_totals(rows), MEETING_AGGREGATES)
+        self._standings = None
+        return self
+
+    def merge_totals(self, totals):
+        self.totals = totals if self.totals is None else self.totals.add(totals, fill_value=0).astype(totals.dtypes)
+
+    def merge(self, other):
+        """Merge another partial aggregate of the same season into this one"""
+        self.merge_totals(other.totals)
+        self.weekly = _merge_partials(self.weekly, other.weekly)
+        self.meetings = _merge_partials(self.meetings, other.meetings, MEETING_AGGREGATES)
+        self._standings = None
+        return self
+
+    @property
+    def standings(self):
+        if self._standings is None:
+            self._standings = SeasonStandings.from_partials(self.season, self.weekly.reset_index(), self.meetings.reset_index())
+        return self._standings
+
+    def team_stats(self, team):
+        """Team figures in the shape of data_analysis.team_stats(), or None if the team did not play"""
+        if team not in self.totals.index.get_level_values('team'):
+            return None
+        by_venue = self.totals.loc[team]
+        total = by_venue.sum()
+
+        def venue(name):
+            row = by_venue.loc[name] if name in by_venue.index else pd.Series(0, index=TOTAL_COLUMNS)
+            return {key: int(row[key]) for key in ('matches', 'points', 'gf', 'ga')}
+
+        avg_xg = float(total['xg'] / total['matches'])
+        avg_xga = float(total['xga'] / total['matches'])
+        return {
+            'matches': int(total['matches']),
+            'points': int(total['points']),
+            'gf': int(total['gf']),
+            'ga': int(total['ga']),
+            'team': team,
+            'season': int(self.season),
+            'wins': int(total['wins']),
+            'draws': int(total['draws']),
+            'losses': int(total['losses']),
+            'goal_difference': int(total['gf'] - total['ga']),
+            'home': venue('Home'),
+            'away': venue('Away'),
+            'avg_xg': avg_xg,
+            'avg_xga': avg_xga,
+            'xg_difference': avg_xg - avg_xga,
+        }
+
+    def insights(self):
+        return insight_stats(self.totals)
+
+
+class StreamAggregates:
+    """Partial aggregates for every competition-season seen so far
+
+    Exposes the same table()/max_week() interface as LeagueStandings, so
+    data_analysis.season_summary() can print from it directly.
+    """
+
+    def __init__(self):
+        self.seasons = {}
+
+    def update(self, chunk):
+        """Fold a chunk of derived match rows (any mix of seasons) into the aggregates"""
+        for (comp, season), rows in chunk.groupby(['comp', 'season'], observed=True, sort=False):
+            key = (str(comp), int(season))
+            if key not in self.seasons:
+                self.seasons[key] = SeasonAggregate(*key)
+            self.seasons[key].update(rows)
+        return self
+
+    def merge(self, other):
+        """Merge another StreamAggregates built from disjoint rows into this one"""
+        for key, aggregate in other.seasons.items():
+            if key in self.seasons:
+                self.seasons[key].merge(aggregate)
+            else:
+                self.seasons[key] = aggregate
+        return self
+
+    @property
+    def comps(self):
+        return sorted({comp for comp, _ in self.seasons})
+
+    def season_keys(self, comp=None):
+        return sorted(season for key_comp, season in self.seasons if comp is None or key_comp == comp)
+
+    def __getitem__(self, season):
+        return self.season(season)
+
+    def season(self, season, comp=None):
+        """The aggregate for a season; comp may be omitted while only one competition is loaded"""
+        if comp is None:
+            comps = self.comps
+            if len(comps) > 1:
+                raise ValueError(f"Several competitions loaded ({', '.join(comps)}); pass comp")
+            comp = comps[0] if comps else None
+        try:
+            return self.seasons[(comp, int(season))]
+        except KeyError:
+            raise KeyError(f"No matches for {comp} {season}") from None
+
+    def table(self, season, match_week=None, comp=None):
+        """League table for a season as of match_week"""
+        return self.season(season, comp).standings.table(match_week)
+
+    def max_week(self, season, comp=None):
+        return self.season(season, comp).standings.max_week
+
+    def team_stats(self, team, season, comp=None):
+        return self.season(season, comp).team_stats(team)
+
+    def insights(self, season, comp=None):
+        return self.season(season, comp).insights()
+
+
+def partition_paths(source):
+    """The CSV files behind a source: the file itself, or every CSV in a partition directory"""
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, '**', '*.csv'), recursive=True))
+    return [source]
+
+
+def iter_match_chunks(path, chunksize=CHUNK_SIZE):
+    """Yield typed, derived match frames of at most chunksize rows from one CSV"""
+    reader = pd.read_csv(path, dtype=CSV_DTYPES, parse_dates=['date'], date_format='%Y-%m-%d', chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            yield derive_columns(chunk)
+
+
+def aggregate_file(path, chunksize=CHUNK_SIZE):
+    """Stream one CSV into partial aggregates; only one chunk is held in memory at a time"""
+    aggregates = StreamAggregates()
+    for chunk in iter_match_chunks(path, chunksize):
+        aggregates.update(chunk)
+    return aggregates
+
+
+def _aggregate_task(args):
+    return aggregate_file(*args)
+
+
+@timed('stream_aggregates')
+def stream_aggregates(source=DATA_FILE, chunksize=CHUNK_SIZE, workers=1):
+    """Aggregate a match CSV or a directory of partitions, merging the per-partition partials
+
+    With workers > 1 partitions are aggregated in a process pool; each worker returns
+    only its small partial aggregate.
+    """
+    paths = partition_paths(source)
+    tasks = [(path, chunksize) for path in paths]
+    if workers and workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            partials = executor.map(_aggregate_task, tasks)
+            aggregates = StreamAggregates()
+            for partial in partials:
+                aggregates.merge(partial)
+            return aggregates
+
+    aggregates = StreamAggregates()
+    for task in tasks:
+        aggregates.merge(_aggregate_task(task))
+    return aggregates
+
+
+def main():
+    """Print the season summary, a team's figures and insights without loading the whole archive"""
+    parser = argparse.ArgumentParser(description='Streaming Premier League summaries for large match archives')
+    parser.add_argument('source', nargs='?', default=DATA_FILE, help='match CSV or directory of CSV partitions')
+    parser.add_argument('--season', type=int, default=None, help='season to summarise (default: latest)')
+    parser.add_argument('--comp', default=None, help='competition, when the archive holds several')
+    parser.add_argument('--team', default=None, help='also print this team\'s figures')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help='processes for partition directories')
+    args = parser.parse_args()
+
+    aggregates = stream_aggregates(args.source, args.chunksize, args.workers)
+    comp = args.comp or (aggregates.comps[0] if len(aggregates.comps) == 1 else None)
+    if comp is None:
+        parser.error(f"several competitions found ({', '.join(aggregates.comps)}); pass --comp")
+    season = args.season or max(aggregates.season_keys(comp))
+
+    print(f"{comp} {season}")
+    print(aggregates.table(season, comp=comp)[['position', 'team', 'points', 'gf', 'ga', 'goal_difference']].to_string(index=False))
+    print()
+    for key, value in aggregates.insights(season, comp).items():
+        print(f"{key}: {value}")
+    if args.team:
+        print()
+        for key, value in (aggregates.team_stats(args.team, season, comp) or {}).items():
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
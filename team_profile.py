@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Precomputed dashboard aggregates
+Everything the dashboard shows for a team-season (or a whole season), computed in one go;
+grouped figures are sliced from the aggregation cube rather than regrouped from rows
+"""
+
+import pandas as pd
+
+from ratings import RATING_COLUMNS
+
+RECENT_MATCH_COLUMNS = ['date', 'opponent', 'venue', 'result', 'gf', 'ga', 'xg', 'xga', 'poss']
+
+
+class TeamSeasonProfile:
+    """Aggregates for one team in one season
+
+    Built from the team-season rows ordered by match week and the aggregation cube;
+    widgets only read from it.
+    """
+
+    def __init__(self, team, season, team_data, cube):
+        self.team = team
+        self.season = season
+        self.matches = len(team_data)
+
+        results = team_data['result'].value_counts()
+        self.results = results[results > 0]
+        self.wins = int(results.get('W', 0))
+        self.draws = int(results.get('D', 0))
+        self.losses = int(results.get('L', 0))
+        self.points = int(team_data['points'].sum())
+        self.goals_for = int(team_data['gf'].sum())
+        self.goals_against = int(team_data['ga'].sum())
+
+        self.match_week = team_data['match_week'].to_numpy()
+        self.cumulative_points = team_data['points'].cumsum().to_numpy()
+        self.cumulative_goal_difference = team_data['goal_difference'].astype('int16').cumsum().to_numpy()
+        self.xg = team_data['xg'].to_numpy()
+        self.xga = team_data['xga'].to_numpy()
+
+        by_venue = team_data.groupby('venue', observed=True)
+        self.venue_points = by_venue['points'].sum()
+        self.venue_goals = by_venue[['gf', 'ga']].sum()
+
+        self.formation_performance = cube.query(
+            ['formation'], ['points', 'xg', 'xga'], season=season, team=team
+        ).drop(columns='matches').reset_index()
+
+        columns = RECENT_MATCH_COLUMNS + [column for column in RATING_COLUMNS if column in team_data]
+        recent_matches = team_data[columns].tail(10).copy()
+        recent_matches['date'] = recent_matches['date'].dt.strftime('%Y-%m-%d')
+        if 'elo' in recent_matches:
+            recent_matches[RATING_COLUMNS] = recent_matches[RATING_COLUMNS].round(0)
+        self.recent_matches = recent_matches
+
+
+class SeasonProfile:
+    """League-wide per-team aggregates for one season, sliced from the aggregation cube"""
+
+    def __init__(self, season, cube):
+        self.season = season
+        sums = cube.query(['team'], ['points'], 'sum', season=season)
+        means = cube.query(['team'], ['xg', 'poss'], season=season)
+        self.team_points = sums['points']
+        self.team_xg = means['xg']
+        self.possession_points = pd.DataFrame({
+            'team': means.index.astype(str),
+            'poss': means['poss'].to_numpy(),
+            'points': sums['points'].to_numpy(),
+        })
+
+    def compare(self, teams):
+        """Points and average xG for a subset of teams, each sorted descending"""
+        teams = [team for team in teams if team in self.team_points.index]
+        points = self.team_points.loc[teams].sort_values(ascending=False)
+        xg = self.team_xg.loc[teams].sort_values(ascending=False)
+        points.index = points.index.astype(str)
+        xg.index = xg.index.astype(str)
+        return points, xg
@@ -0,0 +1,56 @@
+"""Incremental ingestion must leave the store as a full load of the same rows would"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from features import FormFeaturePipeline, SORT_COLUMNS
+from ingest import LiveMatchStore
+from match_store import load_matches
+from ratings import RATING_COLUMNS, EloRatings
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'final_matches.csv')
+LATE_TEAMS = {'Chelsea', 'Bournemouth'}
+
+
+def full_load(path):
+    """Form features and Elo ratings computed from scratch over a CSV"""
+    matches = load_matches(path, use_cache=False).sort_values(SORT_COLUMNS, ignore_index=True)
+    frame = matches.join(FormFeaturePipeline().fit_transform(matches))
+    return frame.join(EloRatings.from_matches(matches).match_ratings(matches))
+
+
+def by_row(frame):
+    frame = frame.assign(team=frame['team'].astype(str))
+    return frame.sort_values(['team', 'date'], ignore_index=True)
+
+
+def test_late_row_in_second_batch_matches_full_load(tmp_path):
+    source = pd.read_csv(DATA, dtype=str)
+    season = source['season'] == '2025'
+    # First batch: the last matchweek, without the teams of the late fixture
+    first = season & (source['round'] == 'Matchweek 38') & ~source['team'].isin(LATE_TEAMS) & ~source['opponent'].isin(LATE_TEAMS)
+    # Second batch: Chelsea v Bournemouth from matchweek 21, arriving after later matchweeks are stored
+    second = season & (source['date'] == '2025-01-14') & source['team'].isin(LATE_TEAMS) & source['opponent'].isin(LATE_TEAMS)
+    assert first.sum() == 16 and second.sum() == 2
+
+    base_path = tmp_path / 'base.csv'
+    source[~first & ~second].to_csv(base_path, index=False)
+    store = LiveMatchStore(str(base_path), cache_dir=str(tmp_path / 'cache'))
+    assert len(store.append(source[first].to_csv(index=False), persist=False)) == 16
+    assert len(store.append(source[second].to_csv(index=False), persist=False)) == 2
+
+    full_path = tmp_path / 'full.csv'
+    source.to_csv(full_path, index=False)
+    expected = by_row(full_load(str(full_path)))
+    actual = by_row(store.frame)
+
+    assert len(actual) == len(expected)
+    assert (actual['date'] == expected['date']).all()
+    feature_columns = [column for column in FormFeaturePipeline().fit_transform(expected.head(0)).columns]
+    for column in feature_columns + RATING_COLUMNS:
+        np.testing.assert_allclose(
+            actual[column].to_numpy(dtype=np.float64), expected[column].to_numpy(dtype=np.float64),
+            rtol=1e-5, equal_nan=True, err_msg=column,
+        )
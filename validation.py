@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Match data validation
+Vectorized schema, range and consistency checks run on every load; rows that fail an
+error check are quarantined instead of failing the load, and every check is summarised
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from fixtures import XG_TOLERANCE
+from instrumentation import timed
+from match_store import (
+    CSV_COLUMNS, CSV_DTYPES, POINTS_BY_RESULT, category_lookup, concat_matches, derive_columns, round_to_match_week,
+)
+from report_columns import result_codes
+
+REQUIRED_COLUMNS = ['date', 'round', 'venue', 'result', 'gf', 'ga', 'opponent', 'team', 'season']
+OPTIONAL_COLUMNS = ['xg', 'xga', 'poss', 'sh', 'sot', 'dist', 'attendance', 'notes']
+# Integer columns cannot hold missing values once cast, so a gap in any of them is an error
+INTEGER_COLUMNS = [column for column, dtype in CSV_DTYPES.items() if dtype.startswith('int')]
+NUMERIC_COLUMNS = [column for column, dtype in CSV_DTYPES.items() if dtype != 'category']
+# Columns pair_checks reads, and so what stored rows contribute when new rows are checked against them
+PAIR_COLUMNS = ['date', 'team', 'opponent_team', 'venue', 'result', 'gf', 'ga', 'xg', 'xga']
+MAX_MATCH_WEEK = 38
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+def _labels(frame, column):
+    """A categorical or object column as a string array, with missing values as ''"""
+    values = frame[column]
+    if hasattr(values, 'cat'):
+        categories = np.array([str(category) for category in values.cat.categories] + [''], dtype=object)
+        return categories[values.cat.codes.to_numpy()]
+    return np.asarray(values.fillna('').astype(str), dtype=object)
+
+
+def _round_weeks(frame):
+    """Match week of each row's round label (0 when the label has no number), parsed as derive_columns does"""
+    return category_lookup(frame['round'].astype('category'), round_to_match_week, np.int64)
+
+
+def row_checks(frame):
+    """{(check, severity): failing-row mask} for the checks that look at one row at a time"""
+    # One float64 block for every numeric column instead of a Series per check
+    numbers = dict(zip(NUMERIC_COLUMNS, frame[NUMERIC_COLUMNS].to_numpy(dtype=np.float64, na_value=np.nan).T))
+    checks = {}
+    for column in dict.fromkeys(REQUIRED_COLUMNS + INTEGER_COLUMNS):
+        missing = np.isnan(numbers[column]) if column in numbers else frame[column].isna().to_numpy()
+        checks[(f'missing {column}', ERROR)] = missing
+
+    gf, ga = numbers['gf'], numbers['ga']
+    result = _labels(frame, 'result')
+    known_result = np.isin(result, list(POINTS_BY_RESULT))
+    checks[('result not W/D/L', ERROR)] = (result != '') & ~known_result
+    venue = _labels(frame, 'venue')
+    checks[('venue not Home/Away', ERROR)] = (venue != '') & ~np.isin(venue, ['Home', 'Away'])
+    week = _round_weeks(frame)
+    checks[('round has no match week 1-38', ERROR)] = frame['round'].notna().to_numpy() & ((week < 1) | (week > MAX_MATCH_WEEK))
+
+    with np.errstate(invalid='ignore'):
+        counts = np.column_stack([numbers[column] for column in INTEGER_COLUMNS if column != 'season'])
+        checks[('negative or fractional counts', ERROR)] = ((counts < 0) | (counts % 1 > 0)).any(axis=1)
+        margin = np.sign(gf - ga)
+        expected = np.where(result == 'W', 1, np.where(result == 'D', 0, -1))
+        checks[('result disagrees with gf/ga', ERROR)] = known_result & ~np.isnan(margin) & (margin != expected)
+        checks[('negative xg/xga', ERROR)] = (numbers['xg'] < 0) | (numbers['xga'] < 0)
+        poss = numbers['poss']
+        checks[('possession outside 0-100', ERROR)] = (poss < 0) | (poss > 100)
+        # Seasons are labelled by the year they end in
+        years = frame['date'].dt.year.to_numpy(dtype=np.float64, na_value=np.nan)
+        season = numbers['season']
+        checks[('date outside its season', ERROR)] = ~np.isnan(years) & ~np.isnan(season) & (years != season) & (years != season - 1)
+
+        checks[('shots on target exceed shots', WARNING)] = numbers['sot'] > numbers['sh']
+        checks[('penalties scored exceed attempts', WARNING)] = numbers['pk'] > numbers['pkatt']
+        checks[('negative attendance', WARNING)] = numbers['attendance'] < 0
+    for column in OPTIONAL_COLUMNS:
+        missing = np.isnan(numbers[column]) if column in numbers else frame[column].isna().to_numpy()
+        checks[(f'missing {column}', WARNING)] = missing
+    return checks
+
+
+def pair_checks(derived):
+    """{(check, severity): failing-row mask} from matching each perspective row with its mirror row
+
+    Rows are keyed by (date, team, opponent) as one integer and the mirror key
+    (date, opponent, team) is looked up with a binary search. Rows of a pair that
+    disagree both fail, since either could be the wrong one; a repeated row is an
+    error and a match with only one row is a warning.
+    """
+    n = len(derived)
+    size = len(derived['team'].cat.categories) + 1
+    # team and opponent_team share categories after derive_columns, so their codes compare
+    team = derived['team'].cat.codes.to_numpy().astype(np.int64) + 1
+    opponent = derived['opponent_team'].cat.codes.to_numpy().astype(np.int64) + 1
+    day = derived['date'].to_numpy(dtype='datetime64[D]').view(np.int64)
+    key = (day * size + team) * size + opponent
+    mirror = (day * size + opponent) * size + team
+
+    order = np.argsort(key, kind='stable')
+    sorted_keys = key[order]
+    repeated = np.zeros(n, dtype=bool)
+    repeated[order[1:]] = sorted_keys[1:] == sorted_keys[:-1]
+    found = np.minimum(np.searchsorted(sorted_keys, mirror), max(n - 1, 0))
+    has_pair = (sorted_keys[found] == mirror) if n else np.zeros(0, dtype=bool)
+
+    rows = np.flatnonzero(has_pair & ~repeated)
+    other = order[found[rows]]
+
+    def mismatched(mask):
+        failed = np.zeros(n, dtype=bool)
+        failed[rows[mask]] = True
+        failed[other[mask]] = True
+        return failed
+
+    gf = derived['gf'].to_numpy(dtype=np.int64)
+    ga = derived['ga'].to_numpy(dtype=np.int64)
+    xg = derived['xg'].to_numpy(dtype=np.float64)
+    xga = derived['xga'].to_numpy(dtype=np.float64)
+    result = result_codes(_labels(derived, 'result'))
+    home = (derived['venue'] == 'Home').to_numpy()
+    return {
+        ('pair: goals do not mirror', ERROR): mismatched((gf[rows] != ga[other]) | (ga[rows] != gf[other])),
+        # A missing xg is already its own warning; only compare pairs where both sides have values
+        ('pair: xg does not mirror', ERROR): mismatched(
+            (~np.isnan(xg[rows]) & ~np.isnan(xga[other]) & ~np.isclose(xg[rows], xga[other], atol=XG_TOLERANCE))
+            | (~np.isnan(xga[rows]) & ~np.isnan(xg[other]) & ~np.isclose(xga[rows], xg[other], atol=XG_TOLERANCE))
+        ),
+        ('pair: results do not mirror', ERROR): mismatched(result[rows] != -result[other]),
+        ('pair: both rows have the same venue', ERROR): mismatched(home[rows] == home[other]),
+        ('pair: duplicate perspective row', ERROR): repeated,
+        ('pair: missing counterpart row', WARNING): ~has_pair & ~repeated,
+    }
+
+
+class ValidationReport:
+    """Failing source-row positions per check, the quarantined rows and a per-check summary"""
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self.failures = {}
+
+    def add(self, checks, positions):
+        """Record check masks over a frame whose rows sit at the given source positions"""
+        for key, mask in checks.items():
+            failed = positions[mask]
+            if len(failed):
+                previous = self.failures.get(key)
+                self.failures[key] = failed if previous is None else np.union1d(previous, failed)
+
+    @property
+    def quarantined(self):
+        """Source positions of the rows that failed at least one error check"""
+        errors = [failed for (_, severity), failed in self.failures.items() if severity == ERROR]
+        return np.unique(np.concatenate(errors)) if errors else np.empty(0, dtype=np.int64)
+
+    def summary(self):
+        """One row per failed check: severity and how many rows failed it"""
+        rows = [
+            {'check': check, 'severity': severity, 'rows': len(failed)}
+            for (check, severity), failed in self.failures.items()
+        ]
+        frame = pd.DataFrame(rows, columns=['check', 'severity', 'rows'])
+        return frame.sort_values(['severity', 'rows'], ascending=[True, False], kind='stable', ignore_index=True)
+
+    def to_dict(self):
+        return {
+            'rows': self.n_rows,
+            'quarantined': int(len(self.quarantined)),
+            'checks': self.summary().to_dict(orient='records'),
+        }
+
+    def __str__(self):
+        lines = [f"{self.n_rows} rows checked, {len(self.quarantined)} quarantined"]
+        lines += [f"  {row.severity:<7} {row.rows:>6}  {row.check}" for row in self.summary().itertuples()]
+        return '\n'.join(lines)
+
+
+def _cast(frame):
+    """Cast rows that passed the row checks to the CSV schema (a no-op for a strictly parsed frame)"""
+    dtypes = frame.dtypes
+    mismatched = {
+        column: dtype for column, dtype in CSV_DTYPES.items()
+        if column in dtypes and str(dtypes[column]) != dtype
+    }
+    return frame.astype(mismatched) if mismatched else frame
+
+
+def validate_matches(raw, stored=None):
+    """Check parsed (not yet derived) match rows; returns (clean derived frame, ValidationReport)
+
+    Rows failing a row-level error check are dropped before the columns are derived;
+    rows failing a pair check are dropped after. With stored (derived rows already
+    accepted, e.g. by an ingest), a new row may pair with a stored row; a stored
+    row is never reported. The checks are timed as stages validate_rows and
+    validate_pairs, apart from derive_columns.
+    """
+    raw = raw.reset_index(drop=True)
+    report = ValidationReport(len(raw))
+    positions = np.arange(len(raw))
+    with timed('validate_rows'):
+        report.add(row_checks(raw), positions)
+        keep = np.setdiff1d(positions, report.quarantined)
+
+    # derive_columns adds columns in place; keep the raw frame as parsed for the quarantine file
+    clean = raw.copy(deep=False) if len(keep) == len(raw) else raw.iloc[keep].reset_index(drop=True)
+    derived = derive_columns(_cast(clean))
+
+    with timed('validate_pairs'):
+        if stored is None or len(stored) == 0:
+            report.add(pair_checks(derived), keep)
+        else:
+            paired = concat_matches([stored[PAIR_COLUMNS], derived[PAIR_COLUMNS]])
+            offset = len(stored)
+            checks = pair_checks(paired)
+            report.add({key: mask[offset:] for key, mask in checks.items()}, keep)
+        bad = np.isin(keep, report.quarantined)
+    if bad.any():
+        derived = derived[~bad].reset_index(drop=True)
+    return derived, report
+
+
+def main():
+    """Validate a match CSV and print the summary"""
+    from match_store import DATA_FILE, read_matches
+
+    parser = argparse.ArgumentParser(description='Validate a match CSV and report bad rows')
+    parser.add_argument('source', nargs='?', default=DATA_FILE)
+    parser.add_argument('--show', action='store_true', help='also print the quarantined rows')
+    args = parser.parse_args()
+
+    raw = read_matches(args.source).reset_index(drop=True)
+    _, report = validate_matches(raw)
+    print(report)
+    if args.show and len(report.quarantined):
+        print(raw.iloc[report.quarantined][CSV_COLUMNS[:10]].to_string())
+
+
+if __name__ == "__main__":
+    main()
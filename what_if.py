@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+What-if league tables
+Hypothetical result edits applied as point and goal deltas to the precomputed standings
+arrays, with whole batches of scenarios ranked at once and optionally across processes
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from match_store import POINTS_BY_RESULT
+from standings import TABLE_COLUMNS
+
+CHUNK_SIZE = 2_000
+VENUES = ('Home', 'Away')
+
+
+def score_for_result(gf, ga, result):
+    """Nearest score giving the result: kept if it already does, else the side that must improve scores more"""
+    if result == 'W':
+        return (gf, ga) if gf > ga else (ga + 1, ga)
+    if result == 'L':
+        return (gf, ga) if gf < ga else (gf, gf + 1)
+    if result == 'D':
+        return (max(gf, ga),) * 2
+    raise ValueError(f"result must be one of W, D, L, not {result!r}")
+
+
+def _match_points(gf, ga):
+    return np.where(gf > ga, 3, np.where(gf == ga, 1, 0))
+
+
+def _evaluate_chunk(args):
+    """Totals and positions of a run of scenarios; edits are per perspective row"""
+    standings, week, base_points, base_gf, base_ga, n_scenarios, scenario, row, gf, ga = args
+    n_teams = len(base_points)
+    points = _match_points(gf, ga)
+    flat = scenario * n_teams + standings.match_team[row]
+
+    def totals(base, delta):
+        return base + np.bincount(flat, weights=delta, minlength=n_scenarios * n_teams).reshape(n_scenarios, n_teams).astype(np.int64)
+
+    total_points = totals(base_points, points - standings.match_points[row])
+    total_gf = totals(base_gf, gf - standings.match_gf[row])
+    goal_difference = total_gf - totals(base_ga, ga - standings.match_ga[row])
+
+    # Points, then goal difference, then goals scored, then team name (teams are sorted by name)
+    names = np.broadcast_to(np.arange(n_teams), total_points.shape)
+    order = np.lexsort((names, -total_gf, -goal_difference, -total_points), axis=1)
+    keys = np.stack([np.take_along_axis(values, order, axis=1) for values in (total_points, goal_difference, total_gf)])
+    level = np.all(keys[:, :, 1:] == keys[:, :, :-1], axis=0).any(axis=1)
+
+    # Scenarios with teams level on all three fall back to the head-to-head ordering
+    bounds = np.searchsorted(scenario, np.arange(n_scenarios + 1))
+    for s in np.flatnonzero(level):
+        edited = slice(bounds[s], bounds[s + 1])
+        match_points = standings.match_points.copy()
+        match_gf = standings.match_gf.copy()
+        match_points[row[edited]] = points[edited]
+        match_gf[row[edited]] = gf[edited]
+        order[s] = standings.order_totals(total_points[s], goal_difference[s], total_gf[s], week, match_points, match_gf)
+
+    positions = np.empty_like(order)
+    positions[np.arange(n_scenarios)[:, None], order] = np.arange(1, n_teams + 1)
+    return total_points, goal_difference, positions
+
+
+class WhatIf:
+    """Hypothetical tables for one season as of a matchweek
+
+    An edit is a dict naming a match from one side (team, opponent and, when the
+    two met more than once by the matchweek, venue) and either a new result for
+    that side or a new score (gf, ga). A scenario is a list of edits.
+    """
+
+    def __init__(self, standings, match_week=None):
+        self.standings = standings
+        self.week = standings._week(match_week)
+        self.teams = standings.teams
+        self.base_points = standings.points[:, self.week].astype(np.int64)
+        self.base_gf = standings.gf[:, self.week].astype(np.int64)
+        self.base_ga = standings.ga[:, self.week].astype(np.int64)
+        self.base_position = np.empty(len(self.teams), dtype=np.int64)
+        self.base_position[standings.order(self.week)] = np.arange(1, len(self.teams) + 1)
+
+        # (team, opponent) -> {venue: row} for the matches played by the matchweek
+        self.rows = {}
+        played = np.flatnonzero((standings.match_week <= self.week) & (standings.match_opponent >= 0))
+        for row in played:
+            pair = (int(standings.match_team[row]), int(standings.match_opponent[row]))
+            self.rows.setdefault(pair, {})[VENUES[int(standings.match_away[row])]] = int(row)
+
+    def resolve(self, edit):
+        """(row, counterpart row or -1, gf, ga) of one edit; raises ValueError for an invalid edit or unknown match"""
+        if 'result' in edit and edit['result'] not in POINTS_BY_RESULT:
+            raise ValueError(f"result must be one of W, D, L in {edit!r}")
+        if 'team' not in edit or 'opponent' not in edit:
+            raise ValueError(f"An edit needs a team and an opponent: {edit!r}")
+        team = self.standings.team_index.get(edit['team'])
+        opponent = self.standings.team_index.get(edit['opponent'])
+        if team is None or opponent is None:
+            raise ValueError(f"Unknown team in {edit!r}")
+        matches = self.rows.get((team, opponent), {})
+        venue = edit.get('venue')
+        if venue is None and len(matches) == 1:
+            venue = next(iter(matches))
+        if venue not in matches:
+            raise ValueError(f"No match for {edit!r} by matchweek {self.week}"
+                             + (' (give a venue)' if venue is None and matches else ''))
+        row = matches[venue]
+        counterpart = self.rows.get((opponent, team), {}).get(VENUES[1 - VENUES.index(venue)], -1)
+
+        gf, ga = int(self.standings.match_gf[row]), int(self.standings.match_ga[row])
+        # A missing or null gf/ga keeps that side's recorded goals
+        gf = gf if edit.get('gf') is None else int(edit['gf'])
+        ga = ga if edit.get('ga') is None else int(edit['ga'])
+        if gf < 0 or ga < 0:
+            raise ValueError(f"Negative score in {edit!r}")
+        if 'result' in edit:
+            gf, ga = score_for_result(gf, ga, edit['result'])
+        return row, counterpart, gf, ga
+
+    def edit_rows(self, scenarios):
+        """Flat (scenario, row, gf, ga) arrays of every scenario's edits, both perspective rows of each"""
+        scenario, rows, goals_for, goals_against = [], [], [], []
+        for s, edits in enumerate(scenarios):
+            edited = set()
+            for edit in edits:
+                row, counterpart, gf, ga = self.resolve(edit)
+                if row in edited:
+                    raise ValueError(f"Scenario {s} edits the same match twice")
+                for r, f, a in ((row, gf, ga), (counterpart, ga, gf)):
+                    if r >= 0:
+                        edited.add(r)
+                        scenario.append(s)
+                        rows.append(r)
+                        goals_for.append(f)
+                        goals_against.append(a)
+        return (np.asarray(scenario, dtype=np.int64), np.asarray(rows, dtype=np.int64),
+                np.asarray(goals_for, dtype=np.int64), np.asarray(goals_against, dtype=np.int64))
+
+    @timed('what_if')
+    def evaluate(self, scenarios, workers=1, chunk_size=CHUNK_SIZE):
+        """Points, goal difference and position of every team in every scenario, each (scenarios, teams)
+
+        Columns follow self.teams. Chunks of chunk_size scenarios are ranked in one
+        vectorized pass each, spread over worker processes when workers > 1.
+        """
+        scenario, row, gf, ga = self.edit_rows(scenarios)
+        starts = range(0, len(scenarios), chunk_size)
+        bounds = np.searchsorted(scenario, [*starts, len(scenarios)])
+        tasks = [
+            (self.standings, self.week, self.base_points, self.base_gf, self.base_ga,
+             min(chunk_size, len(scenarios) - start), scenario[lo:hi] - start, row[lo:hi], gf[lo:hi], ga[lo:hi])
+            for start, lo, hi in zip(starts, bounds[:-1], bounds[1:])
+        ]
+        if workers and workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(executor.map(_evaluate_chunk, tasks))
+        else:
+            results = [_evaluate_chunk(task) for task in tasks]
+        if not results:
+            empty = np.empty((0, len(self.teams)), dtype=np.int64)
+            return empty, empty, empty
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+    def table(self, edits):
+        """League table after one scenario's edits, with each team's actual position and the change"""
+        scenario, row, gf, ga = self.edit_rows([edits])
+        points, goal_difference, positions = self.evaluate([edits])
+        points, goal_difference, positions = points[0], goal_difference[0], positions[0]
+
+        team = self.standings.match_team[row]
+        n_teams = len(self.teams)
+        new_points = _match_points(gf, ga)
+        old_points = self.standings.match_points[row]
+        wins = self.standings.wins[:, self.week] + np.bincount(team, (new_points == 3).astype(int) - (old_points == 3), n_teams).astype(np.int64)
+        draws = self.standings.draws[:, self.week] + np.bincount(team, (new_points == 1).astype(int) - (old_points == 1), n_teams).astype(np.int64)
+        gf_total = self.base_gf + np.bincount(team, gf - self.standings.match_gf[row], n_teams).astype(np.int64)
+        played = self.standings.played[:, self.week]
+
+        order = np.argsort(positions)
+        table = pd.DataFrame({
+            'position': positions[order],
+            'team': self.teams[order],
+            'played': played[order],
+            'wins': wins[order],
+            'draws': draws[order],
+            'losses': (played - wins - draws)[order],
+            'points': points[order],
+            'gf': gf_total[order],
+            'ga': (gf_total - goal_difference)[order],
+            'goal_difference': goal_difference[order],
+        }, columns=TABLE_COLUMNS)
+        table['actual_position'] = self.base_position[order]
+        table['change'] = table['actual_position'] - table['position']
+        return table
+
+    def summary(self, positions):
+        """Per team across a batch of scenarios: actual, mean, best and worst position"""
+        summary = pd.DataFrame({
+            'team': self.teams,
+            'actual_position': self.base_position,
+            'mean_position': positions.mean(axis=0) if len(positions) else np.nan,
+            'best_position': positions.min(axis=0) if len(positions) else self.base_position,
+            'worst_position': positions.max(axis=0) if len(positions) else self.base_position,
+        })
+        return summary.sort_values(['mean_position', 'actual_position'], ignore_index=True)
+
+
+def parse_edit(text):
+    """An edit from 'Team:Opponent[:Venue]=W|D|L|gf-ga', e.g. 'Liverpool:Arsenal:Away=D'"""
+    match, _, outcome = text.partition('=')
+    parts = [part.strip() for part in match.split(':')]
+    if len(parts) not in (2, 3) or not outcome:
+        raise ValueError(f"Edits look like 'Team:Opponent[:Venue]=W|D|L|gf-ga', not {text!r}")
+    edit = {'team': parts[0], 'opponent': parts[1]}
+    if len(parts) == 3:
+        edit['venue'] = parts[2].title()
+    outcome = outcome.strip()
+    if '-' in outcome:
+        gf, ga = outcome.split('-', 1)
+        edit['gf'], edit['ga'] = int(gf), int(ga)
+    else:
+        edit['result'] = outcome.upper()
+    return edit
+
+
+def random_scenarios(what_if, n_scenarios, edits_per_scenario=3, seed=None):
+    """Scenarios flipping the results of randomly chosen played matches (for benchmarking)"""
+    rng = np.random.default_rng(seed)
+    rows = [(pair, venue) for pair, venues in what_if.rows.items() for venue in venues]
+    teams = what_if.teams
+    scenarios = []
+    for _ in range(n_scenarios):
+        picks = rng.choice(len(rows), size=min(edits_per_scenario, len(rows)), replace=False)
+        scenario, seen = [], set()
+        for pick in picks:
+            (team, opponent), venue = rows[pick]
+            if (opponent, team, VENUES[1 - VENUES.index(venue)]) in seen:
+                continue
+            seen.add((team, opponent, venue))
+            scenario.append({'team': teams[team], 'opponent': teams[opponent], 'venue': venue,
+                             'result': str(rng.choice(list(POINTS_BY_RESULT)))})
+        scenarios.append(scenario)
+    return scenarios
+
+
+def main():
+    """Print the table after a set of result edits, or a summary over random scenarios"""
+    import time
+
+    from match_store import DATA_FILE, load_matches
+    from standings import build_standings
+
+    parser = argparse.ArgumentParser(description='League table after hypothetical result changes')
+    parser.add_argument('season', type=int)
+    parser.add_argument('edits', nargs='*', help="e.g. 'Liverpool:Arsenal:Away=D' or 'Chelsea:Everton=2-2'")
+    parser.add_argument('--week', type=int, default=None, help='table as of this matchweek (default: latest)')
+    parser.add_argument('--random', type=int, default=0, help='evaluate this many random scenarios instead')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--data', default=DATA_FILE, help='source match CSV')
+    args = parser.parse_args()
+
+    standings = build_standings(load_matches(args.data))
+    if args.season not in standings:
+        parser.error(f"no matches for season {args.season}")
+    what_if = WhatIf(standings[args.season], args.week)
+    if args.random:
+        scenarios = random_scenarios(what_if, args.random, seed=args.seed)
+        start = time.perf_counter()
+        _, _, positions = what_if.evaluate(scenarios, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{args.random} scenarios in {elapsed * 1000:.1f} ms ({args.random / elapsed:,.0f} per second)")
+        print(what_if.summary(positions).round(2).to_string(index=False))
+        return
+    try:
+        table = what_if.table([parse_edit(edit) for edit in args.edits])
+    except ValueError as error:
+        # An unknown team or fixture, or an edit that does not parse
+        parser.error(str(error))
+    print(f"Season {args.season}, matchweek {what_if.week}")
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()